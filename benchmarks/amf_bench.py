@@ -0,0 +1,111 @@
+"""
+AMF0 解码微基准：对比 flv_parser.AMF0Decoder 与之前基于 BytesIO 的实现。
+
+用法:
+    python benchmarks/amf_bench.py [--keyframes 100000] [--repeat 5]
+"""
+import argparse
+import os
+import struct
+import sys
+import timeit
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flv_parser import AMF0Decoder, _encode_amf_value # noqa: E402
+
+# --- 旧实现（逐个 struct.unpack 读取 BytesIO），仅用于对比 ---
+
+def _read_ui8(f):
+    return struct.unpack('>B', f.read(1))[0]
+
+def _read_ui16(f):
+    return struct.unpack('>H', f.read(2))[0]
+
+def _read_double(f):
+    return struct.unpack('>d', f.read(8))[0]
+
+def _parse_amf_string(f):
+    length = _read_ui16(f)
+    return f.read(length).decode('utf-8', errors='replace')
+
+def _parse_amf_value(f, type_marker=None):
+    if type_marker is None:
+        type_marker = _read_ui8(f)
+    if type_marker == 0:
+        return _read_double(f)
+    elif type_marker == 1:
+        return _read_ui8(f) != 0
+    elif type_marker == 2:
+        return _parse_amf_string(f)
+    elif type_marker == 3:
+        obj = {}
+        while True:
+            try:
+                key = _parse_amf_string(f)
+                if not key: break
+                value_type = _read_ui8(f)
+                if value_type == 9: break
+                obj[key] = _parse_amf_value(f, value_type)
+            except (struct.error, IndexError):
+                break
+        return obj
+    elif type_marker == 8:
+        count = struct.unpack('>I', f.read(4))[0]
+        arr = {}
+        for _ in range(count):
+            key = _parse_amf_string(f)
+            value = _parse_amf_value(f)
+            arr[key] = value
+        f.read(3)
+        return arr
+    elif type_marker == 10:
+        count = struct.unpack('>I', f.read(4))[0]
+        arr = []
+        for _ in range(count):
+            arr.append(_parse_amf_value(f))
+        return arr
+    else:
+        return f"Unsupported AMF Type: {type_marker}"
+
+def legacy_decode(data):
+    f = BytesIO(data)
+    return _parse_amf_value(f), _parse_amf_value(f)
+
+def fast_decode(data):
+    decoder = AMF0Decoder(data)
+    return decoder.decode(), decoder.decode()
+
+# --- 测试数据 ---
+
+def make_metadata(keyframes):
+    metadata = {
+        "duration": keyframes * 2.0, "width": 1920.0, "height": 1080.0, "framerate": 30.0,
+        "videocodecid": 7.0, "audiocodecid": 10.0, "encoder": "amf_bench",
+        "keyframes": {"times": [i * 2.0 for i in range(keyframes)],
+                      "filepositions": [float(13 + i * 250000) for i in range(keyframes)]},
+    }
+    return _encode_amf_value("onMetaData") + _encode_amf_value(metadata, ecma_array=True)
+
+def make_cue_point():
+    return _encode_amf_value("onCuePoint") + _encode_amf_value(
+        {"name": "chapter", "time": 12.5, "type": "event", "parameters": {"title": "hello", "id": 42.0}},
+        ecma_array=True)
+
+def bench(name, data, repeat, number):
+    assert legacy_decode(data) == fast_decode(data), "decoders disagree"
+    legacy = min(timeit.repeat(lambda: legacy_decode(data), repeat=repeat, number=number)) / number
+    fast = min(timeit.repeat(lambda: fast_decode(data), repeat=repeat, number=number)) / number
+    print(f"{name:<28} {len(data):>10} B  legacy {legacy * 1e6:>11.1f} us  fast {fast * 1e6:>11.1f} us  x{legacy / fast:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keyframes", type=int, default=100000, help="onMetaData 中 keyframes 数组的长度")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    bench("onCuePoint", make_cue_point(), args.repeat, 2000)
+    bench("onMetaData (no keyframes)", make_metadata(0), args.repeat, 2000)
+    bench(f"onMetaData ({args.keyframes} kf)", make_metadata(args.keyframes), args.repeat, 1)
+
+if __name__ == "__main__":
+    main()
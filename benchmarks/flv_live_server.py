@@ -0,0 +1,141 @@
+"""
+把本地 FLV 文件按实时速度循环推送的 HTTP-FLV 服务器，用来代替直播源测试 `flv_parser.py monitor`。
+
+GET /<文件名> 先发送文件头、onMetaData 与序列头，然后按时间戳节奏循环发送媒体 Tag（chunked 编码），
+每轮循环的时间戳接着上一轮递增，与真实直播一样不会回退。所有连接在同一个 asyncio 事件循环中处理，
+一个进程可以同时服务数百个连接。--stall-every/--stall-for 周期性地暂停发送，用来模拟断流。
+
+用法:
+    python benchmarks/flv_live_server.py /data/samples --port 8080
+    python flv_parser.py monitor http://127.0.0.1:8080/a.flv http://127.0.0.1:8080/b.flv
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flv_parser import FLVFile, PACKET_CODED_FRAMES # noqa: E402
+
+_TICK = 0.02 # 发送节奏的最小间隔（秒），同一间隔内到期的 Tag 合并为一次写入
+
+class _Source:
+    """一个 FLV 文件拆成的前导部分（文件头、脚本 Tag 与序列头）和媒体 Tag 列表，每个连接共享。"""
+    def __init__(self, path: str):
+        with FLVFile(path, use_mmap=True) as flv_file, open(path, 'rb') as f:
+            data = f.read()
+            index = flv_file.index
+            self.preamble = bytearray(data[:flv_file.header["HeaderSize"] + 4])
+            self.tags: List[Tuple[int, bytes]] = [] # (时间戳, Tag 头 + 负载 + PreviousTagSize)
+            for i in range(len(index)):
+                offset, end = index.offsets[i], index.offsets[i] + 11 + index.sizes[i] + 4
+                if index.packet_types[i] == PACKET_CODED_FRAMES and index.types[i] != 18:
+                    self.tags.append((index.timestamps[i], data[offset:end]))
+                elif not self.tags:
+                    self.preamble += data[offset:end]
+        if not self.tags:
+            raise ValueError(f"{path}: no media frames")
+        self.start = self.tags[0][0]
+        intervals = sorted(b[0] - a[0] for a, b in zip(self.tags, self.tags[1:]) if b[0] > a[0])
+        # 一轮的时长多加一个常见帧间隔，下一轮的第一帧不会与上一轮的最后一帧时间戳相同
+        self.duration = self.tags[-1][0] - self.start + (intervals[len(intervals) // 2] if intervals else 40)
+
+def _retimed(tag: bytes, timestamp: int) -> bytes:
+    timestamp &= 0xFFFFFFFF
+    return b''.join((tag[:4], (timestamp & 0xFFFFFF).to_bytes(3, 'big'), bytes([timestamp >> 24]), tag[8:]))
+
+class LiveFLVServer:
+    def __init__(self, directory: str, speed: float = 1.0, stall_every: Optional[float] = None, stall_for: float = 0.0):
+        self.directory = directory
+        self.speed = speed
+        self.stall_every, self.stall_for = stall_every, stall_for
+        self.connections = 0
+        self._sources: Dict[str, _Source] = {}
+
+    def _source(self, name: str) -> Optional[_Source]:
+        path = os.path.join(self.directory, os.path.normpath('/' + name).lstrip('/'))
+        if name not in self._sources:
+            if not os.path.isfile(path): return None
+            self._sources[name] = _Source(path)
+        return self._sources[name]
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            method, target = head.split(b"\r\n", 1)[0].decode('latin-1').split()[:2]
+            source = self._source(urllib.parse.unquote(urllib.parse.urlsplit(target).path)) if method == "GET" else None
+            if source is None:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: video/x-flv\r\nTransfer-Encoding: chunked\r\n"
+                         b"Connection: close\r\nCache-Control: no-cache\r\n\r\n")
+            self.connections += 1
+            try:
+                await self._replay(source, writer)
+            finally:
+                self.connections -= 1
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def _replay(self, source: _Source, writer: asyncio.StreamWriter):
+        def send(data: bytes):
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+        send(bytes(source.preamble))
+        began = time.monotonic()
+        paused = 0.0 # 模拟断流暂停的总时长，恢复后从暂停处继续而不是一次补发
+        next_stall = began + self.stall_every if self.stall_every else None
+        loop, i, tags = 0, 0, source.tags
+        while True:
+            now = time.monotonic()
+            if next_stall is not None and now >= next_stall:
+                await asyncio.sleep(self.stall_for)
+                paused += time.monotonic() - now
+                next_stall = time.monotonic() + self.stall_every
+                continue
+            due = (now - began - paused) * 1000 * self.speed # 从开始到现在应当发送到的媒体时间 (ms)
+            batch = []
+            while loop * source.duration + tags[i][0] - source.start <= due:
+                timestamp, tag = tags[i]
+                batch.append(_retimed(tag, timestamp + loop * source.duration) if loop else tag)
+                i += 1
+                if i == len(tags): loop, i = loop + 1, 0
+            if batch:
+                send(b''.join(batch))
+                await writer.drain()
+            wait = (loop * source.duration + tags[i][0] - source.start - due) / 1000 / self.speed
+            await asyncio.sleep(max(wait, _TICK))
+
+def start_server(directory: str, host: str = "127.0.0.1", port: int = 0, **options) -> Tuple[LiveFLVServer, str]:
+    """在后台线程的事件循环中启动服务器，返回 (server, 根 URL)；port 为 0 时自动选择空闲端口。"""
+    server = LiveFLVServer(directory, **options)
+    loop = asyncio.new_event_loop()
+    listener = loop.run_until_complete(asyncio.start_server(server.handle, host, port, backlog=1024))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return server, f"http://{host}:{listener.sockets[0].getsockname()[1]}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按实时速度循环推送 FLV 文件的 HTTP-FLV 服务器")
+    parser.add_argument("directory", nargs="?", default=".")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--speed", type=float, default=1.0, help="播放速度倍数（默认: 1）")
+    parser.add_argument("--stall-every", type=float, metavar="SECONDS", help="每隔多少秒暂停发送一次")
+    parser.add_argument("--stall-for", type=float, default=8.0, metavar="SECONDS", help="每次暂停多少秒（默认: 8）")
+    args = parser.parse_args(argv)
+    server, url = start_server(os.path.abspath(args.directory), args.host, args.port,
+                               speed=args.speed, stall_every=args.stall_every, stall_for=args.stall_for)
+    print(f"Serving {args.directory} at {url}/ (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+合成 FLV 生成器，供基准测试和手工排查使用。
+
+按时间戳交错写出音视频 Tag，可配置时长、帧率、编码、目标大小，并可注入时间戳跳跃和损坏的 Tag。
+负载内容是重复使用的伪随机数据，写出速度只受磁盘限制，生成数 GB 的文件也不占额外内存。
+
+用法:
+    python benchmarks/flvgen.py out.flv --duration 600 --fps 30 --video avc --audio aac
+    python benchmarks/flvgen.py big.flv --size 2G --gaps 5 --corrupt 3
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flv_parser import _encode_amf_value # noqa: E402
+
+# 1280x720 High@3.1 的 SPS/PPS，与常见编码器输出一致
+_SPS = bytes.fromhex('6764001facd9405005bb011000000300100000030320f1831960')
+_PPS = bytes.fromhex('68ebecb22c')
+# 只含 VPS/SPS/PPS 计数为 0 的最小 hvcC，足以让解析器识别为 HEVC 序列头
+_HVCC = bytes([1, 0x01, 0x60, 0, 0, 0, 0, 0, 0, 0, 0, 0, 93, 0xF0, 0x00, 0xFC, 0xFD, 0xF8, 0xF8, 0, 0, 0x0F, 0])
+
+VIDEO_CODECS = ('avc', 'hevc', 'h263', 'vp6', 'none')
+AUDIO_CODECS = ('aac', 'mp3', 'none')
+_FILLER_SIZE = 1024 * 1024
+_WRITE_BUFFER = 4 * 1024 * 1024
+
+def parse_size(text: str) -> int:
+    """'512K' / '100M' / '2G' -> 字节数。"""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+class _Filler:
+    """循环切取一块固定的伪随机数据作为负载。"""
+    def __init__(self, seed: int):
+        rng = random.Random(seed)
+        self.data = bytes(rng.getrandbits(8) for _ in range(4096)) * (_FILLER_SIZE // 4096)
+        self.pos = 0
+
+    def take(self, size: int) -> bytes:
+        if size > _FILLER_SIZE:
+            return (self.data * (size // _FILLER_SIZE + 1))[:size]
+        if self.pos + size > _FILLER_SIZE:
+            self.pos = 0
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+def _tag(tag_type: int, timestamp: int, payload: bytes) -> bytes:
+    size = len(payload)
+    header = struct.pack('>B', tag_type) + size.to_bytes(3, 'big') \
+        + (timestamp & 0xFFFFFF).to_bytes(3, 'big') + bytes(((timestamp >> 24) & 0xFF, 0, 0, 0))
+    return header + payload + struct.pack('>I', 11 + size)
+
+def _video_sequence_header(video: str) -> Optional[bytes]:
+    if video == 'avc':
+        record = (b'\x01' + _SPS[1:4] + b'\xff\xe1' + struct.pack('>H', len(_SPS)) + _SPS
+                  + b'\x01' + struct.pack('>H', len(_PPS)) + _PPS)
+        return b'\x17\x00\x00\x00\x00' + record
+    if video == 'hevc': # Enhanced FLV: IsExHeader | 关键帧 | SequenceStart + FourCC
+        return bytes((0x80 | 0x10 | 0,)) + b'hvc1' + _HVCC
+    return None
+
+def _video_frame(video: str, key: bool, size: int, filler: _Filler) -> bytes:
+    if video == 'avc':
+        nal = (b'\x65' if key else b'\x41') + filler.take(max(size - 10, 1))
+        return (b'\x17' if key else b'\x27') + b'\x01\x00\x00\x00' + struct.pack('>I', len(nal)) + nal
+    if video == 'hevc': # CodedFramesX，没有 CTS
+        nal = (b'\x26\x01' if key else b'\x02\x01') + filler.take(max(size - 11, 1))
+        return bytes((0x80 | (0x10 if key else 0x20) | 3,)) + b'hvc1' + struct.pack('>I', len(nal)) + nal
+    codec_id = 2 if video == 'h263' else 4
+    return bytes(((0x10 if key else 0x20) | codec_id,)) + filler.take(max(size - 1, 1))
+
+def _audio_frame(audio: str, size: int, filler: _Filler) -> bytes:
+    if audio == 'aac':
+        return b'\xaf\x01' + filler.take(max(size - 2, 1))
+    return b'\x2f' + filler.take(max(size - 1, 1)) # MP3 44kHz 16-bit stereo
+
+def generate(path: str, duration: float = 60.0, fps: float = 25.0, video: str = 'avc', audio: str = 'aac',
+             video_kbps: float = 2000.0, audio_kbps: float = 128.0, size: Optional[int] = None,
+             gaps: int = 0, gap_ms: int = 500, corrupt: int = 0, truncate: bool = False,
+             seed: int = 1) -> Dict[str, Any]:
+    """
+    生成一个合成 FLV，返回统计信息（字节数、Tag 数、注入的跳跃与损坏位置）。
+    size 不为 None 时忽略 video_kbps，按目标大小反推视频码率。
+    gaps 个时间戳跳跃（各 gap_ms 毫秒）与 corrupt 个损坏 Tag 在时间轴上均匀分布；
+    损坏方式轮流为：错误的 PreviousTagSize、未知的 Tag 类型、被破坏的负载头。
+    truncate 为 True 时最后一个 Tag 只写出一半。
+    """
+    if video not in VIDEO_CODECS: raise ValueError(f"unknown video codec: {video}")
+    if audio not in AUDIO_CODECS: raise ValueError(f"unknown audio codec: {audio}")
+    duration_ms = int(duration * 1000)
+    has_video, has_audio = video != 'none', audio != 'none'
+    audio_interval = 1024 * 1000 / 44100 if audio == 'aac' else 1152 * 1000 / 44100
+    audio_size = max(int(audio_kbps * 1000 / 8 * audio_interval / 1000), 8) if has_audio else 0
+    if size is not None and has_video:
+        audio_bytes = audio_size * duration_ms / audio_interval if has_audio else 0
+        video_kbps = max((size - audio_bytes) * 8 / 1000 / max(duration, 0.001), 1.0)
+    frame_size = max(int(video_kbps * 1000 / 8 / fps), 16) if has_video else 0
+    gop = max(int(fps * 2), 1)
+
+    gap_windows = [(duration_ms * (k + 1) // (gaps + 1), gap_ms) for k in range(gaps)]
+    corrupt_times = [duration_ms * (2 * k + 1) // (2 * corrupt) for k in range(corrupt)]
+    in_gap = lambda ts: any(start <= ts < start + length for start, length in gap_windows)
+
+    filler = _Filler(seed)
+    stats: Dict[str, Any] = {"path": path, "bytes": 0, "tags": 0, "video_frames": 0, "audio_frames": 0,
+                             "gaps": gap_windows, "corrupt": []}
+    metadata = {
+        "duration": float(duration), "width": 1280.0, "height": 720.0, "framerate": float(fps),
+        "videodatarate": float(video_kbps), "audiodatarate": float(audio_kbps),
+        "videocodecid": float({'avc': 7, 'hevc': 12, 'h263': 2, 'vp6': 4}.get(video, 0)),
+        "audiocodecid": float({'aac': 10, 'mp3': 2}.get(audio, 0)),
+        "audiosamplerate": 44100.0, "stereo": True, "encoder": "flvgen",
+    }
+    flags = (0x04 if has_audio else 0) | (0x01 if has_video else 0)
+    with open(path, 'wb', buffering=_WRITE_BUFFER) as out:
+        def write(data: bytes):
+            out.write(data)
+            stats["bytes"] += len(data)
+            stats["tags"] += 1
+
+        out.write(b'FLV\x01' + bytes((flags,)) + b'\x00\x00\x00\x09\x00\x00\x00\x00')
+        stats["bytes"] += 13
+        write(_tag(18, 0, _encode_amf_value("onMetaData") + _encode_amf_value(metadata, ecma_array=True)))
+        sequence_header = _video_sequence_header(video)
+        if sequence_header is not None:
+            write(_tag(9, 0, sequence_header))
+        if audio == 'aac':
+            write(_tag(8, 0, b'\xaf\x00\x12\x10'))
+
+        frame, packet = 0, 0
+        next_corrupt = 0
+        pending = None
+        while True:
+            video_ts = int(frame * 1000 / fps) if has_video else None
+            audio_ts = int(packet * audio_interval) if has_audio else None
+            candidates = [ts for ts in (video_ts, audio_ts) if ts is not None and ts < duration_ms]
+            if not candidates: break
+            if video_ts is not None and video_ts in candidates and (audio_ts is None or video_ts <= audio_ts):
+                ts = video_ts
+                key = frame % gop == 0
+                frame += 1
+                if in_gap(ts): continue
+                payload = _video_frame(video, key, frame_size * 2 if key else frame_size, filler)
+                tag_type = 9
+                stats["video_frames"] += 1
+            else:
+                ts = audio_ts
+                packet += 1
+                if in_gap(ts): continue
+                payload = _audio_frame(audio, audio_size, filler)
+                tag_type = 8
+                stats["audio_frames"] += 1
+            data = _tag(tag_type, ts, payload)
+            if next_corrupt < len(corrupt_times) and ts >= corrupt_times[next_corrupt]:
+                kind = next_corrupt % 3
+                if kind == 0: # PreviousTagSize 与实际长度不符
+                    data = data[:-4] + struct.pack('>I', 0xDEADBEEF)
+                elif kind == 1: # 未知 Tag 类型
+                    data = b'\x55' + data[1:]
+                else: # 负载开头被破坏
+                    data = data[:11] + b'\xff' * min(8, len(payload)) + data[11 + min(8, len(payload)):]
+                offset = stats["bytes"] + (len(pending) if pending is not None else 0)
+                stats["corrupt"].append({"offset": offset, "timestamp": ts,
+                                         "kind": ("previous_tag_size", "tag_type", "payload")[kind]})
+                next_corrupt += 1
+            if pending is not None:
+                write(pending)
+            pending = data
+        if pending is not None:
+            write(pending[:len(pending) // 2] if truncate else pending)
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成用于基准测试的合成 FLV 文件")
+    parser.add_argument("output")
+    parser.add_argument("--duration", type=float, default=60.0, help="时长（秒），默认 60")
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--video", choices=VIDEO_CODECS, default='avc')
+    parser.add_argument("--audio", choices=AUDIO_CODECS, default='aac')
+    parser.add_argument("--video-kbps", type=float, default=2000.0)
+    parser.add_argument("--audio-kbps", type=float, default=128.0)
+    parser.add_argument("--size", type=parse_size, help="目标文件大小，例如 100M、2G；会覆盖 --video-kbps")
+    parser.add_argument("--gaps", type=int, default=0, help="注入的时间戳跳跃个数")
+    parser.add_argument("--gap-ms", type=int, default=500)
+    parser.add_argument("--corrupt", type=int, default=0, help="注入的损坏 Tag 个数")
+    parser.add_argument("--truncate", action="store_true", help="最后一个 Tag 只写出一半")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    stats = generate(args.output, args.duration, args.fps, args.video, args.audio, args.video_kbps,
+                     args.audio_kbps, args.size, args.gaps, args.gap_ms, args.corrupt, args.truncate, args.seed)
+    print(f"{stats['path']}: {stats['bytes']} bytes, {stats['tags']} tags "
+          f"({stats['video_frames']} video, {stats['audio_frames']} audio), "
+          f"{len(stats['gaps'])} gaps, {len(stats['corrupt'])} corrupt tags")
+
+if __name__ == '__main__':
+    main()
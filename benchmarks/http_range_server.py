@@ -0,0 +1,101 @@
+"""
+支持 HTTP Range 请求与 keep-alive 的本地静态文件服务器，用来代替对象存储测试远程解析。
+
+标准库的 http.server 会忽略 Range 头，这里补上单区间 Range 的处理（206 / 416）。
+
+用法:
+    python benchmarks/http_range_server.py /data/recordings --port 8000
+    python flv_parser.py analyze http://127.0.0.1:8000/a.flv
+"""
+import argparse
+import functools
+import os
+import re
+import shutil
+import socket
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+_RANGE = re.compile(r'bytes=(\d*)-(\d*)$')
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive，客户端可以复用连接
+
+    def setup(self):
+        super().setup()
+        # 响应头与响应体分两次写出，不关闭 Nagle 时每个请求都会等对方的延迟 ACK（约 40 ms）
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        match = _RANGE.match(self.headers.get('Range', '').strip())
+        path = self.translate_path(self.path)
+        if match is None or os.path.isdir(path):
+            return super().send_head()
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        size = os.fstat(f.fileno()).st_size
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else: # bytes=-N 表示最后 N 个字节
+            start, end = max(size - int(last or 0), 0), size - 1
+        if start >= size or start > end:
+            f.close()
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Last-Modified", self.date_time_string(int(os.fstat(f.fileno()).st_mtime)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        f.seek(start)
+        self._remaining = end - start + 1
+        return f
+
+    def copyfile(self, source, outputfile):
+        remaining = getattr(self, '_remaining', None)
+        if remaining is None:
+            return shutil.copyfileobj(source, outputfile)
+        self._remaining = None
+        while remaining > 0:
+            chunk = source.read(min(remaining, 1024 * 1024))
+            if not chunk: break
+            outputfile.write(chunk)
+            remaining -= len(chunk)
+
+def start_server(directory: str, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """在后台线程中启动服务器，返回 (server, 根 URL)；port 为 0 时自动选择空闲端口。"""
+    handler = functools.partial(RangeRequestHandler, directory=directory)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="支持 Range 请求的本地静态文件服务器")
+    parser.add_argument("directory", nargs="?", default=".")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    server, url = start_server(os.path.abspath(args.directory), args.host, args.port)
+    print(f"Serving {args.directory} at {url}/ (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+FLV 解析基准测试套件。
+
+为每个场景生成（并缓存）一个合成 FLV，然后在独立的子进程中测量:
+  - 打开文件（解析 + 时间戳分析）的耗时、MB/s 与 tags/s
+  - 单独一次时间戳分析 (analyze_timestamps) 的耗时
+  - 前 N 个 Tag 的详情解码 (FLVTag.get_display_info) 耗时
+  - GUI 树的初始填充以及展开第一个分组的耗时（需要图形环境，否则记为 null）
+  - 子进程的峰值 RSS
+  - remote 模式经本地 HTTP Range 服务器打开，另记录打开时的请求数与传输量占文件大小的比例
+结果写成 JSON，可以用 --compare 与之前某次提交的结果逐项对比。
+
+用法:
+    python benchmarks/run_benchmarks.py                          # quick 套件
+    python benchmarks/run_benchmarks.py --suite large --modes mmap
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/1a2b3c4.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import flv_parser # noqa: E402
+from flv_parser import FLVFile, FLVParserGUI, analyze_timestamps # noqa: E402
+import flvgen # noqa: E402
+import http_range_server # noqa: E402
+
+SUITES: Dict[str, List[Dict[str, Any]]] = {
+    "quick": [
+        {"name": "avc-aac-16M", "duration": 120, "size": "16M"},
+        {"name": "hevc-ex-16M", "duration": 120, "size": "16M", "video": "hevc"},
+        {"name": "h263-mp3-16M", "duration": 120, "size": "16M", "video": "h263", "audio": "mp3"},
+        {"name": "gaps-corrupt-16M", "duration": 120, "size": "16M", "gaps": 20, "corrupt": 10, "truncate": True},
+        {"name": "small-tags-30min", "duration": 1800, "fps": 60, "video_kbps": 100, "audio_kbps": 32},
+    ],
+    "default": [
+        {"name": "avc-aac-256M", "duration": 1200, "size": "256M"},
+        {"name": "hevc-ex-256M", "duration": 1200, "size": "256M", "video": "hevc"},
+        {"name": "vp6-mp3-256M", "duration": 1200, "size": "256M", "video": "vp6", "audio": "mp3"},
+        {"name": "gaps-corrupt-256M", "duration": 1200, "size": "256M", "gaps": 100, "corrupt": 50},
+        {"name": "small-tags-4h", "duration": 14400, "fps": 60, "video_kbps": 100, "audio_kbps": 32},
+    ],
+    "large": [
+        {"name": "avc-aac-2G", "duration": 3600, "size": "2G"},
+        {"name": "avc-aac-4G", "duration": 7200, "size": "4G", "gaps": 200},
+    ],
+}
+MODES = ("file", "mmap", "cache", "parallel", "remote")
+DETAIL_TAGS = 20000 # 详情解码只测前这么多个 Tag
+COMPARE_METRICS = ("open_s", "mb_per_s", "tags_per_s", "analysis_s", "details_s", "tree_s", "tree_expand_s", "peak_rss_mb")
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位是 KB，macOS 上是字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def _measure_tree(flv_file: FLVFile) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    tk = flv_parser.tk
+    if tk is None:
+        return None, None, "tkinter unavailable"
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return None, None, str(e)
+    try:
+        root.withdraw()
+        gui = FLVParserGUI(root)
+        gui.flv_file = flv_file
+        start = time.perf_counter()
+        gui._populate_tree()
+        root.update_idletasks()
+        tree_s = time.perf_counter() - start
+        expand_s = None
+        if gui._bucket_nodes:
+            # 与 _on_tree_open 相同的路径，只是不依赖焦点事件
+            node = gui._bucket_nodes[0]
+            start = time.perf_counter()
+            loader = gui._lazy_nodes.pop(node)
+            gui.tree.delete(*gui.tree.get_children(node))
+            gui._populate_bucket(node, loader[1], loader[2])
+            root.update_idletasks()
+            expand_s = time.perf_counter() - start
+        return tree_s, expand_s, None
+    finally:
+        root.destroy()
+
+def run_worker(path: str, mode: str, detail_tags: int, tree: bool) -> Dict[str, Any]:
+    """在当前（子）进程中测量一个文件在一种模式下的各项指标。"""
+    kwargs = {"file": {}, "mmap": {"use_mmap": True}, "cache": {"use_cache": True},
+              "parallel": {"use_mmap": True, "jobs": os.cpu_count() or 1}, "remote": {}}[mode]
+    if mode == "cache": # 先建好缓存，测量的是缓存命中时的打开速度
+        FLVFile(path, use_cache=True).close()
+    size = os.path.getsize(path)
+    source, server = path, None
+    if mode == "remote":
+        server, base_url = http_range_server.start_server(os.path.dirname(os.path.abspath(path)))
+        source = f"{base_url}/{os.path.basename(path)}"
+    start = time.perf_counter()
+    flv_file = FLVFile(source, **kwargs)
+    open_s = time.perf_counter() - start
+    tags = len(flv_file.index)
+    remote = flv_file.remote
+    remote_stats = {} if remote is None else {
+        "remote_requests": remote.requests, "remote_fraction": round(remote.bytes_fetched / max(size, 1), 4)}
+
+    start = time.perf_counter()
+    analyze_timestamps(flv_file.index, flv_file.metadata)
+    analysis_s = time.perf_counter() - start
+
+    count = min(detail_tags, tags)
+    start = time.perf_counter()
+    for i in range(count):
+        flv_file.tags[i].get_display_info()
+    details_s = time.perf_counter() - start
+
+    tree_s = expand_s = None
+    tree_note = "disabled"
+    if tree:
+        tree_s, expand_s, tree_note = _measure_tree(flv_file)
+    result = {
+        "bytes": size, "tags": tags, "cache_status": flv_file.cache_status,
+        "open_s": round(open_s, 4),
+        "mb_per_s": round(size / (1024 * 1024) / open_s, 1) if open_s else None,
+        "tags_per_s": round(tags / open_s) if open_s else None,
+        "analysis_s": round(analysis_s, 4),
+        "details_tags": count, "details_s": round(details_s, 4),
+        "tree_s": None if tree_s is None else round(tree_s, 4),
+        "tree_expand_s": None if expand_s is None else round(expand_s, 4),
+        "tree_note": tree_note,
+        **remote_stats,
+    }
+    flv_file.close()
+    if server is not None:
+        server.shutdown()
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+def _ensure_file(workdir: str, scenario: Dict[str, Any]) -> str:
+    """按场景生成文件；参数没变时复用上次生成的文件。"""
+    path = os.path.join(workdir, f"{scenario['name']}.flv")
+    spec_path = path + ".json"
+    spec = {k: v for k, v in scenario.items() if k != "name"}
+    try:
+        with open(spec_path, encoding='utf-8') as f:
+            if json.load(f) == spec and os.path.exists(path):
+                return path
+    except (OSError, ValueError):
+        pass
+    kwargs = dict(spec)
+    if "size" in kwargs:
+        kwargs["size"] = flvgen.parse_size(kwargs["size"])
+    print(f"generating {path} ...", file=sys.stderr)
+    flvgen.generate(path, **kwargs)
+    if os.path.exists(path + flv_parser.INDEX_CACHE_SUFFIX): # 旧文件的索引缓存已失效
+        os.remove(path + flv_parser.INDEX_CACHE_SUFFIX)
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+    return path
+
+def _run_in_subprocess(path: str, mode: str, detail_tags: int, tree: bool) -> Dict[str, Any]:
+    # 每次测量用新进程，峰值 RSS 与页缓存以外的状态互不影响
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", path, mode, str(detail_tags)]
+    if tree: cmd.append("--tree")
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def _git_revision() -> Dict[str, Any]:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD") or None,
+                "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+def _merge_runs(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """多次重复取每项耗时的最小值、峰值内存的最大值。"""
+    ok = [r for r in runs if "error" not in r]
+    if not ok: return runs[0]
+    merged = dict(ok[0])
+    for key in ("open_s", "analysis_s", "details_s", "tree_s", "tree_expand_s"):
+        values = [r[key] for r in ok if r.get(key) is not None]
+        merged[key] = min(values) if values else None
+    rss = [r["peak_rss_mb"] for r in ok if r.get("peak_rss_mb") is not None]
+    merged["peak_rss_mb"] = max(rss) if rss else None
+    if merged["open_s"]:
+        merged["mb_per_s"] = round(merged["bytes"] / (1024 * 1024) / merged["open_s"], 1)
+        merged["tags_per_s"] = round(merged["tags"] / merged["open_s"])
+    merged["repeat"] = len(ok)
+    return merged
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], out=sys.stdout):
+    old_results = {(r["scenario"], r["mode"]): r for r in old.get("results", [])}
+    out.write(f"baseline {old['meta'].get('commit')} -> {new['meta'].get('commit')}\n")
+    for r in new["results"]:
+        base = old_results.get((r["scenario"], r["mode"]))
+        if base is None: continue
+        cells = []
+        for metric in COMPARE_METRICS:
+            a, b = base.get(metric), r.get(metric)
+            if a is None or b is None: continue
+            ratio = f"{b / a:.2f}x" if a else "n/a"
+            cells.append(f"{metric} {a}->{b} ({ratio})")
+        out.write(f"{r['scenario']:<22} {r['mode']:<6} " + ", ".join(cells) + "\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FLV 解析基准测试")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"逗号分隔，可选 {', '.join(MODES)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "flv_bench"),
+                        help="生成文件的存放目录，默认在系统临时目录")
+    parser.add_argument("--no-tree", action="store_true", help="不测量 GUI 树填充")
+    parser.add_argument("-o", "--output", help="结果 JSON 路径，默认 benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    parser.add_argument("--worker", nargs=3, metavar=("PATH", "MODE", "DETAIL_TAGS"), help=argparse.SUPPRESS)
+    parser.add_argument("--tree", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        path, mode, detail_tags = args.worker
+        print(json.dumps(run_worker(path, mode, int(detail_tags), args.tree)))
+        return 0
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown: parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+    os.makedirs(args.workdir, exist_ok=True)
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    report: Dict[str, Any] = {
+        "meta": {**_git_revision(), "suite": args.suite, "repeat": args.repeat,
+                 "time": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "numpy": numpy_version},
+        "results": [],
+    }
+    for scenario in SUITES[args.suite]:
+        path = _ensure_file(args.workdir, scenario)
+        for mode in modes:
+            runs = [_run_in_subprocess(path, mode, DETAIL_TAGS, not args.no_tree) for _ in range(max(args.repeat, 1))]
+            result = {"scenario": scenario["name"], "mode": mode, **_merge_runs(runs)}
+            report["results"].append(result)
+            if "error" in result:
+                print(f"{scenario['name']:<22} {mode:<6} ERROR {result['error']}", file=sys.stderr)
+                continue
+            tree = f"{result['tree_s']:.3f}s" if result.get("tree_s") is not None else "-"
+            print(f"{scenario['name']:<22} {mode:<6} {result['bytes'] / 1048576:8.1f} MB {result['tags']:>9} tags "
+                  f"open {result['open_s']:.3f}s ({result['mb_per_s']} MB/s, {result['tags_per_s']} tags/s) "
+                  f"analysis {result['analysis_s']:.3f}s details {result['details_s']:.3f}s tree {tree} "
+                  f"rss {result['peak_rss_mb']} MB"
+                  + (f" remote {result['remote_requests']} req {result['remote_fraction']:.1%}" if "remote_requests" in result else ""),
+                  file=sys.stderr)
+
+    output = args.output
+    if output is None:
+        commit = report["meta"]["commit"] or "unknown"
+        suffix = "-dirty" if report["meta"]["dirty"] else ""
+        output = os.path.join(BENCH_DIR, "results", f"{commit}{suffix}-{args.suite}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,573 +1,5074 @@
-import struct
-import os
-import sys # 导入 sys 模块
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from typing import Dict, List, Any, Tuple, Optional, IO
-from collections import Counter
-import subprocess
-from datetime import datetime
-
-# --- AMF0 Parsing Utilities ---
-
-def _read_ui8(f: IO[bytes]) -> int:
-    return struct.unpack('>B', f.read(1))[0]
-
-def _read_ui16(f: IO[bytes]) -> int:
-    return struct.unpack('>H', f.read(2))[0]
-
-def _read_double(f: IO[bytes]) -> float:
-    return struct.unpack('>d', f.read(8))[0]
-
-def _parse_amf_string(f: IO[bytes]) -> str:
-    length = _read_ui16(f)
-    return f.read(length).decode('utf-8', errors='replace')
-
-def _parse_amf_value(f: IO[bytes], type_marker: Optional[int] = None) -> Any:
-    if type_marker is None:
-        type_marker = _read_ui8(f)
-    
-    if type_marker == 0:  # Number
-        return _read_double(f)
-    elif type_marker == 1:  # Boolean
-        return _read_ui8(f) != 0
-    elif type_marker == 2:  # String
-        return _parse_amf_string(f)
-    elif type_marker == 3:  # Object
-        obj = {}
-        while True:
-            try:
-                key = _parse_amf_string(f)
-                if not key: break # End of object
-                value_type = _read_ui8(f)
-                if value_type == 9: break # Object End Marker
-                obj[key] = _parse_amf_value(f, value_type)
-            except (struct.error, IndexError):
-                break # Reached end of data
-        return obj
-    elif type_marker == 8:  # ECMA Array
-        count = struct.unpack('>I', f.read(4))[0]
-        arr = {}
-        for _ in range(count):
-            key = _parse_amf_string(f)
-            value = _parse_amf_value(f)
-            arr[key] = value
-        # Read object end marker (a string of length 0 and a type marker 9)
-        f.read(3)
-        return arr
-    elif type_marker == 10: # Strict Array
-        count = struct.unpack('>I', f.read(4))[0]
-        arr = []
-        for _ in range(count):
-            arr.append(_parse_amf_value(f))
-        return arr
-    else:
-        return f"Unsupported AMF Type: {type_marker}"
-
-class BitReader:
-    def __init__(self, data: bytes):
-        self.data = data
-        self.byte_pos = 0
-        self.bit_pos = 0
-
-    def read(self, num_bits: int) -> int:
-        value = 0
-        while num_bits > 0:
-            if self.byte_pos >= len(self.data):
-                raise ValueError("Reading past end of data")
-            current_byte = self.data[self.byte_pos]
-            bits_to_read = min(num_bits, 8 - self.bit_pos)
-            mask = ((1 << bits_to_read) - 1) << (8 - self.bit_pos - bits_to_read)
-            bits = (current_byte & mask) >> (8 - self.bit_pos - bits_to_read)
-            value = (value << bits_to_read) | bits
-            self.bit_pos += bits_to_read
-            num_bits -= bits_to_read
-            if self.bit_pos == 8:
-                self.bit_pos = 0
-                self.byte_pos += 1
-        return value
-
-AAC_AUDIO_OBJECT_TYPES = {
-    1: "AAC Main", 2: "AAC LC", 3: "AAC SSR", 4: "AAC LTP", 5: "SBR", 6: "AAC Scalable"
-}
-AAC_SAMPLING_FREQUENCIES = {
-    0: "96000 Hz", 1: "88200 Hz", 2: "64000 Hz", 3: "48000 Hz", 4: "44100 Hz",
-    5: "32000 Hz", 6: "24000 Hz", 7: "22050 Hz", 8: "16000 Hz", 9: "12000 Hz",
-    10: "11025 Hz", 11: "8000 Hz", 12: "7350 Hz"
-}
-AAC_CHANNEL_CONFIGURATIONS = {
-    1: "1 channel: C", 2: "2 channels: L, R", 3: "3 channels: C, L, R",
-    4: "4 channels: C, L, R, B", 5: "5 channels: C, L, R, SL, SR",
-    6: "6 channels: C, L, R, SL, SR, LFE", 7: "8 channels: C, L, R, SL, SR, BL, BR, LFE"
-}
-
-class FLVTag:
-    AUDIO, VIDEO, SCRIPT = 8, 9, 18
-    TAG_TYPES = {AUDIO: "Audio", VIDEO: "Video", SCRIPT: "Script Data"}
-    AUDIO_FORMATS = {
-        0: "LPCM", 1: "ADPCM", 2: "MP3", 3: "LPCM LE", 4: "Nellymoser 16kHz",
-        5: "Nellymoser 8kHz", 6: "Nellymoser", 7: "G.711 A-law", 8: "G.711 mu-law",
-        9: "reserved", 10: "AAC", 11: "Speex", 14: "MP3 8kHz", 15: "Device-specific"
-    }
-    AUDIO_RATES = {0: "5.5kHz", 1: "11kHz", 2: "22kHz", 3: "44kHz"}
-    AUDIO_BITS = {0: "8-bit", 1: "16-bit"}
-    AUDIO_CHANNELS = {0: "Mono", 1: "Stereo"}
-    VIDEO_FRAME_TYPES = {
-        1: "Key frame", 2: "Inter frame", 3: "Disposable inter frame",
-        4: "Generated key frame", 5: "Video info/command frame"
-    }
-    VIDEO_CODECS = {
-        2: "Sorenson H.263", 3: "Screen video", 4: "On2 VP6",
-        5: "On2 VP6 with alpha", 6: "Screen video v2", 7: "AVC (H.264)"
-    }
-
-    def __init__(self, offset: int, data: bytes, global_metadata: Dict[str, Any]):
-        self.offset = offset
-        self.tag_type = data[0]
-        self.data_size = (data[1] << 16) | (data[2] << 8) | data[3]
-        self.timestamp = (data[4] << 16) | (data[5] << 8) | data[6] | (data[7] << 24)
-        self.stream_id = (data[8] << 16) | (data[9] << 8) | data[10]
-        self.data = data[11:11+self.data_size]
-        self.total_size = 11 + self.data_size + 4
-        self.details = {}
-        self.analysis = {} # For frame drop analysis
-        
-        if self.tag_type == FLVTag.AUDIO:
-            self._parse_audio_data(global_metadata)
-        elif self.tag_type == FLVTag.VIDEO:
-            self._parse_video_data()
-        elif self.tag_type == FLVTag.SCRIPT:
-            self._parse_script_data()
-
-    def _parse_audio_data(self, meta: Dict[str, Any]):
-        if not self.data: return
-        flags = self.data[0]
-        sound_format = flags >> 4
-        self.details["Format"] = self.AUDIO_FORMATS.get(sound_format, f"Unknown ({sound_format})")
-        self.details["Sample Size"] = self.AUDIO_BITS.get((flags >> 1) & 0x1, "Unknown")
-
-        if sound_format == 10 and len(self.data) > 1: # AAC
-            aac_packet_type = self.data[1]
-            self.details["AAC Packet Type"] = "AAC sequence header" if aac_packet_type == 0 else "AAC raw"
-            if aac_packet_type == 0 and len(self.data) > 3:
-                try:
-                    reader = BitReader(self.data[2:])
-                    obj_type = reader.read(5)
-                    freq_idx = reader.read(4)
-                    self.details["Audio Object Type"] = AAC_AUDIO_OBJECT_TYPES.get(obj_type, "Unknown")
-                    if freq_idx == 15:
-                        self.details["Sample Rate"] = f"{reader.read(24)} Hz (Explicit from ASC)"
-                    else:
-                        self.details["Sample Rate"] = f"{AAC_SAMPLING_FREQUENCIES.get(freq_idx, 'Unknown')} (from ASC)"
-                    chan_cfg = reader.read(4)
-                    self.details["Channels"] = f"{AAC_CHANNEL_CONFIGURATIONS.get(chan_cfg, 'Unknown')} (from ASC)"
-                    return
-                except Exception as e:
-                    self.details["ASC Parse Error"] = str(e)
-
-        if 'audiosamplerate' in meta:
-            self.details["Sample Rate"] = f"{int(meta['audiosamplerate'])} Hz (from onMetaData)"
-        else:
-            self.details["Sample Rate"] = f"{self.AUDIO_RATES.get((flags >> 2) & 0x3, 'Unknown')} (from Tag Header)"
-        
-        if 'stereo' in meta:
-            self.details["Channels"] = "Stereo (from onMetaData)" if meta['stereo'] else "Mono (from onMetaData)"
-        else:
-            self.details["Channels"] = f"{self.AUDIO_CHANNELS.get(flags & 0x1, 'Unknown')} (from Tag Header)"
-
-    def _parse_video_data(self):
-        if not self.data: return
-        flags = self.data[0]
-        frame_type, codec_id = (flags >> 4) & 0xF, flags & 0xF
-        self.details["Frame Type"] = self.VIDEO_FRAME_TYPES.get(frame_type, f"Unknown ({frame_type})")
-        self.details["Codec ID"] = self.VIDEO_CODECS.get(codec_id, f"Unknown ({codec_id})")
-        if codec_id == 7 and len(self.data) > 4: # AVC
-            avc_packet_type = self.data[1]
-            cts = (self.data[2] << 16) | (self.data[3] << 8) | self.data[4]
-            self.details["AVC Packet Type"] = {0: "Seq. header", 1: "NALU", 2: "End of seq."}.get(avc_packet_type, "Unknown")
-            self.details["CompositionTime Offset"] = f"{cts} ms"
-
-    def _parse_script_data(self):
-        if not self.data: return
-        from io import BytesIO
-        f = BytesIO(self.data)
-        try:
-            name = _parse_amf_value(f)
-            value = _parse_amf_value(f)
-            self.details["Name"] = name
-            if name == "onMetaData":
-                self.details["Type"] = "Metadata"
-                self.details["Metadata"] = value
-            else:
-                self.details["Value"] = value
-        except Exception as e:
-            self.details["Parse Error"] = str(e)
-
-    def get_type_name(self) -> str:
-        return self.TAG_TYPES.get(self.tag_type, f"Unknown ({self.tag_type})")
-
-    def get_display_info(self) -> Dict[str, Any]:
-        info = {"Offset": f"0x{self.offset:08X}", "Type": self.get_type_name(),
-                "Size": self.data_size, "Timestamp": f"{self.timestamp} ms"}
-        if self.analysis:
-            info["Analysis"] = self.analysis
-        info["Details"] = self.details
-        return info
-
-class FLVFile:
-    def __init__(self, file_path: str):
-        self.file_path = file_path
-        self.file_name = os.path.basename(file_path)
-        self.header, self.tags, self.metadata = {}, [], {}
-        self._parse()
-        self._analyze_tags()
-
-    def _parse(self):
-        with open(self.file_path, 'rb') as f:
-            header_data = f.read(9)
-            if len(header_data) < 9 or header_data[0:3] != b'FLV':
-                raise ValueError("Invalid FLV file")
-            self.header["Version"] = header_data[3]
-            flags = header_data[4]
-            self.header["HasVideo"], self.header["HasAudio"] = bool(flags & 1), bool(flags & 4)
-            self.header["HeaderSize"] = struct.unpack(">I", header_data[5:9])[0]
-            f.seek(self.header["HeaderSize"])
-            f.read(4)
-            
-            temp_offset = self.header["HeaderSize"] + 4
-            while True:
-                tag_header = f.read(11)
-                if len(tag_header) < 11: break
-                tag_type = tag_header[0]
-                data_size = (tag_header[1] << 16) | (tag_header[2] << 8) | tag_header[3]
-                if tag_type == FLVTag.SCRIPT:
-                    tag_data = tag_header + f.read(data_size)
-                    tag = FLVTag(temp_offset, tag_data, {})
-                    if tag.details.get("Name") == "onMetaData":
-                        self.metadata = tag.details.get("Metadata", {})
-                        break
-                else:
-                    f.seek(data_size + 4, 1)
-                temp_offset += 11 + data_size + 4
-
-            f.seek(self.header["HeaderSize"] + 4)
-            offset = self.header["HeaderSize"] + 4
-            while True:
-                tag_header = f.read(11)
-                if len(tag_header) < 11: break
-                data_size = (tag_header[1] << 16) | (tag_header[2] << 8) | tag_header[3]
-                tag_data = tag_header + f.read(data_size)
-                self.tags.append(FLVTag(offset, tag_data, self.metadata))
-                f.read(4)
-                offset += 11 + data_size + 4
-
-    def _analyze_tags(self):
-        framerate = self.metadata.get('framerate')
-        if framerate and framerate > 0:
-            video_tags = [t for t in self.tags if t.tag_type == FLVTag.VIDEO]
-            expected_interval = 1000 / framerate
-            threshold = expected_interval * 2
-            for i in range(1, len(video_tags)):
-                prev_tag, curr_tag = video_tags[i-1], video_tags[i]
-                gap = curr_tag.timestamp - prev_tag.timestamp
-                if gap > threshold:
-                    dropped_frames = round(gap / expected_interval) - 1
-                    curr_tag.analysis['Warning'] = f"视频时间戳跳跃 {gap}ms (预期值 ~{expected_interval:.1f}ms)，可能丢失 {dropped_frames} 帧。"
-                    curr_tag.analysis['Reason'] = "可能原因：推流端性能不足、网络抖动丢包、编码器延迟。"
-
-        audio_tags = [t for t in self.tags if t.tag_type == FLVTag.AUDIO]
-        if len(audio_tags) > 10:
-            gaps = [audio_tags[i].timestamp - audio_tags[i-1].timestamp for i in range(1, len(audio_tags))]
-            common_gap = Counter(g for g in gaps if g > 0).most_common(1)
-            if common_gap:
-                expected_interval = common_gap[0][0]
-                threshold = expected_interval * 2.5
-                for i in range(1, len(audio_tags)):
-                    prev_tag, curr_tag = audio_tags[i-1], audio_tags[i]
-                    gap = curr_tag.timestamp - prev_tag.timestamp
-                    if gap > threshold:
-                        dropped_packets = round(gap / expected_interval) - 1
-                        curr_tag.analysis['Warning'] = f"音频时间戳跳跃 {gap}ms (预期值 ~{expected_interval}ms)，可能丢失 {dropped_packets} 个音频包。"
-                        curr_tag.analysis['Reason'] = "可能原因：推流端音频采集问题、网络抖动、服务器处理延迟。"
-
-    def get_header_info(self) -> Dict[str, Any]:
-        return {"File": self.file_name, **self.header}
-
-class FLVParserGUI:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("FLV文件解析与工具集")
-        self.root.geometry("1200x800")
-        self.flv_file = None
-        self._create_widgets()
-        self._setup_layout()
-
-    def _create_widgets(self):
-        self.menu_bar = tk.Menu(self.root)
-        self.root.config(menu=self.menu_bar)
-        file_menu = tk.Menu(self.menu_bar, tearoff=0)
-        file_menu.add_command(label="打开FLV文件", command=self._open_file)
-        file_menu.add_separator()
-        file_menu.add_command(label="退出", command=self.root.quit)
-        self.menu_bar.add_cascade(label="文件", menu=file_menu)
-
-        self.toolbar_frame = ttk.Frame(self.root)
-        self.open_button = ttk.Button(self.toolbar_frame, text="打开FLV文件", command=self._open_file)
-        self.report_button = ttk.Button(self.toolbar_frame, text="丢帧分析报告", command=self._show_analysis_report, state=tk.DISABLED)
-        self.extract_button = ttk.Button(self.toolbar_frame, text="分离音视频", command=self._extract_streams, state=tk.DISABLED)
-        
-        self.main_paned = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
-        
-        self.tree_frame = ttk.Frame(self.main_paned)
-        self.tree = ttk.Treeview(self.tree_frame, selectmode=tk.BROWSE)
-        self.tree.heading("#0", text="FLV结构", anchor=tk.W)
-        self.tree.tag_configure('warning', foreground='red')
-        self.tree_scrollbar_y = ttk.Scrollbar(self.tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=self.tree_scrollbar_y.set)
-        
-        self.right_pane = ttk.PanedWindow(self.main_paned, orient=tk.VERTICAL)
-        self.info_frame = ttk.Frame(self.right_pane)
-        self.file_info_labelframe = ttk.LabelFrame(self.info_frame, text="文件信息")
-        self.file_info_text = tk.Text(self.file_info_labelframe, wrap=tk.WORD, height=10, state=tk.DISABLED)
-        self.file_info_text.bind("<Key>", lambda e: "break") # Make read-only but allow copy
-        
-        self.details_frame = ttk.Frame(self.right_pane)
-        self.details_labelframe = ttk.LabelFrame(self.details_frame, text="标签详情")
-        self.details_text = tk.Text(self.details_labelframe, wrap=tk.WORD, state=tk.DISABLED)
-        self.copy_button = ttk.Button(self.details_labelframe, text="复制详情", command=self._copy_details)
-        
-        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
-
-    def _setup_layout(self):
-        self.toolbar_frame.pack(fill=tk.X, padx=5, pady=5)
-        self.open_button.pack(side=tk.LEFT, padx=5)
-        self.report_button.pack(side=tk.LEFT, padx=5)
-        self.extract_button.pack(side=tk.LEFT, padx=5)
-        
-        self.main_paned.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        self.main_paned.add(self.tree_frame, weight=2)
-        self.tree_scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.pack(fill=tk.BOTH, expand=True)
-        
-        self.main_paned.add(self.right_pane, weight=3)
-        self.right_pane.add(self.info_frame, weight=1)
-        self.file_info_labelframe.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.file_info_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        self.right_pane.add(self.details_frame, weight=3)
-        self.details_labelframe.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.copy_button.pack(side=tk.RIGHT, anchor=tk.SE, padx=5, pady=5)
-        self.details_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-
-    def _open_file(self):
-        file_path = filedialog.askopenfilename(title="选择FLV文件", filetypes=[("FLV文件", "*.flv")])
-        if not file_path: return
-        try:
-            self.flv_file = FLVFile(file_path)
-            self._update_file_info()
-            self._populate_tree()
-            self.report_button.config(state=tk.NORMAL)
-            self.extract_button.config(state=tk.NORMAL)
-        except Exception as e:
-            messagebox.showerror("错误", f"解析文件时出错: {e}")
-            self.report_button.config(state=tk.DISABLED)
-            self.extract_button.config(state=tk.DISABLED)
-
-    def _update_file_info(self):
-        self.file_info_text.config(state=tk.NORMAL)
-        self.file_info_text.delete(1.0, tk.END)
-        
-        # --- Basic FLV Header Info ---
-        info = self.flv_file.get_header_info()
-        self.file_info_text.insert(tk.END, "--- FLV 基础信息 ---\n")
-        for key, value in info.items():
-            self.file_info_text.insert(tk.END, f"{key}: {value}\n")
-
-        # --- File System Info ---
-        try:
-            stat = os.stat(self.flv_file.file_path)
-            size_mb = stat.st_size / (1024 * 1024)
-            creation_time = datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S')
-            modification_time = datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
-            
-            self.file_info_text.insert(tk.END, "\n--- 文件系统信息 ---\n")
-            self.file_info_text.insert(tk.END, f"文件大小: {size_mb:.2f} MB\n")
-            self.file_info_text.insert(tk.END, f"创建时间: {creation_time}\n")
-            self.file_info_text.insert(tk.END, f"修改时间: {modification_time}\n")
-        except Exception:
-            pass # Ignore if file stat fails
-
-        # --- Media Duration from Metadata ---
-        duration = self.flv_file.metadata.get('duration')
-        if duration:
-            minutes, seconds = divmod(duration, 60)
-            self.file_info_text.insert(tk.END, "\n--- 媒体信息 ---\n")
-            self.file_info_text.insert(tk.END, f"媒体时长: {int(minutes):02d}:{seconds:05.2f}\n")
-
-        self.file_info_text.config(state=tk.DISABLED)
-
-    def _populate_tree(self):
-        for item in self.tree.get_children(): self.tree.delete(item)
-        header_node = self.tree.insert("", tk.END, text="FLV Header", open=True)
-        for key, value in self.flv_file.get_header_info().items():
-            self.tree.insert(header_node, tk.END, text=f"{key}: {value}")
-        
-        tags_node = self.tree.insert("", tk.END, text="FLV Tags", open=True)
-        for i, tag in enumerate(self.flv_file.tags):
-            info = tag.get_display_info()
-            tag_style = ('warning',) if 'Analysis' in info else ()
-            tag_node = self.tree.insert(tags_node, tk.END, text=f"Tag {i+1}: {info['Type']} @ {info['Timestamp']}", values=("tag", i), tags=tag_style)
-            
-            if info.get("Analysis"):
-                self.tree.insert(tag_node, tk.END, text=f"Analysis: {info['Analysis']['Warning']}", tags=('warning',))
-            
-            self.tree.insert(tag_node, tk.END, text=f"Offset: {info['Offset']}")
-            self.tree.insert(tag_node, tk.END, text=f"Size: {info['Size']}")
-            
-            if info["Details"]:
-                details_node = self.tree.insert(tag_node, tk.END, text="Details")
-                self._populate_details_tree(details_node, info["Details"])
-
-    def _populate_details_tree(self, parent, details):
-        for key, value in details.items():
-            if isinstance(value, dict):
-                node = self.tree.insert(parent, tk.END, text=str(key))
-                self._populate_details_tree(node, value)
-            else:
-                self.tree.insert(parent, tk.END, text=f"{key}: {value}")
-
-    def _on_tree_select(self, event):
-        selected_item = self.tree.selection()
-        if not selected_item: return
-        item_values = self.tree.item(selected_item[0], "values")
-        self.details_text.config(state=tk.NORMAL)
-        self.details_text.delete(1.0, tk.END)
-        if len(item_values) >= 2 and item_values[0] == "tag":
-            tag_index = int(item_values[1])
-            tag = self.flv_file.tags[tag_index]
-            self._format_details_text(tag.get_display_info())
-        self.details_text.config(state=tk.DISABLED)
-
-    def _format_details_text(self, details, indent=0):
-        prefix = "  " * indent
-        for key, value in details.items():
-            if isinstance(value, dict):
-                self.details_text.insert(tk.END, f"{prefix}{key}:\n")
-                self._format_details_text(value, indent + 1)
-            else:
-                self.details_text.insert(tk.END, f"{prefix}{key}: {value}\n")
-
-    def _copy_details(self):
-        content = self.details_text.get(1.0, tk.END).strip()
-        if content:
-            self.root.clipboard_clear()
-            self.root.clipboard_append(content)
-            messagebox.showinfo("成功", "标签详情已复制到剪贴板！")
-
-    def _show_analysis_report(self):
-        if not self.flv_file: return
-        
-        report_window = tk.Toplevel(self.root)
-        report_window.title("丢帧分析报告")
-        report_window.geometry("800x600")
-        
-        report_text = tk.Text(report_window, wrap=tk.WORD, font=("Courier", 11))
-        scrollbar = ttk.Scrollbar(report_window, orient=tk.VERTICAL, command=report_text.yview)
-        report_text.configure(yscrollcommand=scrollbar.set)
-        
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        report_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        meta = self.flv_file.metadata
-        report_text.insert(tk.END, "--- 媒体信息参数 ---\n")
-        meta_table = [
-            ("参数名", "参数值"),("视频宽度", meta.get('width', 'N/A')),("视频高度", meta.get('height', 'N/A')),
-            ("视频帧率", meta.get('framerate', 'N/A')),("视频码率(kbps)", meta.get('videodatarate', 'N/A')),
-            ("视频编码", FLVTag.VIDEO_CODECS.get(meta.get('videocodecid'), 'N/A')),("音频采样率(Hz)", meta.get('audiosamplerate', 'N/A')),
-            ("音频声道", "双声道" if meta.get('stereo') else "单声道"),("音频码率(kbps)", meta.get('audiodatarate', 'N/A')),
-            ("音频编码", FLVTag.AUDIO_FORMATS.get(meta.get('audiocodecid'), 'N/A')),
-        ]
-        
-        col_widths = [max(len(str(item[i])) for item in meta_table) for i in range(2)]
-        header = f"{'参数名':<{col_widths[0]}} | {'参数值':<{col_widths[1]}}\n"
-        separator = "-" * (col_widths[0] + col_widths[1] + 3) + "\n"
-        report_text.insert(tk.END, header)
-        report_text.insert(tk.END, separator)
-        for name, value in meta_table[1:]:
-            report_text.insert(tk.END, f"{str(name):<{col_widths[0]}} | {str(value):<{col_widths[1]}}\n")
-
-        report_text.insert(tk.END, "\n\n--- 时间戳跳跃分析 ---\n")
-        problematic_tags = [ (i, tag) for i, tag in enumerate(self.flv_file.tags) if tag.analysis ]
-        
-        if not problematic_tags:
-            report_text.insert(tk.END, "未检测到明显的时间戳跳跃或丢帧问题。")
-        else:
-            report_text.insert(tk.END, f"检测到 {len(problematic_tags)} 个有问题的标签:\n\n")
-            for i, tag in problematic_tags:
-                info = tag.get_display_info()
-                report_text.insert(tk.END, f"标签 #{i+1} ({info['Type']} @ {info['Timestamp']}):\n")
-                report_text.insert(tk.END, f"  - 警告: {info['Analysis']['Warning']}\n")
-                report_text.insert(tk.END, f"  - 参考: {info['Analysis']['Reason']}\n\n")
-        
-        report_text.config(state=tk.DISABLED)
-
-    def _get_ffmpeg_path(self):
-        """
-        动态获取 ffmpeg 的路径。
-        如果是在 PyInstaller 打包的环境中，则返回相对于 _MEIPASS 的路径。
-        否则，直接返回 'ffmpeg'，依赖系统 PATH。
-        """
-        if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
-            # 在 PyInstaller 打包的应用中
-            base_path = sys._MEIPASS
-            ffmpeg_executable = 'ffmpeg.exe' if sys.platform == 'win32' else 'ffmpeg'
-            return os.path.join(base_path, ffmpeg_executable)
-        else:
-            # 在正常的开发环境中
-            return 'ffmpeg'
-
-    def _check_ffmpeg(self):
-        ffmpeg_path = self._get_ffmpeg_path()
-        try:
-            # 使用获取到的路径执行命令
-            subprocess.run([ffmpeg_path, "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            return True
-        except (FileNotFoundError, subprocess.CalledProcessError):
-            return False
-
-    def _extract_streams(self):
-        if not self.flv_file: return
-
-        if not self._check_ffmpeg():
-            messagebox.showerror("错误", "未在本机或应用包中找到 FFmpeg。\n请确保已安装 FFmpeg 并将其添加到系统路径，或确保它已随应用正确打包。")
-            return
-
-        save_dir = filedialog.askdirectory(initialdir=os.path.expanduser("~/Desktop"), title="选择保存目录")
-        if not save_dir: return
-
-        ffmpeg_path = self._get_ffmpeg_path()
-        input_file = self.flv_file.file_path
-        base_name = os.path.splitext(self.flv_file.file_name)[0]
-        output_video = os.path.join(save_dir, f"{base_name}_video.mp4")
-        output_audio = os.path.join(save_dir, f"{base_name}_audio.aac")
-
-        try:
-            # 使用获取到的路径执行命令
-            subprocess.run([ffmpeg_path, "-i", input_file, "-c:v", "copy", "-an", "-y", output_video], check=True)
-            subprocess.run([ffmpeg_path, "-i", input_file, "-c:a", "copy", "-vn", "-y", output_audio], check=True)
-            messagebox.showinfo("成功", f"音视频已成功分离到:\n{save_dir}")
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("FFmpeg 错误", f"执行FFmpeg命令时出错:\n{e}")
-        except Exception as e:
-            messagebox.showerror("错误", f"分离文件时出错:\n{e}")
-
-def main():
-    root = tk.Tk()
-    app = FLVParserGUI(root)
-    root.mainloop()
-
-if __name__ == "__main__":
-    main()
-
-
+import struct
+import os
+import posixpath
+import math
+from fractions import Fraction
+from decimal import Decimal
+import bisect
+import mmap
+import sys # 导入 sys 模块
+try:
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox, simpledialog
+except ImportError: # 无图形界面的服务器上仍可使用命令行功能
+    tk = ttk = filedialog = messagebox = simpledialog = None
+from typing import Dict, List, Any, Tuple, Optional, IO, Iterator, Callable
+from collections import Counter, OrderedDict
+from array import array
+import subprocess
+import urllib.parse
+import email.utils
+import asyncio
+import argparse
+import csv
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import threading
+import queue
+import errno
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timezone
+from contextlib import contextmanager, nullcontext
+import io
+
+try:
+    import numpy as np # 可选依赖，用于向量化查询与时间戳分析
+except ImportError:
+    np = None
+
+# --- AMF0 Parsing Utilities ---
+
+_U16 = struct.Struct('>H')
+_U32 = struct.Struct('>I')
+_DOUBLE = struct.Struct('>d')
+_DATE = struct.Struct('>dh')
+
+class AMFTruncatedError(ValueError):
+    """AMF 数据在值的中途结束。"""
+
+class AMFTypedObject(dict):
+    """AMF0 Typed Object / 带类名的 AMF3 Object：属性按字典访问，类名保存在 class_name。"""
+    def __init__(self, class_name: str, *args):
+        super().__init__(*args)
+        self.class_name = class_name
+
+def _amf_date(ms: float) -> Any:
+    try:
+        return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return ms
+
+class AMF0Decoder:
+    """
+    在 bytes / memoryview 上用整数游标和 struct.unpack_from 解码 AMF0，
+    覆盖全部 AMF0 类型（含引用、Date、Long String、Typed Object、XML）以及切换到 AMF3 的 0x11 标记。
+    数据提前结束时，Object / ECMA Array 返回已解析的部分；遇到保留或未知类型时抛出 ValueError。
+    """
+    def __init__(self, data: bytes, pos: int = 0):
+        # memoryview 先转成 bytes（一次拷贝），之后字符串切片可以直接 decode
+        self.data = data if isinstance(data, bytes) else bytes(data)
+        self.pos = pos
+        self.end = len(data)
+        self._references: List[Any] = [] # Object / ECMA Array / Strict Array / Typed Object
+
+    def decode(self) -> Any:
+        try:
+            return self._decode()
+        except (struct.error, IndexError):
+            raise AMFTruncatedError("AMF0 data truncated") from None
+
+    def read_string(self, long: bool = False) -> str:
+        data, pos = self.data, self.pos
+        if long:
+            length, pos = _U32.unpack_from(data, pos)[0], pos + 4
+        else:
+            length, pos = (data[pos] << 8) | data[pos+1], pos + 2
+        end = pos + length
+        if end > self.end:
+            raise AMFTruncatedError("AMF0 data truncated")
+        self.pos = end
+        return data[pos:end].decode('utf-8', 'replace')
+
+    def _read_properties(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        # 读到 0x00 0x00 0x09 结束标记为止；数据不完整时保留已读出的属性，游标停在不完整的属性之前
+        data, data_end = self.data, self.end
+        pos = self.pos
+        try:
+            while True:
+                pos = self.pos
+                length = (data[pos] << 8) | data[pos+1]
+                if length == 0 and data[pos+2] == 9:
+                    self.pos = pos + 3
+                    return obj
+                key_end = pos + 2 + length
+                if key_end >= data_end: break
+                self.pos = key_end
+                obj[data[pos+2:key_end].decode('utf-8', 'replace')] = self._decode()
+        except (struct.error, IndexError, AMFTruncatedError):
+            self.pos = pos
+        return obj
+
+    def _read_number_array(self, count: int) -> Optional[List[float]]:
+        # keyframes 等大数组几乎都是连续的 Number，批量解出以避免逐个调用
+        size = count * 9
+        if self.pos + size > self.end: return None
+        chunk = self.data[self.pos:self.pos+size]
+        if chunk[::9] != bytes(count): return None
+        values = list(struct.unpack('>' + 'xd' * count, chunk))
+        self.pos += size
+        return values
+
+    def _decode(self) -> Any:
+        data, pos = self.data, self.pos
+        marker = data[pos]
+        pos += 1
+        if marker == 0: # Number
+            self.pos = pos + 8
+            return _DOUBLE.unpack_from(data, pos)[0]
+        if marker == 2: # String
+            length = (data[pos] << 8) | data[pos+1]
+            end = pos + 2 + length
+            if end > self.end: raise AMFTruncatedError("AMF0 data truncated")
+            self.pos = end
+            return data[pos+2:end].decode('utf-8', 'replace')
+        if marker == 1: # Boolean
+            self.pos = pos + 1
+            return data[pos] != 0
+        self.pos = pos
+        if marker == 3: # Object
+            obj = {}
+            self._references.append(obj)
+            return self._read_properties(obj)
+        if marker == 8: # ECMA Array，计数字段不可靠，以结束标记为准
+            if pos + 4 > self.end: raise AMFTruncatedError("AMF0 data truncated")
+            self.pos = pos + 4
+            arr = {}
+            self._references.append(arr)
+            return self._read_properties(arr)
+        if marker == 10: # Strict Array
+            count = _U32.unpack_from(data, pos)[0]
+            self.pos = pos + 4
+            arr = []
+            self._references.append(arr)
+            numbers = self._read_number_array(count) if count > 8 else None
+            if numbers is not None:
+                arr.extend(numbers)
+            else:
+                for _ in range(count):
+                    arr.append(self._decode())
+            return arr
+        if marker in (5, 6, 13): # Null / Undefined / Unsupported
+            return None
+        if marker == 7: # Reference
+            ref = _U16.unpack_from(data, pos)[0]
+            self.pos = pos + 2
+            if ref >= len(self._references):
+                raise ValueError(f"Invalid AMF0 reference: {ref}")
+            return self._references[ref]
+        if marker == 11: # Date: 毫秒时间戳 + 时区（按规范应为 0，忽略）
+            ms = _DATE.unpack_from(data, pos)[0]
+            self.pos = pos + 10
+            return _amf_date(ms)
+        if marker in (12, 15): # Long String / XML Document
+            return self.read_string(long=True)
+        if marker == 16: # Typed Object
+            obj = AMFTypedObject(self.read_string())
+            self._references.append(obj)
+            return self._read_properties(obj)
+        if marker == 17: # AVM+：后续值使用 AMF3 编码
+            decoder = AMF3Decoder(data, pos)
+            value = decoder.decode()
+            self.pos = decoder.pos
+            return value
+        raise ValueError(f"Unsupported AMF0 type marker: {marker}")
+
+class AMF3Decoder:
+    """AMF3 解码器（字符串、对象、Traits 三张引用表），用于 AMF0 中的 AVM+ 切换标记。"""
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos
+        self.end = len(data)
+        self._strings: List[str] = []
+        self._objects: List[Any] = []
+        self._traits: List[Tuple[str, bool, List[str]]] = []
+
+    def _byte(self) -> int:
+        if self.pos >= self.end:
+            raise AMFTruncatedError("AMF3 data truncated")
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def _bytes(self, size: int) -> bytes:
+        if self.pos + size > self.end:
+            raise AMFTruncatedError("AMF3 data truncated")
+        self.pos += size
+        return self.data[self.pos - size:self.pos]
+
+    def read_u29(self) -> int:
+        value = 0
+        for _ in range(3):
+            b = self._byte()
+            value = (value << 7) | (b & 0x7F)
+            if not b & 0x80: return value
+        return (value << 8) | self._byte()
+
+    def read_int(self) -> int:
+        value = self.read_u29()
+        return value - (1 << 29) if value & 0x10000000 else value
+
+    def read_string(self) -> str:
+        header = self.read_u29()
+        if not header & 1:
+            return self._strings[header >> 1]
+        value = str(self._bytes(header >> 1), 'utf-8', 'replace')
+        if value: self._strings.append(value)
+        return value
+
+    def _read_reference(self) -> Tuple[bool, int]:
+        header = self.read_u29()
+        if not header & 1:
+            return True, header >> 1
+        return False, header >> 1
+
+    def decode(self) -> Any:
+        marker = self._byte()
+        if marker in (0, 1): return None # undefined / null
+        if marker in (2, 3): return marker == 3 # false / true
+        if marker == 4: return self.read_int()
+        if marker == 5: return _DOUBLE.unpack_from(self._bytes(8))[0]
+        if marker == 6: return self.read_string()
+        if marker in (7, 11, 12): # XMLDocument / XML / ByteArray
+            is_ref, value = self._read_reference()
+            if is_ref: return self._objects[value]
+            data = self._bytes(value)
+            result = bytes(data) if marker == 12 else str(data, 'utf-8', 'replace')
+            self._objects.append(result)
+            return result
+        if marker == 8: # Date
+            is_ref, value = self._read_reference()
+            if is_ref: return self._objects[value]
+            result = _amf_date(_DOUBLE.unpack_from(self._bytes(8))[0])
+            self._objects.append(result)
+            return result
+        if marker == 9: # Array：关联部分非空时返回字典，稠密部分以 0..n-1 为键并入
+            is_ref, count = self._read_reference()
+            if is_ref: return self._objects[count]
+            assoc, ref = {}, len(self._objects)
+            self._objects.append(assoc)
+            while True:
+                key = self.read_string()
+                if not key: break
+                assoc[key] = self.decode()
+            dense = [self.decode() for _ in range(count)]
+            if not assoc:
+                self._objects[ref] = dense
+                return dense
+            assoc.update((str(i), v) for i, v in enumerate(dense))
+            return assoc
+        if marker == 10: # Object
+            is_ref, header = self._read_reference()
+            if is_ref: return self._objects[header]
+            if header & 1 == 0: # Traits 引用
+                class_name, dynamic, members = self._traits[header >> 1]
+            else:
+                if header & 2:
+                    raise ValueError("Externalizable AMF3 objects are not supported")
+                class_name, dynamic = self.read_string(), bool(header & 4)
+                members = [self.read_string() for _ in range(header >> 3)]
+                self._traits.append((class_name, dynamic, members))
+            obj = AMFTypedObject(class_name) if class_name else {}
+            self._objects.append(obj)
+            for member in members:
+                obj[member] = self.decode()
+            if dynamic:
+                while True:
+                    key = self.read_string()
+                    if not key: break
+                    obj[key] = self.decode()
+            return obj
+        if marker in (13, 14, 15, 16): # Vector<int> / <uint> / <Number> / <Object>
+            is_ref, count = self._read_reference()
+            if is_ref: return self._objects[count]
+            self._byte() # fixed-length 标记
+            if marker == 16: self.read_string() # 元素类型名
+            fmt = {13: '>i', 14: '>I', 15: '>d'}.get(marker)
+            if fmt is None:
+                result = []
+                self._objects.append(result)
+                result.extend(self.decode() for _ in range(count))
+                return result
+            size = struct.calcsize(fmt)
+            result = [struct.unpack_from(fmt, self._bytes(size))[0] for _ in range(count)]
+            self._objects.append(result)
+            return result
+        if marker == 17: # Dictionary
+            is_ref, count = self._read_reference()
+            if is_ref: return self._objects[count]
+            self._byte() # weak-keys 标记
+            result = {}
+            self._objects.append(result)
+            for _ in range(count):
+                key = self.decode()
+                result[key if isinstance(key, (str, int, float, bool, type(None))) else str(key)] = self.decode()
+            return result
+        raise ValueError(f"Unsupported AMF3 type marker: {marker}")
+
+def decode_amf0(data: bytes, pos: int = 0) -> Tuple[Any, int]:
+    """从 data[pos:] 解码一个 AMF0 值，返回 (值, 下一个值的位置)。"""
+    decoder = AMF0Decoder(data, pos)
+    return decoder.decode(), decoder.pos
+
+def _encode_amf_string(value: str) -> bytes:
+    data = value.encode('utf-8')
+    return struct.pack('>H', len(data)) + data
+
+def _encode_amf_value(value: Any, ecma_array: bool = False) -> bytes:
+    """把 Python 值编码为 AMF0；dict 默认编码为 Object，ecma_array=True 时编码为 ECMA Array。"""
+    if isinstance(value, bool):
+        return b'\x01' + (b'\x01' if value else b'\x00')
+    if isinstance(value, (int, float)):
+        return b'\x00' + struct.pack('>d', value)
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        if len(data) > 0xFFFF: # Long String
+            return b'\x0c' + struct.pack('>I', len(data)) + data
+        return b'\x02' + struct.pack('>H', len(data)) + data
+    if value is None:
+        return b'\x05'
+    if isinstance(value, datetime):
+        return b'\x0b' + _DATE.pack(value.timestamp() * 1000, 0)
+    if isinstance(value, dict):
+        body = b''.join(_encode_amf_string(str(k)) + _encode_amf_value(v) for k, v in value.items()) + b'\x00\x00\x09'
+        return (b'\x08' + struct.pack('>I', len(value)) if ecma_array else b'\x03') + body
+    if isinstance(value, (list, tuple)):
+        return b'\x0a' + struct.pack('>I', len(value)) + b''.join(_encode_amf_value(v) for v in value)
+    return _encode_amf_value(str(value))
+
+class BitReader:
+    """
+    MSB 优先的位读取器。每次从数据中取 8 字节放入整数缓存，再用移位和掩码取位，
+    不再逐 bit 循环；read_ue / read_se 利用 int.bit_length 直接数出前导零个数。
+    """
+    __slots__ = ('data', 'byte_pos', '_cache', '_bits')
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.byte_pos = 0 # 下一次装入缓存的字节位置
+        self._cache = 0   # 尚未读取的位，只保留低 _bits 位
+        self._bits = 0
+
+    def _refill(self) -> None:
+        chunk = self.data[self.byte_pos:self.byte_pos+8]
+        if not chunk:
+            raise ValueError("Reading past end of data")
+        self.byte_pos += len(chunk)
+        self._cache = (self._cache << (len(chunk) * 8)) | int.from_bytes(chunk, 'big')
+        self._bits += len(chunk) * 8
+
+    def read(self, num_bits: int) -> int:
+        while self._bits < num_bits:
+            self._refill()
+        self._bits -= num_bits
+        value = self._cache >> self._bits
+        self._cache &= (1 << self._bits) - 1
+        return value
+
+    def skip(self, num_bits: int) -> None:
+        self.read(num_bits)
+
+    def read_flag(self) -> bool:
+        return self.read(1) == 1
+
+    def read_ue(self) -> int:
+        """无符号指数哥伦布码 ue(v)。"""
+        zeros = 0
+        while not self._cache:
+            zeros += self._bits
+            self._bits = 0
+            self._refill()
+        leading = self._bits - self._cache.bit_length()
+        self._bits -= leading
+        return self.read(zeros + leading + 1) - 1
+
+    def read_se(self) -> int:
+        """有符号指数哥伦布码 se(v)。"""
+        value = self.read_ue()
+        return (value + 1) >> 1 if value & 1 else -(value >> 1)
+
+    def bits_left(self) -> int:
+        return self._bits + (len(self.data) - self.byte_pos) * 8
+
+# --- H.264 ---
+
+H264_NALU_TYPES = {
+    1: "Non-IDR slice", 2: "Slice data A", 3: "Slice data B", 4: "Slice data C",
+    5: "IDR slice", 6: "SEI", 7: "SPS", 8: "PPS", 9: "AUD", 10: "End of seq.",
+    11: "End of stream", 12: "Filler", 13: "SPS ext.", 14: "Prefix NALU",
+    15: "Subset SPS", 19: "Aux. slice", 20: "Slice ext."
+}
+H264_PROFILES = {
+    44: "CAVLC 4:4:4 Intra", 66: "Baseline", 77: "Main", 83: "Scalable Baseline",
+    86: "Scalable High", 88: "Extended", 100: "High", 110: "High 10", 118: "Multiview High",
+    122: "High 4:2:2", 128: "Stereo High", 244: "High 4:4:4 Predictive"
+}
+H264_SLICE_TYPES = {0: "P", 1: "B", 2: "I", 3: "SP", 4: "SI"}
+H264_CHROMA_FORMATS = {0: "4:0:0", 1: "4:2:0", 2: "4:2:2", 3: "4:4:4"}
+# 这些 profile 的 SPS 带有 chroma_format_idc / 位深 / 缩放矩阵字段
+_H264_HIGH_PROFILES = {100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135}
+
+def _unescape_rbsp(nal: bytes) -> bytes:
+    """去掉防竞争字节（00 00 03 中的 03），得到 RBSP。"""
+    return nal.replace(b'\x00\x00\x03', b'\x00\x00') if b'\x00\x00\x03' in nal else nal
+
+def _skip_scaling_list(reader: BitReader, size: int) -> None:
+    last = next_scale = 8
+    for _ in range(size):
+        if next_scale:
+            next_scale = (last + reader.read_se()) & 0xFF
+        if next_scale:
+            last = next_scale
+
+def parse_h264_sps(nal: bytes) -> Dict[str, Any]:
+    """
+    解析 H.264 SPS（含 1 字节 NALU 头），返回 profile、level、分辨率、色度格式、位深，
+    以及 VUI 中的宽高比、色彩和时间信息（存在时）。数据不完整时抛出 ValueError。
+    """
+    reader = BitReader(_unescape_rbsp(bytes(nal[1:])))
+    profile_idc = reader.read(8)
+    constraints = reader.read(8)
+    sps: Dict[str, Any] = {"profile_idc": profile_idc, "constraint_flags": constraints,
+                           "level_idc": reader.read(8), "sps_id": reader.read_ue()}
+    chroma_format_idc, separate_planes = 1, False
+    bit_depth_luma = bit_depth_chroma = 8
+    if profile_idc in _H264_HIGH_PROFILES:
+        chroma_format_idc = reader.read_ue()
+        if chroma_format_idc == 3:
+            separate_planes = reader.read_flag()
+        bit_depth_luma = reader.read_ue() + 8
+        bit_depth_chroma = reader.read_ue() + 8
+        reader.skip(1) # qpprime_y_zero_transform_bypass_flag
+        if reader.read_flag(): # seq_scaling_matrix_present_flag
+            for i in range(8 if chroma_format_idc != 3 else 12):
+                if reader.read_flag():
+                    _skip_scaling_list(reader, 16 if i < 6 else 64)
+    sps.update(chroma_format_idc=chroma_format_idc, bit_depth_luma=bit_depth_luma,
+               bit_depth_chroma=bit_depth_chroma)
+    sps["log2_max_frame_num"] = reader.read_ue() + 4
+    poc_type = sps["pic_order_cnt_type"] = reader.read_ue()
+    if poc_type == 0:
+        reader.read_ue() # log2_max_pic_order_cnt_lsb_minus4
+    elif poc_type == 1:
+        reader.skip(1) # delta_pic_order_always_zero_flag
+        reader.read_se() # offset_for_non_ref_pic
+        reader.read_se() # offset_for_top_to_bottom_field
+        for _ in range(reader.read_ue()):
+            reader.read_se()
+    sps["max_num_ref_frames"] = reader.read_ue()
+    reader.skip(1) # gaps_in_frame_num_value_allowed_flag
+    width_mbs = reader.read_ue() + 1
+    height_map_units = reader.read_ue() + 1
+    frame_mbs_only = reader.read_flag()
+    sps["frame_mbs_only"] = frame_mbs_only
+    if not frame_mbs_only:
+        reader.skip(1) # mb_adaptive_frame_field_flag
+    reader.skip(1) # direct_8x8_inference_flag
+    crop = (0, 0, 0, 0)
+    if reader.read_flag(): # frame_cropping_flag: left, right, top, bottom
+        crop = (reader.read_ue(), reader.read_ue(), reader.read_ue(), reader.read_ue())
+    if chroma_format_idc == 0 or separate_planes:
+        crop_x, crop_y = 1, 2 - frame_mbs_only
+    else:
+        crop_x = 1 if chroma_format_idc == 3 else 2
+        crop_y = (2 if chroma_format_idc == 1 else 1) * (2 - frame_mbs_only)
+    sps["width"] = width_mbs * 16 - crop_x * (crop[0] + crop[1])
+    sps["height"] = (2 - frame_mbs_only) * height_map_units * 16 - crop_y * (crop[2] + crop[3])
+    if reader.read_flag(): # vui_parameters_present_flag
+        sps["vui"] = _parse_h264_vui(reader)
+    return sps
+
+def _parse_h264_vui(reader: BitReader) -> Dict[str, Any]:
+    # 只读到 timing_info 为止，后面的 HRD / 码流限制字段对分析没有用处
+    vui: Dict[str, Any] = {}
+    if reader.read_flag(): # aspect_ratio_info_present_flag
+        aspect_ratio_idc = reader.read(8)
+        vui["aspect_ratio_idc"] = aspect_ratio_idc
+        if aspect_ratio_idc == 255: # Extended_SAR
+            vui["sar"] = (reader.read(16), reader.read(16))
+    if reader.read_flag(): # overscan_info_present_flag
+        reader.skip(1)
+    if reader.read_flag(): # video_signal_type_present_flag
+        vui["video_format"] = reader.read(3)
+        vui["full_range"] = reader.read_flag()
+        if reader.read_flag(): # colour_description_present_flag
+            vui["colour_primaries"] = reader.read(8)
+            vui["transfer_characteristics"] = reader.read(8)
+            vui["matrix_coefficients"] = reader.read(8)
+    if reader.read_flag(): # chroma_loc_info_present_flag
+        reader.read_ue()
+        reader.read_ue()
+    if reader.read_flag(): # timing_info_present_flag
+        vui["num_units_in_tick"] = reader.read(32)
+        vui["time_scale"] = reader.read(32)
+        vui["fixed_frame_rate"] = reader.read_flag()
+        if vui["num_units_in_tick"]:
+            vui["frame_rate"] = vui["time_scale"] / (2 * vui["num_units_in_tick"])
+    return vui
+
+def parse_avc_decoder_config(record: bytes) -> Dict[str, Any]:
+    """解析 AVCDecoderConfigurationRecord，并展开其中第一个 SPS。"""
+    nal_length_size, sps_list, pps_list = _parse_avcc(record)
+    config: Dict[str, Any] = {
+        "version": record[0], "profile_idc": record[1], "profile_compatibility": record[2],
+        "level_idc": record[3], "nal_length_size": nal_length_size,
+        "sps_count": len(sps_list), "pps_count": len(pps_list),
+    }
+    if sps_list:
+        config["sps"] = parse_h264_sps(sps_list[0])
+    return config
+
+def _guess_nal_length_size(data: bytes) -> int:
+    # Tag 本身不知道序列头里的 NALU 长度字段大小；能恰好切分整个负载的那个就是
+    for size in (4, 2, 1, 3):
+        pos, end = 0, len(data)
+        while pos + size <= end:
+            length = int.from_bytes(data[pos:pos+size], 'big')
+            if not length: break
+            pos += size + length
+        if pos == end:
+            return size
+    return 4
+
+def h264_nalu_types(data: bytes, nal_length_size: int = 0) -> List[Tuple[int, Optional[str]]]:
+    """
+    列出一个 AVC NALU Tag 负载（去掉 5 字节 Tag 头后）中的 NALU 类型，
+    slice 附带从 slice header 读出的帧类型（I / P / B ...）。nal_length_size 为 0 时自动推断。
+    """
+    data = bytes(data)
+    if not nal_length_size:
+        nal_length_size = _guess_nal_length_size(data)
+    units: List[Tuple[int, Optional[str]]] = []
+    for nal in _iter_avcc_nalus(data, nal_length_size):
+        if not nal: continue
+        nal_type = nal[0] & 0x1F
+        slice_type = None
+        if nal_type in (1, 5) and len(nal) > 1:
+            try:
+                reader = BitReader(nal[1:9]) # slice header 起始两个 ue(v)，8 字节足够
+                reader.read_ue() # first_mb_in_slice
+                slice_type = H264_SLICE_TYPES.get(reader.read_ue() % 5)
+            except ValueError:
+                pass
+        units.append((nal_type, slice_type))
+    return units
+
+# --- H.265 / AV1 / VP9 (Enhanced FLV) ---
+
+H265_NALU_TYPES = {
+    0: "TRAIL_N", 1: "TRAIL_R", 2: "TSA_N", 3: "TSA_R", 4: "STSA_N", 5: "STSA_R",
+    6: "RADL_N", 7: "RADL_R", 8: "RASL_N", 9: "RASL_R", 16: "BLA_W_LP", 17: "BLA_W_RADL",
+    18: "BLA_N_LP", 19: "IDR_W_RADL", 20: "IDR_N_LP", 21: "CRA", 32: "VPS", 33: "SPS",
+    34: "PPS", 35: "AUD", 36: "EOS", 37: "EOB", 38: "FD", 39: "Prefix SEI", 40: "Suffix SEI"
+}
+H265_PROFILES = {1: "Main", 2: "Main 10", 3: "Main Still Picture", 4: "Range Extensions", 5: "High Throughput"}
+AV1_OBU_TYPES = {
+    1: "Sequence header", 2: "Temporal delimiter", 3: "Frame header", 4: "Tile group",
+    5: "Metadata", 6: "Frame", 7: "Redundant frame header", 8: "Tile list", 15: "Padding"
+}
+AV1_PROFILES = {0: "Main", 1: "High", 2: "Professional"}
+VP9_CHROMA_SUBSAMPLING = {0: "4:2:0 (vertical)", 1: "4:2:0 (colocated)", 2: "4:2:2", 3: "4:4:4"}
+
+def parse_hevc_sps(nal: bytes) -> Dict[str, Any]:
+    """解析 H.265 SPS（含 2 字节 NALU 头）开头到位深为止的字段，得到分辨率与色度格式。"""
+    reader = BitReader(_unescape_rbsp(bytes(nal[2:])))
+    reader.skip(4) # sps_video_parameter_set_id
+    max_sub_layers = reader.read(3) + 1
+    reader.skip(1) # sps_temporal_id_nesting_flag
+    reader.skip(88) # profile_tier_level 中的 general profile 部分
+    sps: Dict[str, Any] = {"level_idc": reader.read(8)}
+    sub_layers = [(reader.read_flag(), reader.read_flag()) for _ in range(max_sub_layers - 1)]
+    if sub_layers:
+        reader.skip(2 * (9 - max_sub_layers)) # reserved_zero_2bits 补齐到 8 个子层
+    for profile_present, level_present in sub_layers:
+        if profile_present: reader.skip(88)
+        if level_present: reader.skip(8)
+    reader.read_ue() # sps_seq_parameter_set_id
+    chroma_format_idc = reader.read_ue()
+    separate_planes = reader.read_flag() if chroma_format_idc == 3 else False
+    width, height = reader.read_ue(), reader.read_ue()
+    if reader.read_flag(): # conformance_window_flag: left, right, top, bottom
+        left, right, top, bottom = reader.read_ue(), reader.read_ue(), reader.read_ue(), reader.read_ue()
+        sub_width = 2 if chroma_format_idc in (1, 2) and not separate_planes else 1
+        sub_height = 2 if chroma_format_idc == 1 and not separate_planes else 1
+        width -= sub_width * (left + right)
+        height -= sub_height * (top + bottom)
+    sps.update(chroma_format_idc=chroma_format_idc, width=width, height=height,
+               bit_depth_luma=reader.read_ue() + 8, bit_depth_chroma=reader.read_ue() + 8)
+    return sps
+
+def parse_hevc_decoder_config(record: bytes) -> Dict[str, Any]:
+    """解析 HEVCDecoderConfigurationRecord (hvcC)，并展开其中第一个 SPS。"""
+    record = bytes(record)
+    if len(record) < 23 or record[0] != 1:
+        raise ValueError("Invalid HEVCDecoderConfigurationRecord")
+    config: Dict[str, Any] = {
+        "version": record[0], "profile_idc": record[1] & 0x1F, "tier": (record[1] >> 5) & 0x1,
+        "level_idc": record[12], "chroma_format_idc": record[16] & 0x3,
+        "bit_depth_luma": (record[17] & 0x7) + 8, "bit_depth_chroma": (record[18] & 0x7) + 8,
+        "nal_length_size": (record[21] & 0x3) + 1, "parameter_sets": {},
+    }
+    pos, sps = 23, None
+    for _ in range(record[22]):
+        nal_type = record[pos] & 0x3F
+        count = (record[pos+1] << 8) | record[pos+2]
+        pos += 3
+        for _ in range(count):
+            length = (record[pos] << 8) | record[pos+1]
+            if nal_type == 33 and sps is None:
+                sps = record[pos+2:pos+2+length]
+            pos += 2 + length
+        name = H265_NALU_TYPES.get(nal_type, f"Type {nal_type}")
+        config["parameter_sets"][name] = config["parameter_sets"].get(name, 0) + count
+    if sps:
+        config["sps"] = parse_hevc_sps(sps)
+    return config
+
+def h265_nalu_types(data: bytes, nal_length_size: int = 0) -> List[int]:
+    """列出一个 HEVC 编码帧负载中的 NALU 类型；nal_length_size 为 0 时自动推断。"""
+    data = bytes(data)
+    if not nal_length_size:
+        nal_length_size = _guess_nal_length_size(data)
+    return [(nal[0] >> 1) & 0x3F for nal in _iter_avcc_nalus(data, nal_length_size) if nal]
+
+def _read_leb128(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    for i in range(8):
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80: break
+    return value, pos
+
+def iter_av1_obus(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    """按 Low Overhead Bitstream Format 切分 AV1 数据，产出 (OBU 类型, OBU 负载)。"""
+    data = bytes(data)
+    pos, end = 0, len(data)
+    while pos < end:
+        header = data[pos]
+        pos += 2 if header & 0x4 else 1 # obu_extension_flag
+        if header & 0x2: # obu_has_size_field
+            size, pos = _read_leb128(data, pos)
+        else:
+            size = end - pos
+        yield (header >> 3) & 0xF, data[pos:pos+size]
+        pos += size
+
+def parse_av1_sequence_header(obu: bytes) -> Dict[str, Any]:
+    """解析 AV1 Sequence Header OBU 的负载，得到 profile、level、最大分辨率和（若有）帧率。"""
+    reader = BitReader(obu)
+    seq: Dict[str, Any] = {"seq_profile": reader.read(3)}
+    reader.skip(1) # still_picture
+    if reader.read_flag(): # reduced_still_picture_header
+        seq["seq_level_idx"] = reader.read(5)
+    else:
+        decoder_model_info = False
+        if reader.read_flag(): # timing_info_present_flag
+            num_units, time_scale = reader.read(32), reader.read(32)
+            ticks_per_picture = reader.read_ue() + 1 if reader.read_flag() else None # uvlc() 与 ue(v) 编码相同
+            if num_units and ticks_per_picture:
+                seq["frame_rate"] = time_scale / (num_units * ticks_per_picture)
+            decoder_model_info = reader.read_flag()
+            if decoder_model_info:
+                delay_length = reader.read(5) + 1
+                reader.skip(32 + 5 + 5) # num_units_in_decoding_tick 及两个长度字段
+        initial_display_delay = reader.read_flag()
+        for i in range(reader.read(5) + 1): # operating points
+            reader.skip(12) # operating_point_idc
+            level = reader.read(5)
+            if level > 7: reader.skip(1) # seq_tier
+            if i == 0: seq["seq_level_idx"] = level
+            if decoder_model_info and reader.read_flag():
+                reader.skip(2 * delay_length + 1)
+            if initial_display_delay and reader.read_flag():
+                reader.skip(4)
+    width_bits, height_bits = reader.read(4) + 1, reader.read(4) + 1
+    seq["width"] = reader.read(width_bits) + 1
+    seq["height"] = reader.read(height_bits) + 1
+    return seq
+
+def parse_av1_decoder_config(record: bytes) -> Dict[str, Any]:
+    """解析 AV1CodecConfigurationRecord (av1C)，并展开其后 configOBUs 中的 Sequence Header。"""
+    record = bytes(record)
+    if len(record) < 4 or not record[0] & 0x80:
+        raise ValueError("Invalid AV1CodecConfigurationRecord")
+    flags = record[2]
+    config: Dict[str, Any] = {
+        "version": record[0] & 0x7F, "seq_profile": record[1] >> 5, "seq_level_idx": record[1] & 0x1F,
+        "tier": flags >> 7, "bit_depth": (12 if flags & 0x20 else 10) if flags & 0x40 else 8,
+        "monochrome": bool(flags & 0x10), "chroma_subsampling": ((flags >> 3) & 0x1, (flags >> 2) & 0x1),
+    }
+    for obu_type, obu in iter_av1_obus(record[4:]):
+        if obu_type == 1:
+            config["sequence_header"] = parse_av1_sequence_header(obu)
+            break
+    return config
+
+def parse_vp9_decoder_config(record: bytes) -> Dict[str, Any]:
+    """解析 VPCodecConfigurationRecord（vpcC，包含 1 字节 version 和 3 字节 flags）。"""
+    record = bytes(record)
+    if len(record) < 12:
+        raise ValueError("Invalid VPCodecConfigurationRecord")
+    return {
+        "version": record[0], "profile": record[4], "level": record[5], "bit_depth": record[6] >> 4,
+        "chroma_subsampling": (record[6] >> 1) & 0x7, "full_range": bool(record[6] & 0x1),
+        "colour_primaries": record[7], "transfer_characteristics": record[8], "matrix_coefficients": record[9],
+    }
+
+def _hevc_config_details(config: Dict[str, Any]) -> Dict[str, Any]:
+    profile = config["profile_idc"]
+    details = {
+        "Version": config["version"],
+        "Profile": f"{H265_PROFILES.get(profile, 'Unknown')} ({profile})",
+        "Tier": "High" if config["tier"] else "Main",
+        "Level": f"{config['level_idc'] / 30:g}",
+        "Chroma Format": H264_CHROMA_FORMATS.get(config["chroma_format_idc"], "Unknown"),
+        "Bit Depth": f"{config['bit_depth_luma']} bit",
+        "NALU Length Size": f"{config['nal_length_size']} bytes",
+        "Parameter Sets": ", ".join(f"{name} {count}" for name, count in config["parameter_sets"].items()),
+    }
+    if "sps" in config:
+        details["Resolution"] = f"{config['sps']['width']}x{config['sps']['height']}"
+    return details
+
+def _av1_config_details(config: Dict[str, Any]) -> Dict[str, Any]:
+    level = config["seq_level_idx"]
+    if config["monochrome"]:
+        chroma = "4:0:0"
+    else:
+        chroma = {(1, 1): "4:2:0", (1, 0): "4:2:2", (0, 0): "4:4:4"}.get(config["chroma_subsampling"], "Unknown")
+    details = {
+        "Version": config["version"],
+        "Profile": f"{AV1_PROFILES.get(config['seq_profile'], 'Unknown')} ({config['seq_profile']})",
+        "Level": f"{2 + (level >> 2)}.{level & 3}" if level < 24 else f"Unknown ({level})",
+        "Tier": "High" if config["tier"] else "Main",
+        "Bit Depth": f"{config['bit_depth']} bit",
+        "Chroma Format": chroma,
+    }
+    seq = config.get("sequence_header")
+    if seq is not None:
+        details["Resolution"] = f"{seq['width']}x{seq['height']} (max)"
+        if "frame_rate" in seq:
+            details["Frame Rate (timing info)"] = f"{seq['frame_rate']:.3f} fps"
+    return details
+
+def _vp9_config_details(config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "Version": config["version"],
+        "Profile": config["profile"],
+        "Level": f"{config['level'] / 10:g}",
+        "Bit Depth": f"{config['bit_depth']} bit",
+        "Chroma Subsampling": VP9_CHROMA_SUBSAMPLING.get(config["chroma_subsampling"], "Unknown"),
+        "Full Range": config["full_range"],
+    }
+
+# codec -> (详情中的标题, 配置记录解析函数, 展示格式化函数)
+_VIDEO_CONFIG_PARSERS = {
+    12: ("HEVC Config", parse_hevc_decoder_config, _hevc_config_details),
+    13: ("AV1 Config", parse_av1_decoder_config, _av1_config_details),
+    14: ("VP9 Config", parse_vp9_decoder_config, _vp9_config_details),
+}
+
+AAC_AUDIO_OBJECT_TYPES = {
+    1: "AAC Main", 2: "AAC LC", 3: "AAC SSR", 4: "AAC LTP", 5: "SBR", 6: "AAC Scalable"
+}
+AAC_SAMPLING_FREQUENCIES = {
+    0: "96000 Hz", 1: "88200 Hz", 2: "64000 Hz", 3: "48000 Hz", 4: "44100 Hz",
+    5: "32000 Hz", 6: "24000 Hz", 7: "22050 Hz", 8: "16000 Hz", 9: "12000 Hz",
+    10: "11025 Hz", 11: "8000 Hz", 12: "7350 Hz"
+}
+AAC_CHANNEL_CONFIGURATIONS = {
+    1: "1 channel: C", 2: "2 channels: L, R", 3: "3 channels: C, L, R",
+    4: "4 channels: C, L, R, B", 5: "5 channels: C, L, R, SL, SR",
+    6: "6 channels: C, L, R, SL, SR, LFE", 7: "8 channels: C, L, R, SL, SR, BL, BR, LFE"
+}
+
+class FLVTag:
+    AUDIO, VIDEO, SCRIPT = 8, 9, 18
+    TAG_TYPES = {AUDIO: "Audio", VIDEO: "Video", SCRIPT: "Script Data"}
+    AUDIO_FORMATS = {
+        0: "LPCM", 1: "ADPCM", 2: "MP3", 3: "LPCM LE", 4: "Nellymoser 16kHz",
+        5: "Nellymoser 8kHz", 6: "Nellymoser", 7: "G.711 A-law", 8: "G.711 mu-law",
+        9: "reserved", 10: "AAC", 11: "Speex", 14: "MP3 8kHz", 15: "Device-specific",
+        # 以下不是传统 SoundFormat，只在 Enhanced FLV 中通过 FourCC 出现
+        16: "Opus", 17: "FLAC", 18: "AC-3", 19: "E-AC-3"
+    }
+    AUDIO_RATES = {0: "5.5kHz", 1: "11kHz", 2: "22kHz", 3: "44kHz"}
+    AUDIO_BITS = {0: "8-bit", 1: "16-bit"}
+    AUDIO_CHANNELS = {0: "Mono", 1: "Stereo"}
+    VIDEO_FRAME_TYPES = {
+        1: "Key frame", 2: "Inter frame", 3: "Disposable inter frame",
+        4: "Generated key frame", 5: "Video info/command frame"
+    }
+    VIDEO_CODECS = {
+        2: "Sorenson H.263", 3: "Screen video", 4: "On2 VP6",
+        5: "On2 VP6 with alpha", 6: "Screen video v2", 7: "AVC (H.264)",
+        12: "HEVC (H.265)", 13: "AV1", 14: "VP9"
+    }
+    # Enhanced FLV 的 FourCC 映射到上面的编号，索引中的 codec 列因此仍是一个字节
+    VIDEO_FOURCCS = {b'avc1': 7, b'hvc1': 12, b'av01': 13, b'vp09': 14}
+    AUDIO_FOURCCS = {b'mp4a': 10, b'.mp3': 2, b'Opus': 16, b'fLaC': 17, b'ac-3': 18, b'ec-3': 19}
+    EX_VIDEO_PACKET_TYPES = {
+        0: "SequenceStart", 1: "CodedFrames", 2: "SequenceEnd", 3: "CodedFramesX",
+        4: "Metadata", 5: "MPEG2TSSequenceStart", 6: "Multitrack", 7: "ModEx"
+    }
+    EX_AUDIO_PACKET_TYPES = {
+        0: "SequenceStart", 1: "CodedFrames", 2: "SequenceEnd",
+        4: "MultichannelConfig", 5: "Multitrack", 7: "ModEx"
+    }
+    MULTITRACK_TYPES = {0: "One track", 1: "Many tracks", 2: "Many tracks, many codecs"}
+
+    __slots__ = ('offset', 'tag_type', 'data_size', 'timestamp', 'stream_id', 'data',
+                 'total_size', 'analysis', '_global_metadata', '_details')
+
+    def __init__(self, offset: int, data: bytes, global_metadata: Dict[str, Any]):
+        # `data` may be bytes or a memoryview into an mmap; slicing a memoryview
+        # does not copy, so the payload stays in the page cache until it is used.
+        self.offset = offset
+        self.tag_type = data[0]
+        self.data_size = (data[1] << 16) | (data[2] << 8) | data[3]
+        self.timestamp = (data[4] << 16) | (data[5] << 8) | data[6] | (data[7] << 24)
+        self.stream_id = (data[8] << 16) | (data[9] << 8) | data[10]
+        self.data = memoryview(data)[11:11+self.data_size]
+        self.total_size = 11 + self.data_size + 4
+        self.analysis = {} # For frame drop analysis
+        self._global_metadata = global_metadata
+        self._details = None
+
+    @property
+    def details(self) -> Dict[str, Any]:
+        # Details are decoded on first access only, so building a tag list
+        # never touches payload bytes beyond the 11-byte tag header.
+        if self._details is None:
+            self._details = {}
+            if self.tag_type == FLVTag.AUDIO:
+                self._parse_audio_data(self._global_metadata)
+            elif self.tag_type == FLVTag.VIDEO:
+                self._parse_video_data()
+            elif self.tag_type == FLVTag.SCRIPT:
+                self._parse_script_data()
+        return self._details
+
+    def _parse_audio_data(self, meta: Dict[str, Any]):
+        if not self.data: return
+        flags = self.data[0]
+        sound_format = flags >> 4
+        if sound_format == 9: # ExAudioTagHeader
+            self._parse_ex_audio_data()
+            return
+        self.details["Format"] = self.AUDIO_FORMATS.get(sound_format, f"Unknown ({sound_format})")
+        self.details["Sample Size"] = self.AUDIO_BITS.get((flags >> 1) & 0x1, "Unknown")
+
+        if sound_format == 10 and len(self.data) > 1: # AAC
+            aac_packet_type = self.data[1]
+            self.details["AAC Packet Type"] = "AAC sequence header" if aac_packet_type == 0 else "AAC raw"
+            if aac_packet_type == 0 and len(self.data) > 3 and self._parse_asc(self.data[2:]):
+                return
+
+        if 'audiosamplerate' in meta:
+            self.details["Sample Rate"] = f"{int(meta['audiosamplerate'])} Hz (from onMetaData)"
+        else:
+            self.details["Sample Rate"] = f"{self.AUDIO_RATES.get((flags >> 2) & 0x3, 'Unknown')} (from Tag Header)"
+        
+        if 'stereo' in meta:
+            self.details["Channels"] = "Stereo (from onMetaData)" if meta['stereo'] else "Mono (from onMetaData)"
+        else:
+            self.details["Channels"] = f"{self.AUDIO_CHANNELS.get(flags & 0x1, 'Unknown')} (from Tag Header)"
+
+    def _parse_asc(self, asc: bytes) -> bool:
+        try:
+            reader = BitReader(asc)
+            obj_type = reader.read(5)
+            freq_idx = reader.read(4)
+            self.details["Audio Object Type"] = AAC_AUDIO_OBJECT_TYPES.get(obj_type, "Unknown")
+            if freq_idx == 15:
+                self.details["Sample Rate"] = f"{reader.read(24)} Hz (Explicit from ASC)"
+            else:
+                self.details["Sample Rate"] = f"{AAC_SAMPLING_FREQUENCIES.get(freq_idx, 'Unknown')} (from ASC)"
+            chan_cfg = reader.read(4)
+            self.details["Channels"] = f"{AAC_CHANNEL_CONFIGURATIONS.get(chan_cfg, 'Unknown')} (from ASC)"
+            return True
+        except Exception as e:
+            self.details["ASC Parse Error"] = str(e)
+            return False
+
+    def _parse_ex_audio_data(self):
+        data = self.data
+        try:
+            raw_type, multitrack, pos = _read_ex_header(data, 5)
+        except IndexError:
+            self.details["Parse Error"] = "Truncated ExAudioTagHeader"
+            return
+        self.details["Packet Type"] = self.EX_AUDIO_PACKET_TYPES.get(raw_type, f"Unknown ({raw_type})")
+        if multitrack is not None:
+            self.details["Multitrack"] = self.MULTITRACK_TYPES.get(multitrack, f"Unknown ({multitrack})")
+            if multitrack == 2: return
+        codec, packet_type, start = _audio_tag_header(data)
+        self.details["FourCC"] = bytes(data[pos:pos+4]).decode('latin-1')
+        self.details["Format"] = self.AUDIO_FORMATS.get(codec, "Unknown")
+        if multitrack is not None or packet_type != PACKET_SEQUENCE_START:
+            return
+        if codec == 10:
+            self._parse_asc(data[start:])
+        elif codec == 16 and bytes(data[start:start+8]) == b'OpusHead' and len(data) >= start + 16:
+            # OpusHead: 声道数 1 字节，pre-skip 2 字节，原始采样率 4 字节（小端）
+            self.details["Channels"] = f"{data[start+9]} (from OpusHead)"
+            rate = int.from_bytes(data[start+12:start+16], 'little')
+            self.details["Sample Rate"] = f"{rate} Hz (input, from OpusHead)"
+
+    def _parse_video_data(self):
+        if not self.data: return
+        flags = self.data[0]
+        if flags & 0x80: # ExVideoTagHeader
+            self._parse_ex_video_data()
+            return
+        frame_type, codec_id = (flags >> 4) & 0xF, flags & 0xF
+        self.details["Frame Type"] = self.VIDEO_FRAME_TYPES.get(frame_type, f"Unknown ({frame_type})")
+        self.details["Codec ID"] = self.VIDEO_CODECS.get(codec_id, f"Unknown ({codec_id})")
+        if codec_id in (7, 12) and len(self.data) > 4: # AVC，或沿用 AVC 封装的 HEVC 扩展 (CodecID 12)
+            avc_packet_type = self.data[1]
+            cts = _video_tag_header(self.data)[3] # SI24，与索引和时间戳分析中的 CTS 一致
+            label = "AVC" if codec_id == 7 else "HEVC"
+            self.details[f"{label} Packet Type"] = {0: "Seq. header", 1: "NALU", 2: "End of seq."}.get(avc_packet_type, "Unknown")
+            self.details["CompositionTime Offset"] = f"{cts} ms"
+            self._inspect_video_payload(codec_id, avc_packet_type, self.data[5:])
+
+    def _parse_ex_video_data(self):
+        data = self.data
+        frame_type, codec, packet_type, cts, start = _video_tag_header(data)
+        self.details["Frame Type"] = self.VIDEO_FRAME_TYPES.get(frame_type, f"Unknown ({frame_type})")
+        try:
+            raw_type, multitrack, pos = _read_ex_header(data, 6)
+        except IndexError:
+            self.details["Parse Error"] = "Truncated ExVideoTagHeader"
+            return
+        self.details["Packet Type"] = self.EX_VIDEO_PACKET_TYPES.get(raw_type, f"Unknown ({raw_type})")
+        if packet_type == PACKET_COMMAND:
+            if len(data) > pos:
+                self.details["Command"] = {0: "Start seek", 1: "End seek"}.get(data[pos], f"Unknown ({data[pos]})")
+            return
+        if multitrack is not None:
+            self.details["Multitrack"] = self.MULTITRACK_TYPES.get(multitrack, f"Unknown ({multitrack})")
+            if multitrack == 2: return
+        self.details["FourCC"] = bytes(data[pos:pos+4]).decode('latin-1')
+        self.details["Codec"] = self.VIDEO_CODECS.get(codec, "Unknown")
+        if multitrack is not None: return # 多轨负载按轨道拆分，这里不再深入
+        if raw_type == 1 and codec in (7, 12):
+            self.details["CompositionTime Offset"] = f"{cts} ms"
+        if packet_type == PACKET_METADATA: # AMF 编码的 colorInfo 等
+            decoder = AMF0Decoder(data[start:])
+            try:
+                name = decoder.decode()
+                self.details["Metadata"] = {str(name): decoder.decode()}
+            except ValueError as e:
+                self.details["Metadata Parse Error"] = str(e)
+            return
+        self._inspect_video_payload(codec, packet_type, data[start:])
+
+    def _inspect_video_payload(self, codec: int, packet_type: int, payload: bytes):
+        if packet_type == PACKET_SEQUENCE_START:
+            if codec == 7:
+                self._parse_avc_config(payload)
+            elif codec in _VIDEO_CONFIG_PARSERS:
+                label, parse, describe = _VIDEO_CONFIG_PARSERS[codec]
+                try:
+                    self.details[label] = describe(parse(payload))
+                except ValueError as e:
+                    self.details[f"{label} Parse Error"] = str(e)
+                except IndexError:
+                    self.details[f"{label} Parse Error"] = "Truncated configuration record"
+        elif packet_type == PACKET_CODED_FRAMES:
+            if codec == 7:
+                names = []
+                for nal_type, slice_type in h264_nalu_types(payload):
+                    name = H264_NALU_TYPES.get(nal_type, f"Type {nal_type}")
+                    names.append(f"{name} ({slice_type})" if slice_type else name)
+                self.details["NAL Units"] = ", ".join(names)
+            elif codec == 12:
+                self.details["NAL Units"] = ", ".join(
+                    H265_NALU_TYPES.get(t, f"Type {t}") for t in h265_nalu_types(payload))
+            elif codec == 13:
+                obus = []
+                try:
+                    for obu_type, _ in iter_av1_obus(payload):
+                        obus.append(AV1_OBU_TYPES.get(obu_type, f"Type {obu_type}"))
+                except IndexError:
+                    obus.append("(truncated)")
+                self.details["OBUs"] = ", ".join(obus)
+
+    def _parse_avc_config(self, record: bytes):
+        try:
+            config = parse_avc_decoder_config(record)
+        except ValueError as e:
+            self.details["AVC Config Parse Error"] = str(e)
+            return
+        except IndexError:
+            self.details["AVC Config Parse Error"] = "Truncated AVCDecoderConfigurationRecord"
+            return
+        profile = config["profile_idc"]
+        self.details["AVC Config"] = {
+            "Version": config["version"],
+            "Profile": f"{H264_PROFILES.get(profile, 'Unknown')} ({profile})",
+            "Level": f"{config['level_idc'] / 10:g}",
+            "NALU Length Size": f"{config['nal_length_size']} bytes",
+            "SPS / PPS": f"{config['sps_count']} / {config['pps_count']}",
+        }
+        sps = config.get("sps")
+        if sps is None: return
+        info = {
+            "Resolution": f"{sps['width']}x{sps['height']}",
+            "Chroma Format": H264_CHROMA_FORMATS.get(sps["chroma_format_idc"], "Unknown"),
+            "Bit Depth": f"{sps['bit_depth_luma']} bit",
+            "Scan": "Progressive" if sps["frame_mbs_only"] else "Interlaced",
+            "Ref Frames": sps["max_num_ref_frames"],
+        }
+        vui = sps.get("vui", {})
+        if "sar" in vui:
+            info["Sample Aspect Ratio"] = "%d:%d" % vui["sar"]
+        if "full_range" in vui:
+            info["Full Range"] = vui["full_range"]
+        if "frame_rate" in vui:
+            fixed = " (fixed)" if vui["fixed_frame_rate"] else ""
+            info["Frame Rate (VUI)"] = f"{vui['frame_rate']:.3f} fps{fixed}"
+        self.details["SPS"] = info
+
+    def _parse_script_data(self):
+        if not self.data: return
+        decoder = AMF0Decoder(self.data)
+        try:
+            name = decoder.decode()
+            value = decoder.decode()
+            self.details["Name"] = name
+            if name == "onMetaData":
+                self.details["Type"] = "Metadata"
+                self.details["Metadata"] = value
+            else:
+                self.details["Value"] = value
+        except Exception as e:
+            self.details["Parse Error"] = str(e)
+
+    def get_type_name(self) -> str:
+        return self.TAG_TYPES.get(self.tag_type, f"Unknown ({self.tag_type})")
+
+    def get_display_info(self) -> Dict[str, Any]:
+        info = {"Offset": f"0x{self.offset:08X}", "Type": self.get_type_name(),
+                "Size": self.data_size, "Timestamp": f"{self.timestamp} ms"}
+        if self.analysis:
+            info["Analysis"] = self.analysis
+        info["Details"] = self.details
+        return info
+
+def _parse_flv_header(header_data: bytes) -> Dict[str, Any]:
+    if len(header_data) < 9 or header_data[0:3] != b'FLV':
+        raise ValueError("Invalid FLV file")
+    flags = header_data[4]
+    return {"Version": header_data[3], "HasVideo": bool(flags & 1), "HasAudio": bool(flags & 4),
+            "HeaderSize": struct.unpack(">I", header_data[5:9])[0]}
+
+# 索引中 packet type 列的取值：传统 AVC/AAC 的 packet type 与 Enhanced FLV 的 PacketType 统一到同一套编号，
+# 没有 packet type 的传统编码记为 PACKET_CODED_FRAMES，因此“是否为媒体帧”只需看这一列
+PACKET_SEQUENCE_START, PACKET_CODED_FRAMES, PACKET_SEQUENCE_END, PACKET_METADATA = 0, 1, 2, 4
+PACKET_COMMAND = 0x10 # 视频命令帧（Frame Type 5），不携带媒体数据
+# CodedFramesX 即省略了 CTS 的 CodedFrames；MPEG2TSSequenceStart 也是一种序列头
+_EX_VIDEO_PACKET_ALIASES = {3: PACKET_CODED_FRAMES, 5: PACKET_SEQUENCE_START}
+
+def _read_ex_header(payload: bytes, multitrack_packet: int) -> Tuple[int, Optional[int], int]:
+    """
+    解析 ExVideoTagHeader / ExAudioTagHeader 中 FourCC 之前的部分：跳过 ModEx 扩展并展开 Multitrack。
+    返回 (实际的 PacketType, 多轨类型或 None, FourCC 所在位置)。多轨的 PacketType 音频为 5、视频为 6。
+    """
+    packet_type, pos, multitrack = payload[0] & 0xF, 1, None
+    while packet_type == 7: # ModEx: 数据长度 (UI8 + 1，为 256 时改用 UI16 + 1) + 数据 + 下一个 PacketType
+        size = payload[pos] + 1
+        pos += 1
+        if size == 256:
+            size = ((payload[pos] << 8) | payload[pos+1]) + 1
+            pos += 2
+        pos += size
+        packet_type = payload[pos] & 0xF
+        pos += 1
+    if packet_type == multitrack_packet:
+        multitrack, packet_type = payload[pos] >> 4, payload[pos] & 0xF
+        pos += 1
+    return packet_type, multitrack, pos
+
+def _video_tag_header(payload: bytes) -> Tuple[int, int, int, int, int]:
+    """
+    解析传统视频 Tag 头或 ExVideoTagHeader，返回 (frame type, codec, 索引用的 packet type, CTS, 编码数据起始位置)。
+    codec 为 FLVTag.VIDEO_CODECS 中的编号，未知 FourCC 记为 0。
+    """
+    flags = payload[0]
+    if not flags & 0x80:
+        frame_type, codec = flags >> 4, flags & 0xF
+        if frame_type == 5:
+            return frame_type, codec, PACKET_COMMAND, 0, 1
+        if codec in (7, 12):
+            if len(payload) < 5:
+                return frame_type, codec, payload[1] if len(payload) > 1 else PACKET_SEQUENCE_START, 0, len(payload)
+            cts = (payload[2] << 16) | (payload[3] << 8) | payload[4]
+            if cts & 0x800000: cts -= 0x1000000 # SI24
+            return frame_type, codec, payload[1], cts, 5
+        return frame_type, codec, PACKET_CODED_FRAMES, 0, 1
+    frame_type, packet_type = (flags >> 4) & 0x7, flags & 0xF
+    if packet_type < 6: # 常见情况：没有 ModEx / Multitrack，FourCC 紧跟在第一个字节之后
+        multitrack, pos = None, 1
+    else:
+        try:
+            packet_type, multitrack, pos = _read_ex_header(payload, 6)
+        except IndexError:
+            return frame_type, 0, packet_type, 0, len(payload)
+    if frame_type == 5 and packet_type != PACKET_METADATA:
+        return frame_type, 0, PACKET_COMMAND, 0, pos
+    normalized = _EX_VIDEO_PACKET_ALIASES.get(packet_type, packet_type)
+    if multitrack == 2: # ManyTracksManyCodecs: 每条轨道各自带 FourCC
+        return frame_type, 0, normalized, 0, pos
+    fourcc = payload[pos:pos+4]
+    codec = FLVTag.VIDEO_FOURCCS.get(fourcc if type(fourcc) is bytes else bytes(fourcc), 0)
+    pos += 4
+    if multitrack is not None:
+        return frame_type, codec, normalized, 0, pos + (1 if multitrack == 0 else 4) # 轨道号 (+ 轨道长度)
+    cts = 0
+    if packet_type == 1 and codec in (7, 12) and len(payload) >= pos + 3: # 只有 AVC/HEVC 的 CodedFrames 带 CTS
+        cts = (payload[pos] << 16) | (payload[pos+1] << 8) | payload[pos+2]
+        if cts & 0x800000: cts -= 0x1000000
+        pos += 3
+    return frame_type, codec, normalized, cts, pos
+
+def _audio_tag_header(payload: bytes) -> Tuple[int, int, int]:
+    """解析传统音频 Tag 头或 ExAudioTagHeader，返回 (codec, 索引用的 packet type, 编码数据起始位置)。"""
+    sound_format = payload[0] >> 4
+    if sound_format == 9:
+        try:
+            packet_type, multitrack, pos = _read_ex_header(payload, 5)
+        except IndexError:
+            return 0, payload[0] & 0xF, len(payload)
+        if multitrack == 2:
+            return 0, packet_type, pos
+        fourcc = payload[pos:pos+4]
+        codec = FLVTag.AUDIO_FOURCCS.get(fourcc if type(fourcc) is bytes else bytes(fourcc), 0)
+        pos += 4
+        if multitrack is not None:
+            pos += 1 if multitrack == 0 else 4
+        return codec, packet_type, pos
+    if sound_format == 10:
+        return sound_format, payload[1] if len(payload) > 1 else PACKET_SEQUENCE_START, 2
+    return sound_format, PACKET_CODED_FRAMES, 1
+
+def _metadata_codec_name(codec_id: Any, names: Dict[int, str], fourccs: Dict[bytes, int]) -> str:
+    """onMetaData 中 videocodecid / audiocodecid 的名称；Enhanced FLV 在这里写的是 FourCC 的 32 位整数值。"""
+    if not isinstance(codec_id, (int, float)) or isinstance(codec_id, bool): return 'N/A'
+    codec_id = int(codec_id)
+    if codec_id > 0xFF and 0 <= codec_id <= 0xFFFFFFFF:
+        codec_id = fourccs.get(codec_id.to_bytes(4, 'big'), -1)
+    return names.get(codec_id, 'N/A')
+
+# _tag_summary 只需要负载开头这么多字节：Ex 头 + FourCC + CTS 共 8 字节，余量留给短的 ModEx 扩展
+_TAG_SUMMARY_SIZE = 16
+
+def _tag_summary(tag_type: int, payload: bytes) -> Tuple[int, int, int, int]:
+    """从负载开头提取索引列: (CTS, frame type, codec, packet type)，同时支持 Enhanced FLV。"""
+    if not payload:
+        return 0, 0, 0, 0
+    if tag_type == FLVTag.VIDEO:
+        frame_type, codec, packet_type, cts, _ = _video_tag_header(payload)
+        return cts, frame_type, codec, packet_type
+    if tag_type == FLVTag.AUDIO:
+        codec, packet_type, _ = _audio_tag_header(payload)
+        return 0, 0, codec, packet_type
+    return 0, 0, 0, 0
+
+class TagIndex:
+    """
+    列式 (struct-of-arrays) 的 Tag 索引。
+    每个 Tag 只占用约 24 字节，FLVTag 对象在需要时再由 FLVFile 按偏移量创建。
+    """
+    COLUMNS = (
+        ('offsets', 'Q'), ('types', 'B'), ('sizes', 'I'), ('timestamps', 'I'),
+        ('cts', 'i'), ('frame_types', 'B'), ('codecs', 'B'), ('packet_types', 'B'),
+    )
+
+    def __init__(self):
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def append(self, offset: int, tag_type: int, size: int, timestamp: int,
+               cts: int = 0, frame_type: int = 0, codec: int = 0, packet_type: int = 0):
+        self.offsets.append(offset)
+        self.types.append(tag_type)
+        self.sizes.append(size)
+        self.timestamps.append(timestamp)
+        self.cts.append(cts)
+        self.frame_types.append(frame_type)
+        self.codecs.append(codec)
+        self.packet_types.append(packet_type)
+
+    def column_bytes(self) -> List[bytes]:
+        """按 COLUMNS 顺序导出各列的原始字节，用于跨进程传递索引。"""
+        return [getattr(self, name).tobytes() for name, _ in self.COLUMNS]
+
+    def extend_bytes(self, columns: List[bytes]):
+        """追加 column_bytes() 导出的另一段索引。"""
+        for (name, _), data in zip(self.COLUMNS, columns):
+            getattr(self, name).frombytes(data)
+
+    def positions(self, tag_type: int) -> List[int]:
+        """返回指定类型 Tag 在索引中的位置列表。"""
+        return [i for i, t in enumerate(self.types) if t == tag_type]
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """以零拷贝方式把各列导出为 NumPy 数组，便于整文件向量化查询。"""
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        return {name: np.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode)
+                for name, _ in self.COLUMNS}
+
+class _TagSequence:
+    """FLVFile.tags 的只读序列视图，按下标从 TagIndex 生成 FLVTag。"""
+    def __init__(self, flv_file: 'FLVFile'):
+        self._flv = flv_file
+
+    def __len__(self) -> int:
+        return len(self._flv.index)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._flv.get_tag(j) for j in range(*i.indices(len(self)))]
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError("tag index out of range")
+        return self._flv.get_tag(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._flv.get_tag(i)
+
+class KeyframeIndex:
+    """
+    关键帧索引：按文件顺序的 (时间 ms, Tag 下标)，用二分查找定位，复杂度 O(log n)。
+    时间戳有回退时另存一份按时间稳定排序的副本供 find() 使用，times / positions 仍保持文件顺序。
+    """
+    def __init__(self):
+        self.times = array('I')
+        self.positions = array('I')
+        self._sorted: Optional[Tuple[array, array]] = None # 时间不单调时按时间排序的 (times, positions)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @classmethod
+    def from_tag_index(cls, index: 'TagIndex') -> 'KeyframeIndex':
+        """从 Tag 索引中挑出视频关键帧；序列头、序列结束、元数据和命令帧都不算作关键帧。"""
+        keyframes = cls()
+        if np is not None:
+            cols = index.to_numpy()
+            positions = np.flatnonzero((cols['types'] == FLVTag.VIDEO) & (cols['frame_types'] == 1)
+                                       & (cols['packet_types'] == PACKET_CODED_FRAMES))
+            keyframes.positions = array('I', positions.astype(np.uint32).tobytes())
+        else:
+            keyframes.positions = array('I', (
+                i for i, (t, f, p) in enumerate(zip(index.types, index.frame_types, index.packet_types))
+                if t == FLVTag.VIDEO and f == 1 and p == PACKET_CODED_FRAMES))
+        timestamps = index.timestamps
+        times = keyframes.times = array('I', (timestamps[i] for i in keyframes.positions))
+        if any(b < a for a, b in zip(times, itertools.islice(times, 1, None))):
+            order = sorted(range(len(times)), key=times.__getitem__) # sorted 是稳定排序，同一时间保持文件顺序
+            keyframes._sorted = (array('I', (times[k] for k in order)), array('I', (keyframes.positions[k] for k in order)))
+        return keyframes
+
+    def find(self, time_ms: int) -> Optional[int]:
+        if not self.positions: return None
+        times, positions = self._sorted or (self.times, self.positions)
+        k = bisect.bisect_right(times, time_ms) - 1
+        return positions[max(k, 0)]
+
+def _video_gap_finding(gap: int, expected_interval: float) -> Dict[str, Any]:
+    dropped_frames = round(gap / expected_interval) - 1
+    return {'Warning': f"视频时间戳跳跃 {gap}ms (预期值 ~{expected_interval:.1f}ms)，可能丢失 {dropped_frames} 帧。",
+            'Reason': "可能原因：推流端性能不足、网络抖动丢包、编码器延迟。",
+            'Kind': 'video_gap', 'Delta (ms)': gap}
+
+def _audio_gap_finding(gap: int, expected_interval: int) -> Dict[str, Any]:
+    dropped_packets = round(gap / expected_interval) - 1
+    return {'Warning': f"音频时间戳跳跃 {gap}ms (预期值 ~{expected_interval}ms)，可能丢失 {dropped_packets} 个音频包。",
+            'Reason': "可能原因：推流端音频采集问题、网络抖动、服务器处理延迟。",
+            'Kind': 'audio_gap', 'Delta (ms)': gap}
+
+INDEX_CACHE_SUFFIX = '.flvidx'
+_INDEX_CACHE_MAGIC = b'FLVIDX4\n'
+_INDEX_CACHE_HASH_SIZE = 64 * 1024 # 用于校验缓存的文件头部长度
+
+def _hash_file_head(file_path: str, length: int) -> str:
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+def _backwards_finding(name: str, label: str, step: int) -> Dict[str, Any]:
+    return {'Warning': f"{label}时间戳回退 {-step}ms。",
+            'Reason': "可能原因：推流端重连、时间戳回绕、多路流拼接或服务器转封装错误。",
+            'Kind': f'{name}_backwards', 'Delta (ms)': step}
+
+# --- Timestamp Analytics ---
+
+_PERCENTILES = (50, 90, 99)
+
+def _nearest_rank(sorted_values, p: int):
+    return sorted_values[max(0, math.ceil(p * len(sorted_values) / 100) - 1)]
+
+def _distribution(sorted_values) -> Dict[str, int]:
+    """已排序序列的最近秩百分位数，NumPy 与纯 Python 实现共用，保证结果一致。"""
+    if len(sorted_values) == 0: return {}
+    stats = {f"p{p}": int(_nearest_rank(sorted_values, p)) for p in _PERCENTILES}
+    stats["max"] = int(sorted_values[-1])
+    return stats
+
+def _stream_report(intervals_sorted, jitter_sorted, count, backwards, duplicates, gaps) -> Dict[str, Any]:
+    return {"count": count, "gaps": gaps, "backwards": backwards, "duplicate_dts": duplicates,
+            "intervals_ms": _distribution(intervals_sorted), "jitter_ms": _distribution(jitter_sorted)}
+
+def _rates_report(per_second: List[List[int]]) -> Dict[str, Any]:
+    counts = [c for _, c in per_second]
+    return {"per_second": per_second, "min": min(counts, default=0), "max": max(counts, default=0)}
+
+def _audio_mode_interval(gaps_in_order) -> Optional[int]:
+    # 与 Counter.most_common 相同：出现次数相同时取最先出现的间隔
+    common_gap = Counter(g for g in gaps_in_order if g > 0).most_common(1)
+    return common_gap[0][0] if common_gap else None
+
+def analyze_timestamps(index: 'TagIndex', metadata: Dict[str, Any]) -> Tuple[Dict[int, Dict[str, Any]], Dict[str, Any]]:
+    """
+    对整个 Tag 索引做一次时间戳分析，返回 (逐 Tag 的分析结果, 汇总报告)。
+    汇总报告包括: 音视频各自的间隔/抖动百分位、时间戳回退与重复 DTS 次数、
+    CTS 为负（PTS 早于 DTS）的视频帧数、按秒统计的帧率/音频包率以及音视频时间戳漂移。
+    只统计携带媒体数据的帧，序列头、序列结束、元数据和命令帧不参与分析。
+    安装了 NumPy 时整列向量化计算，否则退回到等价的纯 Python 实现。
+    """
+    framerate = metadata.get('framerate')
+    video_interval = 1000 / framerate if isinstance(framerate, (int, float)) and framerate > 0 else None
+    if np is not None:
+        return _analyze_timestamps_numpy(index, video_interval)
+    return _analyze_timestamps_python(index, video_interval)
+
+def _analyze_timestamps_python(index: 'TagIndex', video_interval: Optional[float]):
+    findings: Dict[int, Dict[str, Any]] = {}
+    types, timestamps, cts, packet_types = index.types, index.timestamps, index.cts, index.packet_types
+    report: Dict[str, Any] = {"backend": "python"}
+    positions = {FLVTag.VIDEO: [], FLVTag.AUDIO: []}
+    for i, t in enumerate(types):
+        if t in positions and packet_types[i] == PACKET_CODED_FRAMES: positions[t].append(i)
+
+    for tag_type, name, label in ((FLVTag.VIDEO, "video", "视频"), (FLVTag.AUDIO, "audio", "音频")):
+        pos = positions[tag_type]
+        steps = [timestamps[curr] - timestamps[prev] for prev, curr in zip(pos, pos[1:])]
+        gaps = 0
+        if tag_type == FLVTag.VIDEO:
+            if video_interval is not None:
+                for curr, gap in zip(pos[1:], steps):
+                    if gap > video_interval * 2:
+                        findings[curr] = _video_gap_finding(gap, video_interval)
+                        gaps += 1
+        elif len(pos) > 10:
+            expected_interval = _audio_mode_interval(steps)
+            if expected_interval is not None:
+                for curr, gap in zip(pos[1:], steps):
+                    if gap > expected_interval * 2.5:
+                        findings[curr] = _audio_gap_finding(gap, expected_interval)
+                        gaps += 1
+        backwards = 0
+        for curr, step in zip(pos[1:], steps):
+            if step < 0:
+                findings[curr] = _backwards_finding(name, label, step)
+                backwards += 1
+        intervals = sorted(steps)
+        median = _nearest_rank(intervals, 50) if intervals else 0
+        jitter = sorted(abs(step - median) for step in steps)
+        report[name] = _stream_report(intervals, jitter, len(pos), backwards, steps.count(0), gaps)
+        per_second = Counter(timestamps[i] // 1000 for i in pos)
+        report[name]["rate"] = _rates_report([[sec, per_second[sec]] for sec in sorted(per_second)])
+
+    report["video"]["negative_cts"] = sum(1 for i in positions[FLVTag.VIDEO] if cts[i] < 0)
+
+    last = {FLVTag.VIDEO: None, FLVTag.AUDIO: None}
+    drift_by_second = {}
+    for i, t in enumerate(types):
+        if t not in last or packet_types[i] != PACKET_CODED_FRAMES: continue
+        last[t] = timestamps[i]
+        if last[FLVTag.VIDEO] is not None and last[FLVTag.AUDIO] is not None:
+            drift_by_second[timestamps[i] // 1000] = last[FLVTag.AUDIO] - last[FLVTag.VIDEO]
+    report["av_drift"] = _drift_report([[sec, drift_by_second[sec]] for sec in sorted(drift_by_second)])
+    return findings, report
+
+def _drift_report(series: List[List[int]]) -> Dict[str, Any]:
+    drifts = [d for _, d in series]
+    return {"series": series, "min_ms": min(drifts, default=0), "max_ms": max(drifts, default=0),
+            "max_abs_ms": max((abs(d) for d in drifts), default=0)}
+
+def _analyze_timestamps_numpy(index: 'TagIndex', video_interval: Optional[float]):
+    findings: Dict[int, Dict[str, Any]] = {}
+    types = np.frombuffer(index.types, dtype=np.uint8)
+    timestamps = np.frombuffer(index.timestamps, dtype=np.uint32).astype(np.int64)
+    cts = np.frombuffer(index.cts, dtype=np.int32)
+    is_frame = np.frombuffer(index.packet_types, dtype=np.uint8) == PACKET_CODED_FRAMES
+    report: Dict[str, Any] = {"backend": "numpy"}
+    is_av = {}
+
+    for tag_type, name, label in ((FLVTag.VIDEO, "video", "视频"), (FLVTag.AUDIO, "audio", "音频")):
+        is_av[tag_type] = (types == tag_type) & is_frame
+        pos = np.flatnonzero(is_av[tag_type])
+        ts = timestamps[pos]
+        steps = np.diff(ts)
+        gaps = 0
+        if tag_type == FLVTag.VIDEO:
+            if video_interval is not None:
+                for k in np.flatnonzero(steps > video_interval * 2):
+                    findings[int(pos[k + 1])] = _video_gap_finding(int(steps[k]), video_interval)
+                    gaps += 1
+        elif len(pos) > 10:
+            positive = steps[steps > 0]
+            if len(positive):
+                values, first_seen, counts = np.unique(positive, return_index=True, return_counts=True)
+                candidates = np.flatnonzero(counts == counts.max())
+                expected_interval = int(values[candidates[np.argmin(first_seen[candidates])]])
+                for k in np.flatnonzero(steps > expected_interval * 2.5):
+                    findings[int(pos[k + 1])] = _audio_gap_finding(int(steps[k]), expected_interval)
+                    gaps += 1
+        backwards = np.flatnonzero(steps < 0)
+        for k in backwards:
+            findings[int(pos[k + 1])] = _backwards_finding(name, label, int(steps[k]))
+        intervals = np.sort(steps)
+        median = _nearest_rank(intervals, 50) if len(intervals) else 0
+        jitter = np.sort(np.abs(steps - median))
+        report[name] = _stream_report(intervals, jitter, int(len(pos)), int(len(backwards)),
+                                      int(np.count_nonzero(steps == 0)), gaps)
+        seconds, counts = np.unique(ts // 1000, return_counts=True)
+        report[name]["rate"] = _rates_report([[int(sec), int(c)] for sec, c in zip(seconds, counts)])
+
+    report["video"]["negative_cts"] = int(np.count_nonzero(cts[is_av[FLVTag.VIDEO]] < 0))
+
+    # 按文件顺序前向填充“最近一个音频/视频时间戳”，两者之差即为漂移
+    positions = np.arange(len(types))
+    last_video = np.maximum.accumulate(np.where(is_av[FLVTag.VIDEO], positions, -1))
+    last_audio = np.maximum.accumulate(np.where(is_av[FLVTag.AUDIO], positions, -1))
+    valid = np.flatnonzero((is_av[FLVTag.VIDEO] | is_av[FLVTag.AUDIO]) & (last_video >= 0) & (last_audio >= 0))
+    drift = timestamps[last_audio[valid]] - timestamps[last_video[valid]]
+    seconds = timestamps[valid] // 1000
+    # 每秒取文件顺序中最后一个样本，与纯 Python 实现中字典的“后写覆盖”一致
+    unique_seconds, last_in_second = np.unique(seconds[::-1], return_index=True)
+    series_drift = drift[::-1][last_in_second]
+    report["av_drift"] = _drift_report([[int(sec), int(d)] for sec, d in zip(unique_seconds, series_drift)])
+    return findings, report
+
+# --- Timeline ---
+
+TIMELINE_FIELDS = ('time_ms', 'video_kbps', 'audio_kbps', 'video_fps', 'audio_pps', 'keyframes', 'av_drift_ms')
+GOP_FIELDS = ('time_ms', 'frames', 'bytes', 'duration_ms')
+
+class Timeline:
+    """
+    按固定时间窗口聚合的时间线：每个窗口的音视频字节数与帧数、关键帧数、窗口内最后一个音视频时间戳漂移，
+    以及逐个 GOP 的起始时间、帧数、字节数和到下一个关键帧的间隔。
+    只统计携带媒体数据的帧（与 analyze_timestamps 相同）。update() 只处理上次之后新追加到索引中的 Tag，
+    解析进行中或索引增长后可以反复调用；安装了 NumPy 时每批 Tag 向量化聚合。
+    """
+    def __init__(self, window_ms: int = 1000):
+        if window_ms <= 0: raise ValueError("window_ms must be positive")
+        self.window_ms = window_ms
+        self.windows: Dict[int, List[Any]] = {} # 窗口号 -> [视频字节, 音频字节, 视频帧, 音频帧, 关键帧, 漂移 ms 或 None]
+        self.gop_times, self.gop_frames = array('I'), array('I')
+        self.gop_bytes, self.gop_durations = array('Q'), array('i')
+        self.tags = 0 # 已处理的 Tag 数
+        self._last_video: Optional[int] = None
+        self._last_audio: Optional[int] = None
+        self._gop: Optional[List[int]] = None # 尚未结束的 GOP: [起始时间, 帧数, 字节数]
+
+    def update(self, index: 'TagIndex') -> int:
+        """聚合索引中上次之后新增的 Tag，返回本次处理的 Tag 数。"""
+        start, end = self.tags, len(index)
+        if end <= start: return 0
+        if np is not None:
+            self._update_numpy(index, start, end)
+        else:
+            self._update_python(index, start, end)
+        self.tags = end
+        return end - start
+
+    def _window(self, key: int) -> List[Any]:
+        row = self.windows.get(key)
+        if row is None:
+            row = self.windows[key] = [0, 0, 0, 0, 0, None]
+        return row
+
+    def _close_gop(self, frames: int, size: int, end_time: int):
+        start_time, gop_frames, gop_bytes = self._gop
+        self.gop_times.append(start_time)
+        self.gop_frames.append(gop_frames + frames)
+        self.gop_bytes.append(gop_bytes + size)
+        self.gop_durations.append(end_time - start_time)
+
+    def _update_python(self, index: 'TagIndex', start: int, end: int):
+        types, timestamps, sizes = index.types, index.timestamps, index.sizes
+        frame_types, packet_types, window_ms = index.frame_types, index.packet_types, self.window_ms
+        for i in range(start, end):
+            t = types[i]
+            if (t != FLVTag.VIDEO and t != FLVTag.AUDIO) or packet_types[i] != PACKET_CODED_FRAMES: continue
+            ts, size = timestamps[i], sizes[i]
+            row = self._window(ts // window_ms)
+            if t == FLVTag.VIDEO:
+                row[0] += size
+                row[2] += 1
+                if frame_types[i] == 1:
+                    row[4] += 1
+                    if self._gop is not None: self._close_gop(0, 0, ts)
+                    self._gop = [ts, 0, 0]
+                if self._gop is not None:
+                    self._gop[1] += 1
+                    self._gop[2] += size
+                self._last_video = ts
+            else:
+                row[1] += size
+                row[3] += 1
+                self._last_audio = ts
+            if self._last_video is not None and self._last_audio is not None:
+                row[5] = self._last_audio - self._last_video
+
+    def _update_numpy(self, index: 'TagIndex', start: int, end: int):
+        types = np.frombuffer(index.types, dtype=np.uint8)[start:end]
+        is_frame = np.frombuffer(index.packet_types, dtype=np.uint8)[start:end] == PACKET_CODED_FRAMES
+        is_video, is_audio = (types == FLVTag.VIDEO) & is_frame, (types == FLVTag.AUDIO) & is_frame
+        media = np.flatnonzero(is_video | is_audio)
+        if not len(media): return
+        ts = np.frombuffer(index.timestamps, dtype=np.uint32)[start:end][media].astype(np.int64)
+        sizes = np.frombuffer(index.sizes, dtype=np.uint32)[start:end][media].astype(np.int64)
+        video = is_video[media]
+        key = video & (np.frombuffer(index.frame_types, dtype=np.uint8)[start:end][media] == 1)
+
+        keys, inverse = np.unique(ts // self.window_ms, return_inverse=True)
+        columns = [np.bincount(inverse, weights=w, minlength=len(keys)).astype(np.int64)
+                   for w in (np.where(video, sizes, 0), np.where(video, 0, sizes), video, ~video, key)]
+
+        # 按文件顺序前向填充“最近一个视频/音频时间戳”，上一批留下的值作为初始值
+        positions = np.arange(len(media))
+        last_v = np.maximum.accumulate(np.where(video, positions, -1))
+        last_a = np.maximum.accumulate(np.where(video, -1, positions))
+        fill_v = np.where(last_v >= 0, ts[last_v], -1 if self._last_video is None else self._last_video)
+        fill_a = np.where(last_a >= 0, ts[last_a], -1 if self._last_audio is None else self._last_audio)
+        valid = np.flatnonzero((fill_v >= 0) & (fill_a >= 0))
+        # 每个窗口取文件顺序中最后一个漂移样本
+        drift_keys, last_in_window = np.unique((ts[valid] // self.window_ms)[::-1], return_index=True)
+        drift = (fill_a[valid] - fill_v[valid])[::-1][last_in_window]
+        if len(last_v): self._last_video = int(fill_v[-1]) if fill_v[-1] >= 0 else None
+        if len(last_a): self._last_audio = int(fill_a[-1]) if fill_a[-1] >= 0 else None
+
+        for w, *sums in zip(keys.tolist(), *(column.tolist() for column in columns)):
+            row = self._window(w)
+            for c, value in enumerate(sums):
+                row[c] += value
+        for w, d in zip(drift_keys.tolist(), drift.tolist()):
+            self.windows[w][5] = d
+
+        # GOP：关键帧之间的视频帧数与字节数由前缀和相减得到
+        frames_before = np.cumsum(video) - video # 每个位置之前（不含）的视频帧数
+        video_sizes = np.where(video, sizes, 0)
+        bytes_before = np.cumsum(video_sizes) - video_sizes
+        total_frames, total_bytes = int(frames_before[-1] + video[-1]), int(bytes_before[-1] + video_sizes[-1])
+        keyframes = np.flatnonzero(key)
+        if not len(keyframes):
+            if self._gop is not None:
+                self._gop[1] += total_frames
+                self._gop[2] += total_bytes
+            return
+        first = keyframes[0]
+        if self._gop is not None:
+            self._close_gop(int(frames_before[first]), int(bytes_before[first]), int(ts[first]))
+        self.gop_times.extend(ts[keyframes[:-1]].tolist())
+        self.gop_frames.extend(np.diff(frames_before[keyframes]).tolist())
+        self.gop_bytes.extend(np.diff(bytes_before[keyframes]).tolist())
+        self.gop_durations.extend(np.diff(ts[keyframes]).tolist())
+        last = keyframes[-1]
+        self._gop = [int(ts[last]), total_frames - int(frames_before[last]), total_bytes - int(bytes_before[last])]
+
+    def series(self) -> Dict[str, List[Any]]:
+        """按时间排序的窗口序列（TIMELINE_FIELDS），码率为 kbps、帧率为每秒帧数；没有音视频同时出现时漂移为 None。"""
+        window_ms = self.window_ms
+        keys = sorted(self.windows)
+        rows = [self.windows[k] for k in keys]
+        return {
+            "time_ms": [k * window_ms for k in keys],
+            "video_kbps": [r[0] * 8 / window_ms for r in rows],
+            "audio_kbps": [r[1] * 8 / window_ms for r in rows],
+            "video_fps": [r[2] * 1000 / window_ms for r in rows],
+            "audio_pps": [r[3] * 1000 / window_ms for r in rows],
+            "keyframes": [r[4] for r in rows],
+            "av_drift_ms": [r[5] for r in rows],
+        }
+
+    def gops(self, final: bool = False) -> Dict[str, List[int]]:
+        """
+        已结束的 GOP（GOP_FIELDS）；最后一个 GOP 要等到下一个关键帧出现才计入。
+        final=True 用于已写完的文件：尚未结束的 GOP 也计入，时长到最后一个视频帧为止。
+        """
+        gops = {"time_ms": self.gop_times.tolist(), "frames": self.gop_frames.tolist(),
+                "bytes": self.gop_bytes.tolist(), "duration_ms": self.gop_durations.tolist()}
+        if final and self._gop is not None:
+            start_time, frames, size = self._gop
+            for name, value in zip(GOP_FIELDS, (start_time, frames, size, self._last_video - start_time)):
+                gops[name].append(value)
+        return gops
+
+def downsample_minmax(xs, ys, buckets: int) -> Tuple[List[Any], List[Any]]:
+    """
+    把折线按下标均分为 buckets 段，每段只保留最小值和最大值两个点（保持原有顺序），
+    数百万个点可以降到画布宽度的两倍左右，码率尖峰与断流造成的低谷都不会被抹掉。
+    """
+    n = len(ys)
+    if n <= 2 * buckets or buckets <= 0:
+        return list(xs), list(ys)
+    per = -(-n // buckets)
+    if np is not None:
+        x, y = np.asarray(xs), np.asarray(ys)
+        count = -(-n // per)
+        blocks = np.pad(y, (0, count * per - n), mode='edge').reshape(count, per)
+        base = np.arange(count) * per
+        picks = np.unique(np.minimum(np.concatenate((base + blocks.argmin(axis=1), base + blocks.argmax(axis=1))), n - 1))
+        return x[picks].tolist(), y[picks].tolist()
+    out_x, out_y = [], []
+    for start in range(0, n, per):
+        span = range(start, min(start + per, n))
+        lo, hi = min(span, key=ys.__getitem__), max(span, key=ys.__getitem__)
+        for k in sorted({lo, hi}):
+            out_x.append(xs[k])
+            out_y.append(ys[k])
+    return out_x, out_y
+
+def frame_sizes(index: 'TagIndex', tag_type: int = FLVTag.VIDEO):
+    """
+    逐帧的 (时间戳, 字节数) 序列，只包含携带媒体数据的帧，用于画逐帧大小曲线。
+    安装了 NumPy 时返回两个数组（数百万帧也不必转换成 Python 对象），否则返回列表。
+    """
+    if np is not None:
+        cols = index.to_numpy()
+        picks = np.flatnonzero((cols['types'] == tag_type) & (cols['packet_types'] == PACKET_CODED_FRAMES))
+        return cols['timestamps'][picks], cols['sizes'][picks]
+    picks = [i for i, (t, p) in enumerate(zip(index.types, index.packet_types)) if t == tag_type and p == PACKET_CODED_FRAMES]
+    return [index.timestamps[i] for i in picks], [index.sizes[i] for i in picks]
+
+# --- Profiling ---
+
+class Profiler:
+    """
+    可选的性能剖析器：按阶段累计耗时与调用次数，记录计数器，可选用 tracemalloc 统计
+    各阶段的内存分配峰值、用 cProfile 采集函数级耗时。
+    FLVFile、summarize_file 与图形界面只在阶段边界（而非每个 Tag）调用它，未传入时不产生任何开销。
+    """
+    def __init__(self, trace_memory: bool = False, use_cprofile: bool = False):
+        self.phases: Dict[str, List[float]] = {} # 阶段名 -> [累计秒数, 次数, 最大分配峰值字节数]
+        self.counters: Counter = Counter()
+        self.trace_memory = trace_memory
+        self.wall_time = 0.0
+        self.memory_top: List[str] = [] # stop() 时分配最多的代码行
+        self._cprofile = None
+        if use_cprofile:
+            import cProfile # 剖析模块只在开启对应功能时导入，平时启动不加载
+            self._cprofile = cProfile.Profile()
+        self._tracemalloc = None # start() 开启内存统计后为 tracemalloc 模块
+        self._local = threading.local() # 嵌套阶段的内存基线，GUI 中解析线程与主线程各自一份
+        self._started: Optional[float] = None
+        self._owns_tracemalloc = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if self.trace_memory:
+            import tracemalloc
+            self._tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+        if self._cprofile is not None:
+            self._cprofile.enable() # 只采集调用 start() 的线程
+        self._started = time.perf_counter()
+
+    def stop(self):
+        if self._started is None: return
+        self.wall_time += time.perf_counter() - self._started
+        self._started = None
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        tracemalloc = self._tracemalloc
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.counters["traced_current_bytes"] = current
+            self.counters["traced_peak_bytes"] = max(self.counters["traced_peak_bytes"], peak)
+            stats = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__),)).statistics('lineno')
+            self.memory_top = [str(stat) for stat in stats[:10]]
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+
+    @contextmanager
+    def phase(self, name: str):
+        """统计 with 块的耗时；同名阶段累加。开启 trace_memory 时同时记录块内的分配峰值。"""
+        record = self.phases.setdefault(name, [0.0, 0, 0])
+        tracemalloc = self._tracemalloc
+        tracing = tracemalloc is not None and tracemalloc.is_tracing()
+        if tracing:
+            stack = self._local.__dict__.setdefault('stack', [])
+            current, peak = tracemalloc.get_traced_memory()
+            if stack: # 重置峰值前把它计入外层阶段
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            stack.append([current, current])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record[0] += time.perf_counter() - start
+            record[1] += 1
+            if tracing:
+                peak = max(tracemalloc.get_traced_memory()[1], stack[-1][1])
+                baseline = stack.pop()[0]
+                record[2] = max(record[2], peak - baseline)
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def report(self) -> Dict[str, Any]:
+        """可序列化的汇总：各阶段耗时、计数器和由此推算的吞吐量。"""
+        phases = {name: {"seconds": round(seconds, 6), "calls": calls,
+                         **({"alloc_peak_bytes": alloc} if self.trace_memory else {})}
+                  for name, (seconds, calls, alloc) in self.phases.items()}
+        report = {"wall_seconds": round(self.wall_time, 6), "phases": phases, "counters": dict(self.counters)}
+        index_seconds = self.phases.get("index", [0.0])[0]
+        if index_seconds > 0:
+            report["tags_per_second"] = round(self.counters["tags_indexed"] / index_seconds, 1)
+            report["mb_per_second"] = round(self.counters["bytes_scanned"] / index_seconds / (1024 * 1024), 1)
+        return report
+
+    def format_report(self, limit: int = 20) -> str:
+        """人类可读的报告；启用 cProfile 时附上按累计耗时排序的前 limit 个函数。"""
+        report = self.report()
+        lines = [f"总耗时: {report['wall_seconds']:.3f}s"]
+        if report["phases"]:
+            lines.append("阶段:")
+            for name, phase in sorted(report["phases"].items(), key=lambda item: -item[1]["seconds"]):
+                line = f"  {name:<14}{phase['seconds']:>10.3f}s  x{phase['calls']}"
+                if "alloc_peak_bytes" in phase:
+                    line += f"  峰值分配 {phase['alloc_peak_bytes'] / (1024 * 1024):.1f} MB"
+                lines.append(line)
+        if report["counters"]:
+            lines.append("计数器:")
+            lines.extend(f"  {name:<22}{value}" for name, value in sorted(report["counters"].items()))
+        if "tags_per_second" in report:
+            lines.append(f"索引吞吐: {report['tags_per_second']:.0f} Tag/s, {report['mb_per_second']:.1f} MB/s")
+        if self.memory_top:
+            lines.append("分配最多的代码行:")
+            lines.extend(f"  {line}" for line in self.memory_top)
+        if self._cprofile is not None:
+            import pstats
+            stream = io.StringIO()
+            stats = pstats.Stats(self._cprofile, stream=stream)
+            stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+            lines.append(stream.getvalue().rstrip())
+        return "\n".join(lines)
+
+    def dump_stats(self, path: str):
+        """把 cProfile 结果写成 pstats 文件，可用 snakeviz 等工具查看。"""
+        if self._cprofile is None:
+            raise ValueError("cProfile is not enabled")
+        self._cprofile.dump_stats(path)
+
+def _profile_phase(profiler: Optional[Profiler], name: str):
+    return profiler.phase(name) if profiler is not None else nullcontext()
+
+# --- Remote Sources (HTTP Range) ---
+
+_REMOTE_BLOCK_SIZE = 2048 # 每个缓存块的字节数：稀疏访问（只读 Tag 头）时每次请求只多取这么多
+_REMOTE_CACHE_BLOCKS = 8192 # LRU 块缓存容量（块数）
+_REMOTE_MAX_READAHEAD = 256 # 连续顺序访问时预读窗口的上限（块数）
+# 向前跳过不超过这么多块仍按顺序访问处理：小负载的文件逐个读 Tag 头时，多传几 KB 比多一次往返便宜
+_REMOTE_SKIP_BLOCKS = 16
+
+def _is_url(path: str) -> bool:
+    return path.startswith(('http://', 'https://'))
+
+class HTTPRangeSource:
+    """
+    通过 HTTP Range 请求按需读取远程文件的只读数据源。
+    数据按固定大小的块缓存在 LRU 中；一次读取缺失的相邻块合并为一个 Range 请求，
+    连续（或只向前跳过少量块的）顺序访问时预读窗口成倍增长，
+    大跨度跳跃访问（逐个 Tag 头跳过大负载）时回到一个块。
+    keep-alive 连接放在连接池中复用，可以在多个线程中同时调用 read_at()。
+    """
+    def __init__(self, url: str, block_size: int = _REMOTE_BLOCK_SIZE, cache_blocks: int = _REMOTE_CACHE_BLOCKS,
+                 max_connections: int = 4, timeout: float = 30.0, headers: Optional[Dict[str, str]] = None):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            raise ValueError(f"unsupported URL: {url}")
+        self.url = url
+        self.block_size, self.cache_blocks = block_size, cache_blocks
+        self.requests = self.bytes_fetched = self.cache_hits = 0
+        import http.client # 只有打开远程文件时才加载
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._retry_errors = (http.client.HTTPException, ConnectionError) # _get() 换新连接重试的错误
+        self._host, self._timeout = parts.netloc, timeout
+        self._target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        self._headers = dict(headers or {})
+        self._pool: 'queue.LifoQueue' = queue.LifoQueue(maxsize=max_connections)
+        self._cache: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_block, self._readahead = None, 1
+        self.last_modified: Optional[float] = None # Last-Modified 响应头 (Unix 秒)
+        self.size = self._probe()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _probe(self) -> int:
+        """读取第一个块，同时从 Content-Range 得到文件大小并确认服务器支持 Range。"""
+        status, headers, data = self._get(f"bytes=0-{self.block_size - 1}")
+        if status == 416: return 0 # 空文件
+        if status >= 400:
+            raise OSError(f"{self.url}: HTTP {status}")
+        content_range = headers.get('Content-Range', '')
+        if status != 206 or '/' not in content_range or content_range.endswith('/*'):
+            raise OSError(f"{self.url}: server does not support HTTP range requests (status {status})")
+        size = int(content_range.rsplit('/', 1)[1])
+        if headers.get('Last-Modified'):
+            try:
+                self.last_modified = email.utils.parsedate_to_datetime(headers['Last-Modified']).timestamp()
+            except (TypeError, ValueError):
+                pass
+        self._store(0, data)
+        return size
+
+    def _get(self, byte_range: str) -> Tuple[int, 'http.client.HTTPMessage', bytes]:
+        """发送一个 Range 请求。连接来自连接池，被服务器关闭的空闲连接会换一个新连接重试一次。"""
+        headers = {**self._headers, 'Range': byte_range}
+        for attempt in (0, 1):
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                connection = self._connection_class(self._host, timeout=self._timeout)
+            try:
+                connection.request('GET', self._target, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except self._retry_errors:
+                connection.close()
+                if attempt: raise
+                continue
+            if response.will_close:
+                connection.close()
+            else:
+                try:
+                    self._pool.put_nowait(connection)
+                except queue.Full:
+                    connection.close()
+            with self._lock:
+                self.requests += 1
+                self.bytes_fetched += len(data)
+            return response.status, response.headers, data
+
+    def _store(self, first_block: int, data: bytes):
+        with self._lock:
+            for k in range(0, len(data), self.block_size):
+                self._cache[first_block + k // self.block_size] = data[k:k + self.block_size]
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+
+    def _fetch(self, first: int, last: int) -> bytes:
+        """请求 [first, last] 块（按文件大小截断）并放入缓存。"""
+        start, end = first * self.block_size, min((last + 1) * self.block_size, self.size) - 1
+        status, _, data = self._get(f"bytes={start}-{end}")
+        if status != 206 or len(data) != end - start + 1:
+            raise OSError(f"{self.url}: unexpected response to range {start}-{end} (status {status}, {len(data)} bytes)")
+        self._store(first, data)
+        return data
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        """读取 [offset, offset + size)，超出文件末尾的部分被截掉。"""
+        end = min(offset + size, self.size)
+        if offset >= end: return b''
+        block_size = self.block_size
+        first, last = offset // block_size, (end - 1) // block_size
+        blocks: Dict[int, bytes] = {}
+        with self._lock:
+            for k in range(first, last + 1):
+                block = self._cache.get(k)
+                if block is not None:
+                    self._cache.move_to_end(k)
+                    blocks[k] = block
+            self.cache_hits += len(blocks)
+            missing = [k for k in range(first, last + 1) if k not in blocks]
+            if missing:
+                # 紧接着上一次读取的位置（或稍往前）继续读时扩大预读窗口，否则复位
+                sequential = self._next_block is not None and \
+                    self._next_block - 1 <= missing[0] <= self._next_block + _REMOTE_SKIP_BLOCKS
+                self._readahead = min(self._readahead * 2, _REMOTE_MAX_READAHEAD) if sequential else 1
+            self._next_block = last + 1
+            readahead = self._readahead
+        total_blocks = -(-self.size // block_size)
+        while missing:
+            # 合并相邻的缺失块；最后一段再附带预读窗口
+            run = 1
+            while run < len(missing) and missing[run] == missing[0] + run:
+                run += 1
+            run_first, run_last = missing[0], missing[run - 1]
+            missing = missing[run:]
+            if not missing:
+                with self._lock:
+                    while run_last + 1 < min(last + readahead, total_blocks) and run_last + 1 not in self._cache:
+                        run_last += 1
+            data = self._fetch(run_first, run_last)
+            for k in range(run_first, min(run_last, last) + 1):
+                blocks[k] = data[(k - run_first) * block_size:(k - run_first + 1) * block_size]
+        data = b''.join(blocks[k] for k in range(first, last + 1))
+        base = first * block_size
+        return data[offset - base:end - base]
+
+    def open(self) -> '_RangeReader':
+        """返回一个有独立读写位置的类文件对象，多个读取者共享缓存与连接。"""
+        return _RangeReader(self)
+
+class _RangeReader:
+    """HTTPRangeSource 上的只读类文件对象（read / seek / tell），关闭时不关闭数据源。"""
+    def __init__(self, source: HTTPRangeSource):
+        self.source = source
+        self.pos = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0: size = self.source.size - self.pos
+        data = self.source.read_at(self.pos, size)
+        self.pos += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        base = (0, self.pos, self.source.size)[whence]
+        self.pos = max(base + offset, 0)
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+class ParseCancelled(Exception):
+    """由 progress 回调抛出，用于中止正在进行的解析。"""
+
+_PROGRESS_STEP = 4 * 1024 * 1024 # 每解析这么多字节调用一次 progress 回调
+_PARALLEL_MIN_CHUNK = 64 * 1024 * 1024 # 并行解析时每个分块的最小字节数
+_PARALLEL_CHUNKS_PER_JOB = 4 # 分块数多于进程数，慢的分块不会拖住整体
+# 候选 Tag 头：音频/视频/脚本类型，后跟 DataSize + Timestamp (7 字节) 和为 0 的 StreamID
+_TAG_HEADER_PATTERN = re.compile(rb'[\x08\x09\x12].{7}\x00\x00\x00', re.DOTALL)
+
+_RESYNC_MAX_JUMP_MS = 60 * 1000 # 容错解析重新对齐时，优先选择与上一个 Tag 时间戳相差不超过此值的位置
+_RESYNC_WINDOW = 16 * 1024 * 1024 # 这么多字节内没有时间戳合理的候选时，退而接受第一个结构有效的位置
+
+def _tag_header_sane(view, offset: int) -> bool:
+    """Tag 头的类型为音频/视频/脚本，且 StreamID 为 0。调用方保证 offset + 11 不超出数据。"""
+    return view[offset] in (FLVTag.AUDIO, FLVTag.VIDEO, FLVTag.SCRIPT) and not (view[offset+8] or view[offset+9] or view[offset+10])
+
+def _is_tag_boundary(view, offset: int, end: int) -> bool:
+    """offset 处是否像一个真实的 Tag：类型合法、StreamID 为 0，且紧随其后的 PreviousTagSize 等于 11 + DataSize。"""
+    if offset + 11 > end or not _tag_header_sane(view, offset): return False
+    data_size = (view[offset+1] << 16) | (view[offset+2] << 8) | view[offset+3]
+    tail = offset + 11 + data_size
+    return tail + 4 <= end and _U32.unpack_from(view, tail)[0] == data_size + 11
+
+def _find_tag_boundary(view, start: int, stop: int) -> Optional[int]:
+    """
+    在 [start, stop) 中查找第一个 Tag 起点：用正则在整块数据上跳到候选位置，
+    要求候选 Tag 及紧接着的下一个 Tag 都通过 _is_tag_boundary 校验，以排除负载中偶然出现的伪 Tag 头。
+    """
+    end = len(view)
+    pos = start
+    while True:
+        match = _TAG_HEADER_PATTERN.search(view, pos, min(stop + 10, end))
+        if match is None: return None
+        candidate = match.start()
+        if _is_tag_boundary(view, candidate, end):
+            data_size = (view[candidate+1] << 16) | (view[candidate+2] << 8) | view[candidate+3]
+            next_offset = candidate + 11 + data_size + 4
+            if next_offset + 11 > end or _is_tag_boundary(view, next_offset, end):
+                return candidate
+        pos = candidate + 1
+
+def _resync(view, start: int, last_timestamp: Optional[int]) -> Optional[int]:
+    """
+    容错解析遇到损坏数据后，从 start 起查找可以继续解析的 Tag 起点；找不到时返回 None。
+    时间戳与 last_timestamp 相差过大的候选多半是负载中的伪 Tag 头，会被跳过，
+    但若 _RESYNC_WINDOW 内都没有更合适的候选（例如损坏处恰好伴随一次长时间断流），仍接受第一个候选。
+    """
+    first, pos = None, start
+    while True:
+        candidate = _find_tag_boundary(view, pos, len(view))
+        if candidate is None: return first
+        if first is None: first = candidate
+        timestamp = (view[candidate+4] << 16) | (view[candidate+5] << 8) | view[candidate+6] | (view[candidate+7] << 24)
+        if last_timestamp is None or abs(timestamp - last_timestamp) <= _RESYNC_MAX_JUMP_MS: return candidate
+        if candidate - first > _RESYNC_WINDOW: return first
+        pos = candidate + 1
+
+def _corruption_finding(start: int, end: int) -> Dict[str, Any]:
+    return {'Warning': f"文件偏移 0x{start:08X}-0x{end:08X} 处 {end - start} 字节数据损坏，解析时已跳过。",
+            'Reason': "可能原因：录制过程中网络中断或写入异常、文件传输损坏、多段数据被错误拼接。",
+            'Kind': 'corruption', 'Bytes': end - start}
+
+def _index_range(view, start: int, stop: int, resync: bool) -> Tuple[Optional[int], int, TagIndex]:
+    """
+    为起始偏移落在 [start, stop) 内的 Tag 建立索引，返回 (第一个 Tag 的偏移, 下一个待解析的偏移, 索引)。
+    resync 为 True 表示 start 不一定是 Tag 边界，先用 _find_tag_boundary 对齐；找不到时第一个偏移为 None。
+    """
+    index = TagIndex()
+    offset = _find_tag_boundary(view, start, stop) if resync else start
+    if offset is None: return None, start, index
+    first, end = offset, len(view)
+    append = index.append
+    while offset < stop and offset + 11 <= end:
+        tag_type = view[offset]
+        data_size = (view[offset+1] << 16) | (view[offset+2] << 8) | view[offset+3]
+        timestamp = (view[offset+4] << 16) | (view[offset+5] << 8) | view[offset+6] | (view[offset+7] << 24)
+        payload = view[offset+11:offset+11+min(data_size, _TAG_SUMMARY_SIZE)]
+        append(offset, tag_type, data_size, timestamp, *_tag_summary(tag_type, payload))
+        offset += 11 + data_size + 4
+    return first, offset, index
+
+def _index_chunk(file_path: str, start: int, stop: int, resync: bool) -> Tuple[Optional[int], int, List[bytes]]:
+    """进程池任务：各自映射文件并为一个分块建立索引，索引以列字节的形式返回给主进程。"""
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            first, next_offset, index = _index_range(view, start, stop, resync)
+        finally:
+            view.release()
+    return first, next_offset, index.column_bytes()
+
+
+class FLVFile:
+    def __init__(self, file_path: str, use_mmap: bool = False, use_cache: bool = False,
+                 progress: Optional[Callable[['FLVFile', int, int], None]] = None,
+                 profiler: Optional[Profiler] = None, jobs: int = 1, recover: bool = False):
+        # progress(flv_file, bytes_done, total_bytes) 在解析过程中周期性调用，此时
+        # flv_file.index 已包含前面解析出的 Tag；分析与关键帧阶段开始前也各调用一次（bytes_done 为文件大小）。
+        # 回调抛出 ParseCancelled 即可取消解析。
+        # profiler 不为空时按阶段（cache_load/open/index/analysis/cache_save/keyframes）计时。
+        # jobs > 1 时用多个进程分块建立索引，只对足够大的文件生效。
+        # recover 为 True 时逐个校验 Tag，跳过损坏的数据并记录在 corrupt_ranges 中（此时忽略 jobs）。
+        # file_path 也可以是 http(s) URL：通过 HTTP Range 只读取需要的字节，此时不使用 mmap、缓存和多进程解析。
+        self.file_path = file_path
+        self.remote: Optional[HTTPRangeSource] = None
+        if _is_url(file_path):
+            if recover: raise ValueError("recover=True requires a local file")
+            self.remote = HTTPRangeSource(file_path)
+            self.file_name = posixpath.basename(urllib.parse.urlsplit(file_path).path) or file_path
+            use_mmap, use_cache, jobs = False, False, 1
+        else:
+            self.file_name = os.path.basename(file_path)
+        self.use_mmap = use_mmap
+        self.header, self.metadata = {}, {}
+        self.index = TagIndex()
+        self.tags = _TagSequence(self)
+        self.analysis: Dict[int, Dict[str, Any]] = {} # Tag 下标 -> 丢帧分析结果
+        self.timestamp_report: Dict[str, Any] = {} # analyze_timestamps() 的汇总报告
+        self.metadata_offset: Optional[int] = None # onMetaData 所在 Tag 的文件偏移
+        self.keyframes = KeyframeIndex()
+        self._timelines: Dict[int, Timeline] = {} # 窗口大小 (ms) -> Timeline
+        self.cache_status: Optional[str] = None # 'hit' / 'append' / 'miss'，未启用缓存时为 None
+        self.recover = recover
+        self.corrupt_ranges: List[List[int]] = [] # 容错解析跳过的 [起始偏移, 结束偏移)
+        self._mmap, self._view, self._file = None, None, None
+        self._metadata_found = False
+        self._progress = progress
+        self.profiler = profiler
+
+        try:
+            resume_offset = None
+            if use_cache:
+                with _profile_phase(profiler, "cache_load"):
+                    resume_offset = self._load_cache()
+            if use_mmap:
+                with _profile_phase(profiler, "open"):
+                    self._open_map()
+            if self.cache_status != 'hit':
+                tags_before = len(self.index)
+                with _profile_phase(profiler, "index"):
+                    end_offset = None
+                    if recover:
+                        end_offset = self._parse_recover(resume_offset)
+                    elif jobs > 1:
+                        end_offset = self._parse_parallel(resume_offset, jobs)
+                    if end_offset is None:
+                        end_offset = self._parse_mapped(resume_offset) if use_mmap else self._parse(resume_offset)
+                if profiler is not None:
+                    profiler.count("tags_indexed", len(self.index) - tags_before)
+                    profiler.count("bytes_scanned", end_offset - (resume_offset or self.header["HeaderSize"] + 4))
+                self._phase_progress()
+                with _profile_phase(profiler, "analysis"):
+                    self._analyze_tags()
+                if use_cache:
+                    with _profile_phase(profiler, "cache_save"):
+                        self._save_cache()
+            self._phase_progress()
+            with _profile_phase(profiler, "keyframes"):
+                self.keyframes = KeyframeIndex.from_tag_index(self.index)
+            if profiler is not None:
+                profiler.count("tags", len(self.index))
+                if self.cache_status is not None:
+                    profiler.count("cache_" + self.cache_status)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """关闭底层文件；mmap 模式下释放映射，之后已创建的 Tag 数据视图不可再访问。"""
+        if self.remote is not None:
+            self.remote.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._mmap is not None:
+            self._view.release()
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass # 仍有 Tag 数据视图引用映射，由最后一个视图释放时回收
+            self._mmap, self._view = None, None
+
+    def get_tag(self, i: int) -> FLVTag:
+        offset, size = self.index.offsets[i], self.index.sizes[i]
+        if self._view is not None:
+            data = self._view[offset:offset+11+size]
+        elif self.remote is not None:
+            data = self.remote.read_at(offset, 11 + size)
+        else:
+            if self._file is None:
+                self._file = open(self.file_path, 'rb')
+            self._file.seek(offset)
+            data = self._file.read(11 + size)
+        tag = FLVTag(offset, data, self.metadata)
+        tag.analysis = self.analysis.get(i, tag.analysis)
+        return tag
+
+    @property
+    def file_size(self) -> int:
+        return self.remote.size if self.remote is not None else os.path.getsize(self.file_path)
+
+    def _phase_progress(self):
+        if self._progress is not None:
+            size = self.file_size
+            self._progress(self, size, size)
+
+    def _open_reader(self, buffering: int = -1) -> IO[bytes]:
+        """按顺序读取文件的类文件对象；远程文件返回共享块缓存的 _RangeReader。"""
+        if self.remote is not None:
+            return self.remote.open()
+        return open(self.file_path, 'rb', buffering=buffering)
+
+    def _parse_header(self, header_data: bytes) -> int:
+        self.header.update(_parse_flv_header(header_data))
+        return self.header["HeaderSize"] + 4
+
+    def _parse(self, offset: Optional[int] = None) -> int:
+        # 单遍解析：onMetaData 在遇到时记录下来，依赖它的音频字段在 Tag.details
+        # 首次访问时才计算，因此无需为查找元数据而预先扫描整个文件。
+        # offset 不为空时从该位置续读（索引缓存的增量更新）。返回停止解析的偏移量。
+        with self._open_reader() as f:
+            first_offset = self._parse_header(f.read(9))
+            if offset is None: offset = first_offset
+            total_size = f.seek(0, os.SEEK_END)
+            f.seek(offset)
+            progress, next_report = self._progress, offset + _PROGRESS_STEP
+            append = self.index.append
+            while True:
+                if progress is not None and offset >= next_report:
+                    progress(self, offset, total_size)
+                    next_report = offset + _PROGRESS_STEP
+                tag_header = f.read(11)
+                if len(tag_header) < 11: return min(offset, total_size)
+                tag_type = tag_header[0]
+                data_size = (tag_header[1] << 16) | (tag_header[2] << 8) | tag_header[3]
+                timestamp = (tag_header[4] << 16) | (tag_header[5] << 8) | tag_header[6] | (tag_header[7] << 24)
+                if tag_type == FLVTag.SCRIPT:
+                    payload = f.read(data_size)
+                    self._check_metadata(offset, tag_header + payload)
+                    f.seek(4, 1)
+                else:
+                    payload = f.read(min(data_size, _TAG_SUMMARY_SIZE))
+                    f.seek(data_size - len(payload) + 4, 1)
+                append(offset, tag_type, data_size, timestamp, *_tag_summary(tag_type, payload))
+                offset += 11 + data_size + 4
+
+    def _open_map(self):
+        with open(self.file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < 9:
+                raise ValueError("Invalid FLV file")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+    def _parse_mapped(self, offset: Optional[int] = None) -> int:
+        """mmap 模式：只建立索引，Tag 的负载按需从映射（页缓存）读取。返回停止解析的偏移量。"""
+        view = self._view
+        end = len(view)
+        first_offset = self._parse_header(bytes(view[:9]))
+        if offset is None: offset = first_offset
+        progress, next_report = self._progress, offset + _PROGRESS_STEP
+        append = self.index.append
+        while offset + 11 <= end:
+            if progress is not None and offset >= next_report:
+                progress(self, offset, end)
+                next_report = offset + _PROGRESS_STEP
+            tag_type = view[offset]
+            data_size = (view[offset+1] << 16) | (view[offset+2] << 8) | view[offset+3]
+            timestamp = (view[offset+4] << 16) | (view[offset+5] << 8) | view[offset+6] | (view[offset+7] << 24)
+            if tag_type == FLVTag.SCRIPT:
+                self._check_metadata(offset, view[offset:offset+11+data_size])
+            payload = view[offset+11:offset+11+min(data_size, _TAG_SUMMARY_SIZE)]
+            append(offset, tag_type, data_size, timestamp, *_tag_summary(tag_type, payload))
+            offset += 11 + data_size + 4
+        return min(offset, end)
+
+    def _parse_recover(self, offset: Optional[int] = None) -> int:
+        """
+        容错解析：除顺序解析的工作外，还校验每个 Tag 的类型、StreamID 和 PreviousTagSize。
+        PreviousTagSize 不符但下一个 Tag 头正常时只记录这 4 个字节；Tag 头本身不可信时，
+        用 _resync 在整块映射上搜索下一个可信的 Tag 起点，中间的字节记为一个损坏区间。
+        未使用 mmap 打开时临时映射文件，以便快速向前搜索。
+        """
+        mapped = None
+        view = self._view
+        if view is None:
+            with open(self.file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < 9:
+                    raise ValueError("Invalid FLV file")
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+        try:
+            end = len(view)
+            first_offset = self._parse_header(bytes(view[:9]))
+            if offset is None: offset = first_offset
+            progress, next_report = self._progress, offset + _PROGRESS_STEP
+            append, corrupt = self.index.append, self.corrupt_ranges
+            last_timestamp = self.index.timestamps[-1] if len(self.index) else None
+            while offset + 11 <= end:
+                if progress is not None and offset >= next_report:
+                    progress(self, offset, end)
+                    next_report = offset + _PROGRESS_STEP
+                data_size = (view[offset+1] << 16) | (view[offset+2] << 8) | view[offset+3]
+                tail = offset + 11 + data_size
+                resume = None
+                if not _tag_header_sane(view, offset):
+                    trusted = False
+                elif tail + 4 > end: # 最后一个 Tag 未写完，或 DataSize 已损坏
+                    resume = _resync(view, offset + 1, last_timestamp)
+                    trusted = resume is None
+                elif _U32.unpack_from(view, tail)[0] != data_size + 11:
+                    trusted = tail + 15 > end or _tag_header_sane(view, tail + 4)
+                    if trusted: corrupt.append([tail, tail + 4])
+                else:
+                    trusted = True
+                if not trusted:
+                    if resume is None: resume = _resync(view, offset + 1, last_timestamp)
+                    corrupt.append([offset, end if resume is None else resume])
+                    if resume is None: break
+                    offset = resume
+                    continue
+                tag_type = view[offset]
+                timestamp = (view[offset+4] << 16) | (view[offset+5] << 8) | view[offset+6] | (view[offset+7] << 24)
+                if tag_type == FLVTag.SCRIPT:
+                    self._check_metadata(offset, bytes(view[offset:tail]))
+                payload = view[offset+11:offset+11+min(data_size, _TAG_SUMMARY_SIZE)]
+                append(offset, tag_type, data_size, timestamp, *_tag_summary(tag_type, payload))
+                last_timestamp = timestamp
+                offset = tail + 4
+            payload = None # 释放对临时映射的引用
+            return min(offset, end)
+        finally:
+            if mapped is not None:
+                view.release()
+                mapped.close()
+
+    def _parse_parallel(self, offset: Optional[int], jobs: int) -> Optional[int]:
+        """
+        多进程解析：把文件切成若干字节区间，各进程先在区间内重新对齐到真实的 Tag 边界再建立索引，
+        主进程按文件顺序拼接各段索引。若某段的第一个 Tag 没有紧接上一段的结尾（对齐到了负载中的
+        伪 Tag 头），就从上一段的结尾重新顺序解析这一段，因此结果与顺序解析完全一致。
+        剩余数据不足两个分块时返回 None，由调用方顺序解析。
+        """
+        with open(self.file_path, 'rb') as f:
+            first_offset = self._parse_header(f.read(9))
+            total_size = os.fstat(f.fileno()).st_size
+        if offset is None: offset = first_offset
+        if total_size - offset < 2 * _PARALLEL_MIN_CHUNK: return None
+        chunk_size = max(_PARALLEL_MIN_CHUNK, -(-(total_size - offset) // (jobs * _PARALLEL_CHUNKS_PER_JOB)))
+        bounds = list(range(offset, total_size, chunk_size)) + [total_size]
+        ranges = list(zip(bounds[:-1], bounds[1:]))
+        tags_before = len(self.index)
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        try:
+            futures = [pool.submit(_index_chunk, self.file_path, start, stop, start != offset) for start, stop in ranges]
+            expected = offset
+            for (start, stop), future in zip(ranges, futures):
+                first, next_offset, columns = future.result()
+                if expected >= stop: continue # 上一段最后一个 Tag 跨过了整个分块
+                if first != expected:
+                    first, next_offset, columns = _index_chunk(self.file_path, expected, stop, False)
+                self.index.extend_bytes(columns)
+                expected = next_offset
+                if self._progress is not None:
+                    self._progress(self, min(expected, total_size), total_size)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        self._find_metadata(tags_before)
+        return min(expected, total_size)
+
+    def _find_metadata(self, start: int):
+        """并行解析不解码脚本 Tag，这里按文件顺序补做 _check_metadata，直到找到 onMetaData。"""
+        types, offsets, sizes = self.index.types, self.index.offsets, self.index.sizes
+        for i in range(start, len(types)):
+            if self._metadata_found: return
+            if types[i] != FLVTag.SCRIPT: continue
+            if self._view is not None:
+                self._check_metadata(offsets[i], self._view[offsets[i]:offsets[i]+11+sizes[i]])
+            else:
+                with open(self.file_path, 'rb') as f:
+                    f.seek(offsets[i])
+                    self._check_metadata(offsets[i], f.read(11 + sizes[i]))
+
+    def _check_metadata(self, offset: int, tag_data: bytes):
+        """记录文件中第一个 onMetaData 脚本 Tag 的内容。"""
+        if self._metadata_found: return
+        tag = FLVTag(offset, tag_data, {})
+        with _profile_phase(self.profiler, "metadata_amf"):
+            details = tag.details
+        if details.get("Name") == "onMetaData":
+            self.metadata = details.get("Metadata", {})
+            self.metadata_offset = offset
+            self._metadata_found = True
+
+    def _load_cache(self) -> Optional[int]:
+        """
+        读取 <file>.flvidx。缓存有效时恢复索引、元数据与分析结果并返回下一个待解析
+        Tag 的偏移量；文件自缓存后只在末尾增长时，调用方从该偏移量续读新增部分。
+        """
+        self.cache_status = 'miss'
+        try:
+            stat = os.stat(self.file_path)
+            with open(self.file_path + INDEX_CACHE_SUFFIX, 'rb') as f:
+                if f.read(len(_INDEX_CACHE_MAGIC)) != _INDEX_CACHE_MAGIC: return None
+                (info_size,) = struct.unpack('>I', f.read(4))
+                info = json.loads(f.read(info_size).decode('utf-8'))
+                if info['byteorder'] != sys.byteorder or stat.st_size < info['size']: return None
+                if info.get('recover', False) != self.recover: return None
+                unchanged = stat.st_size == info['size']
+                if unchanged and stat.st_mtime_ns != info['mtime_ns']: return None
+                if _hash_file_head(self.file_path, info['hash_size']) != info['header_hash']: return None
+                index = TagIndex()
+                for name, _ in TagIndex.COLUMNS:
+                    column = getattr(index, name)
+                    data = f.read(info['count'] * column.itemsize)
+                    # 缓存被截断或写了一半时各列长度不一致，按未命中处理
+                    if len(data) != info['count'] * column.itemsize: return None
+                    column.frombytes(data)
+                if f.read(1): return None
+            metadata = {}
+            if info['metadata_found']:
+                # onMetaData 不经过 JSON，而是从文件中重新解码，Date、Typed Object 等类型与未命中缓存时一致
+                with open(self.file_path, 'rb') as f:
+                    f.seek(info['metadata_offset'])
+                    tag_header = f.read(11)
+                    if len(tag_header) < 11: return None
+                    tag_data = tag_header + f.read(int.from_bytes(tag_header[1:4], 'big'))
+                details = FLVTag(info['metadata_offset'], tag_data, {}).details
+                if details.get("Name") != "onMetaData": return None
+                metadata = details.get("Metadata", {})
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+        self.index, self.header, self.metadata = index, info['header'], metadata
+        self.analysis = {int(i): finding for i, finding in info['analysis'].items()}
+        self.timestamp_report = info['timestamp_report']
+        self.corrupt_ranges = info.get('corrupt_ranges', [])
+        self._metadata_found, self.metadata_offset = info['metadata_found'], info['metadata_offset']
+        # 缓存不含末尾未写完的 Tag；即使文件大小未变也需要续读这一段
+        self.cache_status = 'hit' if unchanged and info['next_offset'] >= stat.st_size else 'append'
+        return info['next_offset']
+
+    def _save_cache(self):
+        """
+        写入 <file>.flvidx；只保存已完整写入的 Tag，目录不可写时静默跳过。
+        onMetaData 只记录所在偏移，读取缓存时从文件重新解码；其余内容无法原样写成 JSON 时不写缓存。
+        """
+        try:
+            stat = os.stat(self.file_path)
+            index, count = self.index, len(self.index)
+            while count and index.offsets[count-1] + 11 + index.sizes[count-1] + 4 > stat.st_size:
+                count -= 1
+            next_offset = index.offsets[count-1] + 11 + index.sizes[count-1] + 4 if count else self.header["HeaderSize"] + 4
+            hash_size = min(stat.st_size, _INDEX_CACHE_HASH_SIZE)
+            info = {
+                'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'byteorder': sys.byteorder,
+                'hash_size': hash_size, 'header_hash': _hash_file_head(self.file_path, hash_size),
+                'count': count, 'next_offset': next_offset, 'header': self.header,
+                'metadata_found': self._metadata_found,
+                'metadata_offset': self.metadata_offset,
+                'analysis': {str(i): finding for i, finding in self.analysis.items() if i < count},
+                'timestamp_report': self.timestamp_report,
+                'recover': self.recover, 'corrupt_ranges': [r for r in self.corrupt_ranges if r[1] <= next_offset],
+            }
+            info_data = json.dumps(info, ensure_ascii=False).encode('utf-8')
+        except (OSError, TypeError, ValueError):
+            return
+        cache_path = self.file_path + INDEX_CACHE_SUFFIX
+        try:
+            with open(cache_path + '.tmp', 'wb') as f:
+                f.write(_INDEX_CACHE_MAGIC + struct.pack('>I', len(info_data)) + info_data)
+                for name, _ in TagIndex.COLUMNS:
+                    f.write(getattr(index, name)[:count].tobytes())
+            os.replace(cache_path + '.tmp', cache_path)
+        except OSError:
+            # 磁盘已满等写入失败时不留下写了一半的临时文件
+            try:
+                os.remove(cache_path + '.tmp')
+            except OSError:
+                pass
+
+    def _analyze_tags(self):
+        self.analysis.clear()
+        findings, self.timestamp_report = analyze_timestamps(self.index, self.metadata)
+        if self.corrupt_ranges and len(self.index):
+            # 损坏区间记在其后第一个 Tag 上（位于文件末尾时记在最后一个 Tag 上）
+            for start, end in self.corrupt_ranges:
+                findings[min(bisect.bisect_left(self.index.offsets, end), len(self.index) - 1)] = _corruption_finding(start, end)
+            self.timestamp_report["corruption"] = {
+                "ranges": len(self.corrupt_ranges), "bytes": sum(end - start for start, end in self.corrupt_ranges)}
+        self.analysis.update(sorted(findings.items()))
+
+    def timeline(self, window_ms: int = 1000) -> Timeline:
+        """按 window_ms 聚合的时间线；每种窗口大小只计算一次，之后只补充新解析出的 Tag。"""
+        timeline = self._timelines.get(window_ms)
+        if timeline is None:
+            timeline = self._timelines[window_ms] = Timeline(window_ms)
+        timeline.update(self.index)
+        return timeline
+
+    def seek(self, time_ms: int) -> Optional[int]:
+        """返回时间点 time_ms 处或之前最近的关键帧 Tag 下标（早于第一个关键帧时返回第一个）；没有关键帧时返回 None。"""
+        return self.keyframes.find(time_ms)
+
+    def iter_payloads(self, tag_types: Tuple[int, ...] = (FLVTag.AUDIO, FLVTag.VIDEO, FLVTag.SCRIPT)) -> Iterator[Tuple[int, bytes]]:
+        """
+        按文件顺序产出 (Tag 下标, 负载)。mmap 模式下负载是映射上的 memoryview；
+        否则使用独立的大缓冲文件句柄顺序读取，可以在后台线程中与 get_tag() 并用。
+        """
+        index = self.index
+        if self._view is not None:
+            view = self._view
+            for i, tag_type in enumerate(index.types):
+                if tag_type in tag_types:
+                    start = index.offsets[i] + 11
+                    yield i, view[start:start + index.sizes[i]]
+            return
+        with self._open_reader(buffering=1024 * 1024) as f:
+            for i, tag_type in enumerate(index.types):
+                if tag_type in tag_types:
+                    f.seek(index.offsets[i] + 11)
+                    yield i, f.read(index.sizes[i])
+
+    def get_header_info(self) -> Dict[str, Any]:
+        return {"File": self.file_name, **self.header}
+
+_AUDIO_GAP_SLOTS = 256 # TagAnalyzer 最多记录的不同音频间隔数
+
+class TagAnalyzer:
+    """
+    增量版的时间戳跳跃分析，逐个 Tag 调用 feed()，只保留常数大小的状态。
+    音频的预期间隔取目前为止最常见的间隔（次数相同时取最先出现的，与 Counter.most_common 一致），
+    因此在流的开头可能与整文件分析略有差异。众数随计数增量维护；不同间隔超过 _AUDIO_GAP_SLOTS 个时
+    计数减半并删除归零的间隔，长时间运行的直播流状态也不会增长。
+    """
+    def __init__(self, metadata: Optional[Dict[str, Any]] = None):
+        self.metadata = metadata if metadata is not None else {}
+        self._last_video_ts: Optional[int] = None
+        self._last_audio_ts: Optional[int] = None
+        self._audio_count = 0
+        self._audio_gaps: Dict[int, List[int]] = {} # 间隔 -> [出现次数, 首次出现的序号]
+        self._audio_mode: Optional[Tuple[int, int, int]] = None # (间隔, 出现次数, 首次出现的序号)
+        self._gap_serial = 0
+
+    def _count_audio_gap(self, gap: int):
+        entry = self._audio_gaps.get(gap)
+        if entry is None:
+            while len(self._audio_gaps) >= _AUDIO_GAP_SLOTS:
+                self._decay_audio_gaps()
+            entry = self._audio_gaps[gap] = [0, self._gap_serial]
+            self._gap_serial += 1
+        entry[0] += 1
+        mode = self._audio_mode
+        if mode is None or entry[0] > mode[1] or (entry[0] == mode[1] and entry[1] < mode[2]):
+            self._audio_mode = (gap, entry[0], entry[1])
+
+    def _decay_audio_gaps(self):
+        self._audio_gaps = {gap: [count >> 1, serial] for gap, (count, serial) in self._audio_gaps.items() if count > 1}
+        self._audio_mode = max(((gap, count, serial) for gap, (count, serial) in self._audio_gaps.items()),
+                               key=lambda mode: (mode[1], -mode[2]), default=None)
+
+    def feed(self, tag_type: int, timestamp: int, packet_type: int = PACKET_CODED_FRAMES) -> Dict[str, Any]:
+        """分析一个 Tag，返回其 analysis 字典（无问题时为空）；非媒体帧（序列头等）直接跳过。"""
+        if packet_type != PACKET_CODED_FRAMES:
+            return {}
+        if tag_type == FLVTag.VIDEO:
+            prev, self._last_video_ts = self._last_video_ts, timestamp
+            framerate = self.metadata.get('framerate')
+            if prev is not None and timestamp < prev:
+                return _backwards_finding("video", "视频", timestamp - prev)
+            if prev is not None and framerate and framerate > 0:
+                gap, expected_interval = timestamp - prev, 1000 / framerate
+                if gap > expected_interval * 2:
+                    return _video_gap_finding(gap, expected_interval)
+        elif tag_type == FLVTag.AUDIO:
+            prev, self._last_audio_ts = self._last_audio_ts, timestamp
+            self._audio_count += 1
+            if prev is not None:
+                gap = timestamp - prev
+                if gap < 0: return _backwards_finding("audio", "音频", gap)
+                if gap > 0: self._count_audio_gap(gap)
+                if self._audio_count > 10 and self._audio_mode is not None:
+                    expected_interval = self._audio_mode[0]
+                    if gap > expected_interval * 2.5:
+                        return _audio_gap_finding(gap, expected_interval)
+        return {}
+
+class FLVStreamReader:
+    """
+    从任意可读字节流（文件、管道、stdin）中逐个读取 Tag。
+    follow=True 时，读到末尾后会按 poll_interval 轮询等待新数据，适用于仍在写入的录制文件；
+    idle_timeout 秒内没有新数据则结束。每个 Tag 读完即交给调用方，内存占用与文件长度无关。
+    """
+    def __init__(self, fileobj: IO[bytes], follow: bool = False, poll_interval: float = 0.5,
+                 idle_timeout: Optional[float] = None, analyze: bool = True):
+        self.fileobj = fileobj
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.header: Dict[str, Any] = {}
+        self.metadata: Dict[str, Any] = {}
+        self.analyzer = TagAnalyzer(self.metadata) if analyze else None
+        self.offset = 0
+
+    def _read_exact(self, size: int) -> bytes:
+        chunks, remaining, idle_since = [], size, None
+        while remaining > 0:
+            chunk = self.fileobj.read(remaining)
+            if chunk:
+                chunks.append(chunk)
+                remaining -= len(chunk)
+                idle_since = None
+                continue
+            if not self.follow: break
+            now = time.monotonic()
+            if idle_since is None: idle_since = now
+            if self.idle_timeout is not None and now - idle_since >= self.idle_timeout: break
+            time.sleep(self.poll_interval)
+        return b''.join(chunks)
+
+    def __iter__(self) -> Iterator[FLVTag]:
+        self.header = _parse_flv_header(self._read_exact(9))
+        # 跳过扩展头和第一个 PreviousTagSize；管道不可 seek，因此直接读掉
+        self._read_exact(self.header["HeaderSize"] - 9 + 4)
+        self.offset = self.header["HeaderSize"] + 4
+        while True:
+            tag_header = self._read_exact(11)
+            if len(tag_header) < 11: return
+            data_size = (tag_header[1] << 16) | (tag_header[2] << 8) | tag_header[3]
+            payload = self._read_exact(data_size)
+            tag = FLVTag(self.offset, tag_header + payload, self.metadata)
+            if tag.tag_type == FLVTag.SCRIPT and not self.metadata and tag.details.get("Name") == "onMetaData":
+                # 原地更新，之前产出的 Tag 与分析器共享同一个字典
+                self.metadata.update(tag.details.get("Metadata", {}))
+            if self.analyzer is not None:
+                tag.analysis = self.analyzer.feed(tag.tag_type, tag.timestamp, _tag_summary(tag.tag_type, tag.data)[3])
+            yield tag
+            if len(payload) < data_size or len(self._read_exact(4)) < 4: return
+            self.offset += 11 + data_size + 4
+
+def iter_tags(fileobj: IO[bytes], follow: bool = False, poll_interval: float = 0.5,
+              idle_timeout: Optional[float] = None, analyze: bool = True) -> Iterator[FLVTag]:
+    """
+    流式解析 FLV 字节流，逐个产出 FLVTag，例如:
+        for tag in iter_tags(sys.stdin.buffer): ...
+        for tag in iter_tags(open(path, 'rb'), follow=True): ...
+    """
+    return iter(FLVStreamReader(fileobj, follow, poll_interval, idle_timeout, analyze))
+
+# --- Live Monitoring (HTTP-FLV) ---
+
+_PUSH_SCRIPT_LIMIT = 64 * 1024 # 推送式解析时脚本 Tag 最多保留的字节数（用于解析 onMetaData）
+_LIVE_READ_SIZE = 64 * 1024
+_LIVE_MAX_REDIRECTS = 5
+
+class FLVPushParser:
+    """
+    推送式（不做 I/O 的）FLV 解析器：feed() 接收任意切分的字节块（例如 socket 每次读到的数据），
+    返回其中已完整的 Tag。负载只保留开头 _TAG_SUMMARY_SIZE 字节用于提取索引列，
+    脚本 Tag 保留不超过 _PUSH_SCRIPT_LIMIT 字节，其余字节直接跳过，内存占用与 Tag 大小和流的长度无关。
+    """
+    def __init__(self):
+        self.header: Dict[str, Any] = {}
+        self.tags = 0
+        self.bytes = 0
+        self._buffer = bytearray()
+        self._stage = 0 # 0: 等待文件头, 1: 等待 Tag 头, 2: 等待负载开头
+        self._need = 9 # 当前阶段需要在 _buffer 中凑齐的字节数
+        self._skip = 0 # 需要丢弃的字节数（负载剩余部分与 PreviousTagSize）
+        self._size = 0
+
+    def feed(self, data) -> List[Tuple[int, int, int, int, int, int, int, Optional[bytes]]]:
+        """
+        解析一块数据，返回其中完整的 Tag：
+        (类型, 时间戳, DataSize, CTS, frame type, codec, packet type, 脚本 Tag 的负载或 None)。
+        数据不是合法的 FLV 时抛出 ValueError。
+        """
+        tags = []
+        view = memoryview(data)
+        pos, end = 0, len(view)
+        self.bytes += end
+        buffer = self._buffer
+        while pos < end:
+            if self._skip:
+                step = min(self._skip, end - pos)
+                self._skip -= step
+                pos += step
+                continue
+            if self._stage == 1 and not buffer and end - pos >= 11:
+                # 快速路径：Tag 头与负载开头都在这块数据中时直接解析，不复制到缓冲区
+                keep = self._start_tag(view, pos)
+                if end - pos >= 11 + keep:
+                    self._finish_tag(view, pos, keep, tags)
+                    pos += 11 + keep
+                    continue
+            take = min(self._need - len(buffer), end - pos)
+            buffer += view[pos:pos + take]
+            pos += take
+            if len(buffer) < self._need: break
+            self._advance(tags)
+        return tags
+
+    def _advance(self, tags: list):
+        buffer = self._buffer
+        if self._stage == 0:
+            self.header = _parse_flv_header(bytes(buffer))
+            self._skip = self.header["HeaderSize"] - 9 + 4
+            del buffer[:]
+            self._stage, self._need = 1, 11
+            return
+        if self._stage == 1:
+            keep = self._start_tag(buffer, 0)
+            self._stage, self._need = 2, 11 + keep
+            if keep: return
+        self._finish_tag(buffer, 0, len(buffer) - 11, tags)
+        del buffer[:]
+        self._stage, self._need = 1, 11
+
+    def _start_tag(self, view, pos: int) -> int:
+        """校验 pos 处的 Tag 头，返回需要保留的负载字节数。"""
+        if not _tag_header_sane(view, pos):
+            raise ValueError(f"invalid tag header after {self.tags} tags")
+        self._size = (view[pos+1] << 16) | (view[pos+2] << 8) | view[pos+3]
+        return min(self._size, _PUSH_SCRIPT_LIMIT if view[pos] == FLVTag.SCRIPT else _TAG_SUMMARY_SIZE)
+
+    def _finish_tag(self, view, pos: int, keep: int, tags: list):
+        tag_type = view[pos]
+        timestamp = (view[pos+4] << 16) | (view[pos+5] << 8) | view[pos+6] | (view[pos+7] << 24)
+        payload = bytes(view[pos+11:pos+11+keep])
+        cts, frame_type, codec, packet_type = _tag_summary(tag_type, payload)
+        tags.append((tag_type, timestamp, self._size, cts, frame_type, codec, packet_type,
+                     payload if tag_type == FLVTag.SCRIPT else None))
+        self.tags += 1
+        self._skip = self._size - keep + 4
+
+async def _http_get(url: str, timeout: float, headers: Optional[Dict[str, str]] = None):
+    """发送 GET 请求并读完响应头，跟随重定向。返回 (reader, writer, 状态码, 小写键名的响应头)。"""
+    for _ in range(_LIVE_MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"unsupported URL: {url}")
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=parts.scheme == 'https' or None), timeout)
+        target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        request = {'Host': parts.netloc, 'User-Agent': 'flv_parser', 'Accept': '*/*', 'Connection': 'close', **(headers or {})}
+        writer.write((f"GET {target} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in request.items()) + "\r\n").encode())
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        except BaseException:
+            writer.close()
+            raise
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            status = int(lines[0].split()[1])
+        except (IndexError, ValueError):
+            writer.close()
+            raise ValueError(f"invalid HTTP response: {lines[0]!r}")
+        response_headers = {}
+        for line in lines[1:]:
+            key, sep, value = line.partition(':')
+            if sep: response_headers[key.strip().lower()] = value.strip()
+        if status in (301, 302, 303, 307, 308) and 'location' in response_headers:
+            writer.close()
+            url = urllib.parse.urljoin(url, response_headers['location'])
+            continue
+        return reader, writer, status, response_headers
+    raise ValueError(f"too many redirects: {url}")
+
+async def _http_body(reader: 'asyncio.StreamReader', headers: Dict[str, str]):
+    """
+    逐块产出响应体，支持 chunked 编码。直播服务器通常每个 Tag 发一个 chunk，
+    因此按原始数据块读取并在本地去掉分块标记，一次读到的多个 chunk 合并产出，每块数据只经过一次事件循环。
+    """
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        line = bytearray() # 未读完的 chunk 长度行
+        data_left = crlf_left = 0
+        while True:
+            raw = await reader.read(_LIVE_READ_SIZE)
+            if not raw: return
+            parts, pos, end = [], 0, len(raw)
+            while pos < end:
+                if data_left:
+                    take = min(data_left, end - pos)
+                    parts.append(raw[pos:pos + take])
+                    pos += take
+                    data_left -= take
+                    if not data_left: crlf_left = 2
+                elif crlf_left:
+                    step = min(crlf_left, end - pos)
+                    pos += step
+                    crlf_left -= step
+                else:
+                    newline = raw.find(b"\n", pos)
+                    line += raw[pos:end if newline < 0 else newline]
+                    if len(line) > 1024: raise ValueError("invalid chunked encoding")
+                    if newline < 0: break
+                    pos = newline + 1
+                    data_left = int(bytes(line).split(b';', 1)[0].strip() or b'0', 16)
+                    line.clear()
+                    if not data_left: # 最后一个 chunk
+                        if parts: yield b''.join(parts)
+                        return
+            if parts: yield parts[0] if len(parts) == 1 else b''.join(parts)
+    remaining = int(headers['content-length']) if 'content-length' in headers else None
+    while remaining is None or remaining > 0:
+        data = await reader.read(_LIVE_READ_SIZE if remaining is None else min(remaining, _LIVE_READ_SIZE))
+        if not data: return
+        if remaining is not None: remaining -= len(data)
+        yield data
+
+class _LiveStream:
+    """LiveMonitor 中一路流的状态，全部是常数大小。"""
+    def __init__(self, name: str, url: str):
+        self.name, self.url = name, url
+        self.metadata: Dict[str, Any] = {}
+        self.analyzer = TagAnalyzer(self.metadata)
+        self.parser = FLVPushParser()
+        self.writer = None # 当前连接；长时间没有数据时由 watchdog 关闭以触发重连
+        self.connected = False
+        self.sessions = 0
+        self.last_data: Optional[float] = None # time.monotonic()
+        self.stalled_since: Optional[float] = None
+        self.last_video: Optional[int] = None
+        self.last_audio: Optional[int] = None
+        self.jitter = 0.0 # 视频帧到达抖动的平滑估计 (ms)，与 RFC 3550 的到达间隔抖动相同
+        self.transit: Optional[float] = None
+        self.drift_alerted = self.fps_alerted = False
+        self.interval = Counter() # 本统计周期的计数，输出指标后清零
+        self.totals = Counter()
+
+    def reset_session(self):
+        """新连接从头开始一个 FLV，时间戳不与上一个连接比较。"""
+        self.metadata.clear()
+        self.analyzer = TagAnalyzer(self.metadata)
+        self.parser = FLVPushParser()
+        self.last_video = self.last_audio = self.transit = None
+        self.drift_alerted = False
+
+class LiveMonitor:
+    """
+    在一个进程中用 asyncio 同时拉取多路 HTTP-FLV 直播流并实时检测问题。
+    每路流的数据块直接交给 FLVPushParser 增量解析，时间戳跳跃/回退沿用 TagAnalyzer 的判断，
+    另外检测断流（stall_timeout 秒收不到数据）、视频帧到达抖动、音视频时间戳漂移超过 drift_threshold_ms
+    以及实际帧率低于 onMetaData 帧率的 fps_drop_ratio 倍。
+    告警即时输出，各路流的指标每 interval 秒输出一次，均为 dict，交给 emit（默认每行一个 JSON 写到 stdout）。
+    每路流只保留常数大小的状态；连接断开或长时间无数据时按指数退避自动重连。
+    """
+    def __init__(self, streams: List[Any], interval: float = 10.0, stall_timeout: float = 5.0,
+                 drift_threshold_ms: int = 1000, fps_drop_ratio: float = 0.8, reconnect_after: Optional[float] = None,
+                 max_backoff: float = 30.0, timeout: float = 10.0, headers: Optional[Dict[str, str]] = None,
+                 emit: Optional[Callable[[Dict[str, Any]], None]] = None):
+        # streams 中的每一项是 URL，或 (名称, URL)
+        self.streams = [_LiveStream(*item) if isinstance(item, (tuple, list)) else _LiveStream(item, item) for item in streams]
+        self.interval, self.stall_timeout = interval, stall_timeout
+        self.drift_threshold_ms, self.fps_drop_ratio = drift_threshold_ms, fps_drop_ratio
+        self.reconnect_after = reconnect_after if reconnect_after is not None else stall_timeout * 3
+        self.max_backoff, self.timeout, self.headers = max_backoff, timeout, headers
+        self._emit = emit or self._write_json
+        self._dirty = False
+        self._last_metrics = time.monotonic()
+
+    def _write_json(self, record: Dict[str, Any]):
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._dirty = True
+
+    def _alert(self, stream: _LiveStream, kind: str, **fields):
+        stream.totals["alerts"] += 1
+        self._emit({"type": "alert", "time": datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                    "stream": stream.name, "kind": kind, **fields})
+
+    async def run(self, duration: Optional[float] = None):
+        """拉取所有流，直到 duration 秒后（None 表示一直运行，直到任务被取消）。"""
+        tasks = [asyncio.ensure_future(self._pull(stream)) for stream in self.streams]
+        watchdog = asyncio.ensure_future(self._watch())
+        try:
+            await asyncio.sleep(duration) if duration is not None else await asyncio.gather(*tasks)
+        finally:
+            for task in tasks + [watchdog]: task.cancel()
+            await asyncio.gather(*tasks, watchdog, return_exceptions=True)
+            self._emit_metrics(time.monotonic(), final=True)
+            if self._dirty: sys.stdout.flush()
+
+    async def _pull(self, stream: _LiveStream):
+        backoff, failing = 1.0, False
+        while True:
+            parser = stream.parser
+            try:
+                await self._session(stream)
+                error = "stream ended"
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+                error = f"{type(e).__name__}: {e}"
+            if stream.stalled_since is not None:
+                error = f"no data for {time.monotonic() - stream.stalled_since:.1f}s"
+            if stream.connected:
+                self._alert(stream, "disconnected", error=error)
+            elif not failing: # 连续连接失败只告警一次
+                self._alert(stream, "connect_failed", error=error)
+            failing = not stream.connected
+            stream.connected, stream.stalled_since = False, None
+            if stream.parser is not parser and stream.parser.tags:
+                backoff = 1.0 # 这次连接收到过 Tag，重新从短间隔开始
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _session(self, stream: _LiveStream):
+        reader, writer, status, headers = await _http_get(stream.url, self.timeout, self.headers)
+        stream.writer = writer
+        try:
+            if status != 200: raise ValueError(f"HTTP {status}")
+            stream.reset_session()
+            stream.sessions += 1
+            stream.connected, stream.last_data = True, time.monotonic()
+            if stream.sessions > 1:
+                stream.totals["reconnects"] += 1
+                self._alert(stream, "reconnected", sessions=stream.sessions)
+            async for chunk in _http_body(reader, headers):
+                self._on_data(stream, chunk)
+        finally:
+            stream.writer = None
+            writer.close()
+
+    def _on_data(self, stream: _LiveStream, chunk: bytes):
+        now = time.monotonic()
+        stream.last_data = now
+        if stream.stalled_since is not None:
+            self._alert(stream, "resumed", stall_ms=int((now - stream.stalled_since) * 1000))
+            stream.stalled_since = None
+        counts = stream.interval
+        counts["bytes"] += len(chunk)
+        arrival_ms = now * 1000
+        for tag_type, timestamp, size, _, frame_type, _, packet_type, script in stream.parser.feed(chunk):
+            if script is not None:
+                if not stream.metadata:
+                    try:
+                        name, pos = decode_amf0(script)
+                        if name == "onMetaData":
+                            metadata = decode_amf0(script, pos)[0]
+                            if isinstance(metadata, dict): stream.metadata.update(metadata)
+                    except (ValueError, IndexError, struct.error):
+                        pass
+                continue
+            finding = stream.analyzer.feed(tag_type, timestamp, packet_type)
+            if finding:
+                kind = finding['Kind']
+                counts["backwards" if kind.endswith("backwards") else "gaps"] += 1
+                self._alert(stream, kind, timestamp=timestamp, delta_ms=finding['Delta (ms)'], message=finding['Warning'])
+            if packet_type != PACKET_CODED_FRAMES: continue
+            if tag_type == FLVTag.VIDEO:
+                counts["video_frames"] += 1
+                counts["video_bytes"] += size
+                if frame_type == 1: counts["keyframes"] += 1
+                transit = arrival_ms - timestamp
+                if stream.transit is not None:
+                    stream.jitter += (abs(transit - stream.transit) - stream.jitter) / 16
+                stream.transit = transit
+                stream.last_video = timestamp
+            else:
+                counts["audio_frames"] += 1
+                counts["audio_bytes"] += size
+                stream.last_audio = timestamp
+            if stream.last_video is not None and stream.last_audio is not None:
+                drift = abs(stream.last_audio - stream.last_video)
+                if drift > self.drift_threshold_ms and not stream.drift_alerted:
+                    stream.drift_alerted = True
+                    self._alert(stream, "av_drift", timestamp=timestamp, drift_ms=stream.last_audio - stream.last_video)
+                elif drift <= self.drift_threshold_ms / 2:
+                    stream.drift_alerted = False
+
+    async def _watch(self):
+        """定期检查断流并按 interval 输出指标。"""
+        tick = min(0.5, self.stall_timeout / 4, self.interval)
+        self._last_metrics = time.monotonic()
+        while True:
+            await asyncio.sleep(tick)
+            now = time.monotonic()
+            for stream in self.streams:
+                if not stream.connected or stream.last_data is None: continue
+                idle = now - stream.last_data
+                if idle >= self.stall_timeout and stream.stalled_since is None:
+                    stream.stalled_since = stream.last_data
+                    stream.interval["stalls"] += 1
+                    self._alert(stream, "stall", idle_ms=int(idle * 1000))
+                if idle >= self.reconnect_after and stream.writer is not None:
+                    stream.writer.close() # 读取随之结束，_pull 重新连接
+                    stream.writer = None
+            if now - self._last_metrics >= self.interval:
+                self._emit_metrics(now)
+            if self._dirty:
+                sys.stdout.flush()
+                self._dirty = False
+
+    def _emit_metrics(self, now: float, final: bool = False):
+        """输出并清零本周期的指标；final 为退出前不足一个周期的最后一次输出，不做帧率告警。"""
+        seconds = max(now - self._last_metrics, 1e-3)
+        self._last_metrics = now
+        for stream in self.streams:
+            counts = stream.interval
+            drift = None if stream.last_video is None or stream.last_audio is None else stream.last_audio - stream.last_video
+            video_fps = counts["video_frames"] / seconds
+            self._emit({
+                "type": "metrics", "time": datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                "stream": stream.name, "connected": stream.connected,
+                "video_fps": round(video_fps, 2), "audio_pps": round(counts["audio_frames"] / seconds, 2),
+                "video_kbps": round(counts["video_bytes"] * 8 / 1000 / seconds, 1),
+                "audio_kbps": round(counts["audio_bytes"] * 8 / 1000 / seconds, 1),
+                "keyframes": counts["keyframes"], "gaps": counts["gaps"], "backwards": counts["backwards"],
+                "stalls": counts["stalls"], "jitter_ms": round(stream.jitter, 1), "av_drift_ms": drift,
+                "bytes": counts["bytes"], "reconnects": stream.totals["reconnects"],
+                "idle_s": None if stream.last_data is None else round(now - stream.last_data, 1),
+            })
+            framerate = stream.metadata.get('framerate')
+            if not final and stream.connected and isinstance(framerate, (int, float)) and framerate > 0:
+                if video_fps < framerate * self.fps_drop_ratio and not stream.fps_alerted:
+                    stream.fps_alerted = True
+                    self._alert(stream, "fps_drop", video_fps=round(video_fps, 2), expected_fps=framerate)
+                elif video_fps >= framerate * self.fps_drop_ratio:
+                    stream.fps_alerted = False
+            stream.totals.update(counts)
+            counts.clear()
+
+# --- Native Demuxer ---
+
+ANNEXB_START_CODE = b'\x00\x00\x00\x01'
+_DEMUX_BUFFER_SIZE = 1024 * 1024
+
+def _parse_avcc(record: bytes) -> Tuple[int, List[bytes], List[bytes]]:
+    """解析 AVCDecoderConfigurationRecord，返回 (NALU 长度字段字节数, SPS 列表, PPS 列表)。"""
+    if len(record) < 7 or record[0] != 1:
+        raise ValueError("Invalid AVCDecoderConfigurationRecord")
+    nal_length_size = (record[4] & 0x3) + 1
+    pos, parameter_sets = 5, []
+    for count_mask in (0x1F, 0xFF): # SPS 个数占低 5 位，PPS 个数占整个字节
+        count = record[pos] & count_mask
+        pos += 1
+        sets = []
+        for _ in range(count):
+            length = (record[pos] << 8) | record[pos+1]
+            sets.append(bytes(record[pos+2:pos+2+length]))
+            pos += 2 + length
+        parameter_sets.append(sets)
+    return nal_length_size, parameter_sets[0], parameter_sets[1]
+
+def _iter_avcc_nalus(data: bytes, nal_length_size: int) -> Iterator[bytes]:
+    pos, end = 0, len(data)
+    while pos + nal_length_size <= end:
+        length = int.from_bytes(data[pos:pos+nal_length_size], 'big')
+        pos += nal_length_size
+        yield data[pos:pos+length]
+        pos += length
+
+def _adts_header(object_type: int, freq_index: int, channels: int, frame_length: int) -> bytes:
+    # ADTS 只能表示 4 种 profile，SBR/PS 等扩展按 AAC LC 输出，由解码器隐式识别
+    profile = object_type - 1 if 1 <= object_type <= 4 else 1
+    return bytes((
+        0xFF, 0xF1,
+        (profile << 6) | (freq_index << 2) | ((channels >> 2) & 0x1),
+        ((channels & 0x3) << 6) | ((frame_length >> 11) & 0x3),
+        (frame_length >> 3) & 0xFF,
+        ((frame_length & 0x7) << 5) | 0x1F,
+        0xFC,
+    ))
+
+def _adts_config(payload: bytes, start: int) -> Optional[Tuple[int, int, int]]:
+    """
+    从 AAC 序列头的 AudioSpecificConfig 取出 ADTS 头需要的 (object_type, freq_index, channels)。
+    数据不足或采样率为显式值（freq_index 为 15，ADTS 无法表示）时返回 None。
+    """
+    if len(payload) < start + 2: return None
+    config = (payload[start] << 8) | payload[start+1]
+    freq_index = (config >> 7) & 0xF
+    if freq_index == 15: return None
+    return config >> 11, freq_index, (config >> 3) & 0xF
+
+def can_demux_natively(flv_file: 'FLVFile') -> bool:
+    """文件中的音视频是否都是内置解复用器支持的 AVC / AAC，且 AAC 序列头都能写成 ADTS。"""
+    index = flv_file.index
+    if not all(codec == 7 if tag_type == FLVTag.VIDEO else codec == 10
+               for tag_type, codec in zip(index.types, index.codecs)
+               if tag_type in (FLVTag.VIDEO, FLVTag.AUDIO)):
+        return False
+    for i, (tag_type, packet_type) in enumerate(zip(index.types, index.packet_types)):
+        if tag_type == FLVTag.AUDIO and packet_type == PACKET_SEQUENCE_START:
+            payload = flv_file.get_tag(i).data
+            if len(payload) < 2: continue
+            start = _audio_tag_header(payload)[2]
+            if len(payload) >= start + 2 and _adts_config(payload, start) is None:
+                return False
+    return True
+
+def demux_streams(flv_file: 'FLVFile', video_path: Optional[str] = None,
+                  audio_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    一次顺序扫描，把 AVC 视频写成 Annex-B 格式的 .h264、AAC 音频写成 ADTS 格式的 .aac。
+    每个关键帧前都会重复写入序列头中的 SPS/PPS，使输出从任意 IDR 开始都可解码。
+    非 AVC / AAC 的 Tag、ADTS 无法表示的 AAC 序列头及其后的音频帧被跳过并计入 skipped_tags，视频照常写完。
+    """
+    stats = {"video_frames": 0, "audio_frames": 0, "video_bytes": 0, "audio_bytes": 0, "skipped_tags": 0}
+    tag_types = tuple(t for t, path in ((FLVTag.VIDEO, video_path), (FLVTag.AUDIO, audio_path)) if path)
+    video_out = open(video_path, 'wb', buffering=_DEMUX_BUFFER_SIZE) if video_path else None
+    audio_out = None
+    try:
+        audio_out = open(audio_path, 'wb', buffering=_DEMUX_BUFFER_SIZE) if audio_path else None
+        nal_length_size, parameter_sets = 4, b''
+        asc = None # (object_type, freq_index, channels)
+        frame_types = flv_file.index.frame_types
+        for i, payload in flv_file.iter_payloads(tag_types):
+            if len(payload) < 2:
+                continue
+            if flv_file.index.types[i] == FLVTag.VIDEO:
+                _, codec, packet_type, _, start = _video_tag_header(payload)
+                if codec != 7 or start >= len(payload):
+                    stats["skipped_tags"] += 1
+                    continue
+                if packet_type == PACKET_SEQUENCE_START:
+                    nal_length_size, sps, pps = _parse_avcc(payload[start:])
+                    parameter_sets = b''.join(ANNEXB_START_CODE + nalu for nalu in sps + pps)
+                elif packet_type == PACKET_CODED_FRAMES:
+                    chunks = [parameter_sets] if frame_types[i] == 1 else []
+                    for nalu in _iter_avcc_nalus(payload[start:], nal_length_size):
+                        chunks.append(ANNEXB_START_CODE)
+                        chunks.append(nalu)
+                    frame = b''.join(chunks)
+                    video_out.write(frame)
+                    stats["video_frames"] += 1
+                    stats["video_bytes"] += len(frame)
+            else:
+                codec, packet_type, start = _audio_tag_header(payload)
+                if codec != 10:
+                    stats["skipped_tags"] += 1
+                    continue
+                if packet_type == PACKET_SEQUENCE_START:
+                    if len(payload) < start + 2: continue
+                    asc = _adts_config(payload, start)
+                    if asc is None: stats["skipped_tags"] += 1
+                elif packet_type == PACKET_CODED_FRAMES and asc is None:
+                    stats["skipped_tags"] += 1
+                elif packet_type == PACKET_CODED_FRAMES:
+                    raw = payload[start:]
+                    audio_out.write(_adts_header(*asc, frame_length=7 + len(raw)))
+                    audio_out.write(raw)
+                    stats["audio_frames"] += 1
+                    stats["audio_bytes"] += 7 + len(raw)
+    finally:
+        if video_out is not None: video_out.close()
+        if audio_out is not None: audio_out.close()
+    return stats
+
+# --- Keyframe Injection ---
+
+def _copy_range(src: IO[bytes], dst: IO[bytes], start: int, length: int):
+    src.seek(start)
+    while length > 0:
+        chunk = src.read(min(length, _DEMUX_BUFFER_SIZE))
+        if not chunk: break
+        dst.write(chunk)
+        length -= len(chunk)
+
+def write_with_keyframes(flv_file: 'FLVFile', output_path: str) -> int:
+    """
+    复制文件并在 onMetaData 中写入 keyframes.times / keyframes.filepositions（没有 onMetaData 时新建一个）。
+    filepositions 已计入新元数据 Tag 长度变化带来的偏移。返回写入的关键帧数。
+    """
+    index, keyframes = flv_file.index, flv_file.keyframes
+    metadata = dict(flv_file.metadata) if isinstance(flv_file.metadata, dict) else {}
+    if flv_file.metadata_offset is None:
+        insert_at, old_total, timestamp = flv_file.header["HeaderSize"] + 4, 0, 0
+    else:
+        i = bisect.bisect_left(index.offsets, flv_file.metadata_offset)
+        insert_at, old_total, timestamp = index.offsets[i], 11 + index.sizes[i] + 4, index.timestamps[i]
+    offsets = [index.offsets[i] for i in keyframes.positions]
+
+    def build(filepositions):
+        metadata["hasKeyframes"] = True
+        metadata["keyframes"] = {"times": [t / 1000 for t in keyframes.times], "filepositions": filepositions}
+        return _encode_amf_value("onMetaData") + _encode_amf_value(metadata, ecma_array=True)
+
+    # AMF 数值固定 8 字节，先用占位值算出新 Tag 长度，再据此修正各关键帧的文件偏移
+    delta = 11 + len(build([0.0] * len(offsets))) + 4 - old_total
+    payload = build([float(o + delta if o >= insert_at else o) for o in offsets])
+    with flv_file._open_reader() as src, open(output_path, 'wb', buffering=_DEMUX_BUFFER_SIZE) as out:
+        _copy_range(src, out, 0, insert_at)
+        _write_tag(out, FLVTag.SCRIPT, timestamp, payload)
+        end = src.seek(0, os.SEEK_END)
+        _copy_range(src, out, insert_at + old_total, end - insert_at - old_total)
+    return len(offsets)
+
+def write_repaired(flv_file: 'FLVFile', output_path: str) -> Dict[str, int]:
+    """
+    按容错解析（recover=True）得到的索引重写文件：去掉损坏区间和末尾未写完的 Tag，
+    并改正不符的 PreviousTagSize。相邻的完好 Tag 整段复制。返回写入的 Tag 数、输出字节数和丢弃的字节数。
+    """
+    if not flv_file.recover:
+        raise ValueError("write_repaired() requires an FLVFile opened with recover=True")
+    index = flv_file.index
+    corrupt_starts = {start for start, _ in flv_file.corrupt_ranges}
+    with open(flv_file.file_path, 'rb') as src, open(output_path, 'wb', buffering=_DEMUX_BUFFER_SIZE) as out:
+        file_size = os.fstat(src.fileno()).st_size
+        _copy_range(src, out, 0, flv_file.header["HeaderSize"])
+        out.write(b'\x00\x00\x00\x00')
+        tags, run_start, position = 0, None, None
+        for offset, size in zip(index.offsets, index.sizes):
+            tail = offset + 11 + size
+            if tail > file_size: break # 最后一个 Tag 未写完
+            if offset != position: # 前面是被跳过的损坏区间
+                if run_start is not None: _copy_range(src, out, run_start, position - run_start)
+                run_start = offset
+            if tail in corrupt_starts or tail + 4 > file_size:
+                _copy_range(src, out, run_start, tail - run_start)
+                out.write(_U32.pack(11 + size))
+                run_start = tail + 4
+            position = tail + 4
+            tags += 1
+        if run_start is not None: _copy_range(src, out, run_start, position - run_start)
+        written = out.tell()
+    return {"tags": tags, "bytes": written, "dropped_bytes": max(file_size - written, 0)}
+
+_KERNEL_COPY_CHUNK = 1 << 30 # 单次 copy_file_range / sendfile 调用最多复制的字节数
+# 只有这些错误表示平台或文件系统不支持，改用普通复制；其余错误（如 EBADF）照常抛出
+_KERNEL_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+def _kernel_copy(src: IO[bytes], dst: IO[bytes], start: int, length: int) -> int:
+    """
+    把 src 的 [start, start + length) 追加到 dst 当前位置，数据在内核中复制（copy_file_range，其次 Linux 的 sendfile），
+    不经过用户态缓冲。返回经由内核复制的字节数；平台或文件系统不支持时剩余部分由 _copy_range 复制。
+    其他系统的 sendfile 只能写入套接字，不使用。
+    """
+    dst.flush()
+    in_fd, out_fd = src.fileno(), dst.fileno()
+    copied = 0
+    for name in ('copy_file_range', 'sendfile'):
+        call = getattr(os, name, None)
+        if call is None or (name == 'sendfile' and sys.platform != 'linux'): continue
+        try:
+            while length > 0:
+                count = min(length, _KERNEL_COPY_CHUNK)
+                n = call(in_fd, out_fd, count, start) if name == 'copy_file_range' else call(out_fd, in_fd, start, count)
+                if n == 0: break
+                start, length, copied = start + n, length - n, copied + n
+            return copied
+        except OSError as e:
+            if e.errno not in _KERNEL_COPY_FALLBACK_ERRNOS: raise
+    _copy_range(src, dst, start, length)
+    return copied
+
+def _cut_plan(index: 'TagIndex', positions, base: int):
+    """
+    截取要复制的 Tag（下标升序）→ (字节段 [(源偏移, 长度)], 各 Tag 在输出正文中的相对偏移, 新时间戳)。
+    文件中相邻的 Tag 合并为一段，被跳过的 Tag 或损坏区间处断开。
+    """
+    if np is not None:
+        cols = index.to_numpy()
+        positions = np.asarray(positions, dtype=np.int64)
+        offsets = cols['offsets'][positions].astype(np.int64)
+        lengths = cols['sizes'][positions].astype(np.int64) + 15
+        timestamps = np.maximum(cols['timestamps'][positions].astype(np.int64) - base, 0)
+        out_offsets = np.cumsum(lengths) - lengths
+        breaks = np.flatnonzero(offsets[1:] != offsets[:-1] + lengths[:-1]) + 1
+        starts = np.concatenate(([0], breaks)) if len(positions) else breaks
+        ends = np.concatenate((breaks, [len(positions)])) if len(positions) else breaks
+        runs = list(zip(offsets[starts].tolist(), (out_offsets[ends - 1] + lengths[ends - 1] - out_offsets[starts]).tolist()))
+        return runs, out_offsets, timestamps
+    runs, out_offsets, timestamps, position = [], array('Q'), array('I'), 0
+    for i in positions:
+        offset, length = index.offsets[i], index.sizes[i] + 15
+        if runs and runs[-1][0] + runs[-1][1] == offset:
+            runs[-1][1] += length
+        else:
+            runs.append([offset, length])
+        out_offsets.append(position)
+        timestamps.append(max(index.timestamps[i] - base, 0))
+        position += length
+    return [tuple(run) for run in runs], out_offsets, timestamps
+
+def _patch_timestamps(output_path: str, tag_offsets, timestamps):
+    """就地改写输出文件中各 Tag 头的 3+1 字节时间戳（TimestampExtended 在后）。"""
+    if not len(tag_offsets): return
+    with open(output_path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+        if np is not None:
+            view = np.frombuffer(mm, dtype=np.uint8)
+            for k, shift in enumerate((16, 8, 0, 24)):
+                view[tag_offsets + 4 + k] = (timestamps >> shift) & 0xFF
+            del view
+        else:
+            for offset, ts in zip(tag_offsets, timestamps):
+                mm[offset+4:offset+8] = bytes(((ts >> 16) & 0xFF, (ts >> 8) & 0xFF, ts & 0xFF, (ts >> 24) & 0xFF))
+
+def cut_flv(flv_file: 'FLVFile', output_path: str, start_ms: int, end_ms: Optional[int] = None) -> Dict[str, Any]:
+    """
+    无损截取 [start_ms, end_ms) 区间（end_ms 为 None 时截到文件末尾），不重新封装。
+    起点向前对齐到最近的关键帧；没有视频关键帧时对齐到第一个不早于 start_ms 的音频帧。
+    输出依次为 FLV 文件头、改写了 duration / filesize（原有 keyframes 时一并重建）的 onMetaData、
+    起点之前最后的音视频序列头，然后是区间内的 Tag：相邻的 Tag 整段复制（本地文件在内核中复制），
+    之后只改写每个 Tag 头中 3+1 字节的时间戳，使输出从 0 开始。原有的 onMetaData 以及与前置序列头相同的序列头不再复制。
+    返回实际起止时间、Tag 数、输出字节数与经由内核复制的字节数。
+    """
+    if end_ms is not None and end_ms <= start_ms:
+        raise ValueError("end_ms must be greater than start_ms")
+    index = flv_file.index
+    types, timestamps, packet_types = index.types, index.timestamps, index.packet_types
+    count = len(index)
+    if np is not None:
+        cols = index.to_numpy()
+        frames = np.isin(cols['types'], (FLVTag.AUDIO, FLVTag.VIDEO)) & (cols['packet_types'] == PACKET_CODED_FRAMES)
+
+    def first_frame_at(lo: int, ms: int) -> Optional[int]:
+        """lo 之后第一个时间戳不早于 ms 的音视频帧。"""
+        if np is not None:
+            hits = np.flatnonzero(frames[lo:] & (cols['timestamps'][lo:] >= ms))
+            return lo + int(hits[0]) if len(hits) else None
+        return next((i for i in range(lo, count) if types[i] in (FLVTag.AUDIO, FLVTag.VIDEO)
+                     and packet_types[i] == PACKET_CODED_FRAMES and timestamps[i] >= ms), None)
+
+    if first_frame_at(0, start_ms) is None:
+        raise ValueError(f"no frames at or after {start_ms} ms")
+    start = flv_file.keyframes.find(start_ms) if len(flv_file.keyframes) else first_frame_at(0, start_ms)
+    stop = count if end_ms is None else (first_frame_at(start + 1, end_ms) or count)
+    while stop > start and index.offsets[stop-1] + index.sizes[stop-1] + 15 > flv_file.file_size:
+        stop -= 1 # 最后一个 Tag 未写完
+    base = timestamps[start]
+
+    # 起点之前最后的音视频序列头作为输出的前置 Tag
+    preamble: Dict[int, bytes] = {}
+    for i in range(start - 1, -1, -1):
+        if types[i] in (FLVTag.AUDIO, FLVTag.VIDEO) and types[i] not in preamble and packet_types[i] == PACKET_SEQUENCE_START:
+            preamble[types[i]] = flv_file.get_tag(i).data
+            if len(preamble) == 2: break
+    # 区间内的脚本 Tag 与序列头（packet type 均为 0）逐个检查，其余 Tag 原样保留
+    if np is not None:
+        special = (start + np.flatnonzero(cols['packet_types'][start:stop] == PACKET_SEQUENCE_START)).tolist()
+    else:
+        special = [i for i in range(start, stop) if packet_types[i] == PACKET_SEQUENCE_START]
+    dropped = set()
+    for i in special:
+        tag = flv_file.get_tag(i)
+        if (tag.tag_type == FLVTag.SCRIPT and tag.details.get("Name") == "onMetaData") or preamble.get(tag.tag_type) == tag.data:
+            dropped.add(i)
+    if np is not None:
+        positions = np.arange(start, stop)
+        if dropped: positions = positions[~np.isin(positions, list(dropped))]
+        keys = np.flatnonzero((cols['types'][positions] == FLVTag.VIDEO) & (cols['frame_types'][positions] == 1)
+                              & (cols['packet_types'][positions] == PACKET_CODED_FRAMES))
+    else:
+        positions = [i for i in range(start, stop) if i not in dropped]
+        keys = [k for k, i in enumerate(positions)
+                if types[i] == FLVTag.VIDEO and index.frame_types[i] == 1 and packet_types[i] == PACKET_CODED_FRAMES]
+
+    runs, tag_offsets, new_timestamps = _cut_plan(index, positions, base)
+    body_size = sum(length for _, length in runs)
+    metadata = dict(flv_file.metadata) if isinstance(flv_file.metadata, dict) else {}
+    last_ms = int(max(new_timestamps)) if len(new_timestamps) else 0
+
+    def build_metadata(filesize: float, body_start: int) -> bytes:
+        metadata["duration"] = last_ms / 1000
+        metadata["filesize"] = filesize
+        if isinstance(metadata.get("keyframes"), dict):
+            metadata["keyframes"] = {"times": [int(new_timestamps[k]) / 1000 for k in keys],
+                                     "filepositions": [float(body_start + int(tag_offsets[k])) for k in keys]}
+        return _encode_amf_value("onMetaData") + _encode_amf_value(metadata, ecma_array=True)
+
+    # AMF 数值固定 8 字节，先用占位值确定 onMetaData 的长度，再得到正文起点与文件大小
+    head_size = 13 + 11 + len(build_metadata(0.0, 0)) + 4 + sum(11 + len(p) + 4 for p in preamble.values())
+    header = flv_file.header
+    flags = (4 if header.get("HasAudio") else 0) | (1 if header.get("HasVideo") else 0)
+    kernel_bytes = 0
+    with flv_file._open_reader() as src, open(output_path, 'wb', buffering=_DEMUX_BUFFER_SIZE) as out:
+        out.write(b'FLV\x01' + bytes((flags,)) + struct.pack('>II', 9, 0))
+        _write_tag(out, FLVTag.SCRIPT, 0, build_metadata(float(head_size + body_size), head_size))
+        for tag_type in (FLVTag.VIDEO, FLVTag.AUDIO):
+            if tag_type in preamble: _write_tag(out, tag_type, 0, preamble[tag_type])
+        for offset, length in runs:
+            if flv_file.remote is None:
+                kernel_bytes += _kernel_copy(src, out, offset, length)
+            else:
+                _copy_range(src, out, offset, length)
+    if base: # 从 0 开始的区间时间戳不变，无需改写
+        if np is not None: tag_offsets = tag_offsets + head_size
+        else: tag_offsets = [head_size + o for o in tag_offsets]
+        _patch_timestamps(output_path, tag_offsets, new_timestamps)
+    return {"start_ms": base, "end_ms": base + last_ms, "tags": len(positions) + len(preamble) + 1,
+            "bytes": head_size + body_size, "kernel_bytes": kernel_bytes}
+
+# --- Merging ---
+
+def _write_tag(out: IO[bytes], tag_type: int, timestamp: int, payload: bytes):
+    size = len(payload)
+    out.write(bytes((tag_type, (size >> 16) & 0xFF, (size >> 8) & 0xFF, size & 0xFF,
+                     (timestamp >> 16) & 0xFF, (timestamp >> 8) & 0xFF, timestamp & 0xFF, (timestamp >> 24) & 0xFF,
+                     0, 0, 0)))
+    out.write(payload)
+    out.write(struct.pack('>I', 11 + size))
+
+def _sequence_header_kind(tag_type: int, payload: bytes) -> Optional[int]:
+    """音视频序列头（含 Enhanced FLV 的 SequenceStart）返回其 Tag 类型，其余返回 None。"""
+    if len(payload) < 2: return None
+    if tag_type == FLVTag.VIDEO and _video_tag_header(payload)[2] == PACKET_SEQUENCE_START: return tag_type
+    if tag_type == FLVTag.AUDIO and _audio_tag_header(payload)[1] == PACKET_SEQUENCE_START: return tag_type
+    return None
+
+# 按单个片段计算的索引字段，拼接后不再成立，合并时从 onMetaData 中删除
+_MERGE_STALE_METADATA = ('keyframes', 'hasKeyframes', 'lastkeyframetimestamp', 'lastkeyframelocation', 'lasttimestamp')
+
+def _leading_metadata(path: str) -> Optional[Dict[str, Any]]:
+    """片段开头（第一个音视频帧之前）的 onMetaData 内容，没有时返回 None。"""
+    with open(path, 'rb') as f:
+        for tag in iter_tags(f, analyze=False):
+            if tag.tag_type != FLVTag.SCRIPT: break
+            if tag.details.get("Name") == "onMetaData" and isinstance(tag.details.get("Metadata"), dict):
+                return tag.details["Metadata"]
+    return None
+
+def _merge_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉按原片段计算的字段；AMF 数值固定 8 字节，duration / filesize 先写入占位值，合并结束后原位改写。"""
+    merged = {k: v for k, v in metadata.items() if k not in _MERGE_STALE_METADATA}
+    merged.update(duration=0.0, filesize=0.0)
+    return merged
+
+def merge_flv(input_paths: List[str], output_path: str) -> Dict[str, int]:
+    """
+    把多个 FLV 片段按顺序拼接成一个文件，内存占用与文件大小无关。
+    每个片段的时间戳从上一片段结束处（加上最后一帧的间隔）接续，片段中第一个音视频帧之前的脚本 Tag 对齐到片段起点；
+    负载按原样复制，只改写 Tag 头。只保留一个 onMetaData：取各片段开头（第一个音视频帧之前）最先出现的一个写在输出开头，
+    都没有时保留复制过程中遇到的第一个；写完后回填合并结果的 duration / filesize，
+    并删除 keyframes 等按原片段计算的字段；序列头只在编码配置变化时再次写入。
+    """
+    headers = []
+    for path in input_paths:
+        with open(path, 'rb') as f:
+            headers.append(_parse_flv_header(f.read(9)))
+    flags = (4 if any(h["HasAudio"] for h in headers) else 0) | (1 if any(h["HasVideo"] for h in headers) else 0)
+    stats = {"segments": len(input_paths), "tags": 0, "dropped_tags": 0}
+    with open(output_path, 'wb', buffering=_DEMUX_BUFFER_SIZE) as out:
+        out.write(b'FLV\x01' + bytes((flags,)) + struct.pack('>II', 9, 0))
+        base_ts, last_config = 0, {}
+        metadata = next((m for m in map(_leading_metadata, input_paths) if m is not None), None)
+        metadata_offset = None
+        if metadata is not None:
+            metadata, metadata_offset = _merge_metadata(metadata), out.tell()
+            _write_tag(out, FLVTag.SCRIPT, 0, _encode_amf_value("onMetaData") + _encode_amf_value(metadata, ecma_array=True))
+        for path in input_paths:
+            with open(path, 'rb', buffering=_DEMUX_BUFFER_SIZE) as f:
+                segment_start, end_ts = None, base_ts
+                last_ts, last_step = {}, {}
+                for tag in iter_tags(f, analyze=False):
+                    payload = tag.data
+                    if tag.tag_type == FLVTag.SCRIPT and tag.details.get("Name") == "onMetaData":
+                        if metadata_offset is not None or not isinstance(tag.details.get("Metadata"), dict):
+                            stats["dropped_tags"] += 1
+                            continue
+                        metadata = _merge_metadata(tag.details["Metadata"])
+                        payload = _encode_amf_value("onMetaData") + _encode_amf_value(metadata, ecma_array=True)
+                        metadata_offset = out.tell()
+                    kind = _sequence_header_kind(tag.tag_type, payload)
+                    if kind is not None:
+                        if last_config.get(kind) == payload:
+                            stats["dropped_tags"] += 1
+                            continue
+                        last_config[kind] = bytes(payload)
+                    if segment_start is None and tag.tag_type != FLVTag.SCRIPT:
+                        segment_start = tag.timestamp
+                    timestamp = base_ts if segment_start is None else base_ts + max(0, tag.timestamp - segment_start)
+                    if tag.tag_type in last_ts and timestamp > last_ts[tag.tag_type]:
+                        last_step[tag.tag_type] = timestamp - last_ts[tag.tag_type]
+                    last_ts[tag.tag_type] = timestamp
+                    end_ts = max(end_ts, timestamp)
+                    _write_tag(out, tag.tag_type, timestamp, payload)
+                    stats["tags"] += 1
+            base_ts = end_ts + max(last_step.values(), default=1)
+        if metadata_offset is not None:
+            metadata.update(duration=base_ts / 1000, filesize=float(out.tell()))
+            out.seek(metadata_offset + 11)
+            out.write(_encode_amf_value("onMetaData") + _encode_amf_value(metadata, ecma_array=True))
+    stats["duration_ms"] = base_ts
+    return stats
+
+_TIME_TICK_STEPS = (100, 200, 500, 1000, 2000, 5000, 10000, 15000, 30000, 60000, 120000, 300000, 600000,
+                    900000, 1800000, 3600000, 7200000, 14400000, 21600000, 43200000, 86400000)
+
+def _format_ms(ms: float, fraction: bool = False) -> str:
+    seconds, millis = divmod(int(ms), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    text = f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+    return f"{text}.{millis:03d}" if fraction else text
+
+class TimelineWindow:
+    """
+    码率 / 逐帧大小 / 帧率 / 关键帧间隔 / 音视频漂移时间线图表，各面板共用一个时间轴。
+    左键拖选区间放大，滚轮以光标为中心缩放，右键拖动平移，双击或“复位缩放”恢复全程。
+    每次重绘只取可见区间，并按画布宽度做 min/max 降采样，10 小时的流也只向 Canvas 提交几千个点。
+    """
+    WINDOWS = (("1 秒", 1000), ("5 秒", 5000), ("10 秒", 10000), ("1 分钟", 60000))
+    LEFT, RIGHT, TOP, AXIS = 72, 16, 8, 24 # 画布边距（像素）
+
+    def __init__(self, root, flv_file: 'FLVFile'):
+        self.flv_file = flv_file
+        self.window = tk.Toplevel(root)
+        self.window.title(f"码率 / GOP 时间线 - {flv_file.file_name}")
+        self.window.geometry("1100x760")
+        toolbar = ttk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(toolbar, text="聚合窗口:").pack(side=tk.LEFT)
+        self.window_var = tk.StringVar(value=self.WINDOWS[0][0])
+        window_box = ttk.Combobox(toolbar, textvariable=self.window_var, state="readonly", width=8,
+                                  values=[label for label, _ in self.WINDOWS])
+        window_box.pack(side=tk.LEFT, padx=5)
+        window_box.bind("<<ComboboxSelected>>", lambda e: self._load_series())
+        ttk.Button(toolbar, text="复位缩放", command=self._reset_zoom).pack(side=tk.LEFT, padx=5)
+        self.readout = ttk.Label(toolbar, text="")
+        self.readout.pack(side=tk.RIGHT, padx=5)
+        self.canvas = tk.Canvas(self.window, background="white", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+        self.frame_times, self.frame_sizes = frame_sizes(flv_file.index)
+        self.view: Optional[Tuple[float, float]] = None
+        self._redraw_pending = False
+        self._drag = None # 左键拖选: 起点 x；右键平移: (起点 x, 当时的 view)
+        self._load_series()
+
+        self.canvas.bind("<Configure>", lambda e: self._schedule_redraw())
+        self.canvas.bind("<ButtonPress-1>", self._on_select_start)
+        self.canvas.bind("<B1-Motion>", self._on_select_move)
+        self.canvas.bind("<ButtonRelease-1>", self._on_select_end)
+        self.canvas.bind("<Double-Button-1>", lambda e: self._reset_zoom())
+        self.canvas.bind("<ButtonPress-3>", lambda e: setattr(self, '_drag', (e.x, self.view)))
+        self.canvas.bind("<B3-Motion>", self._on_pan)
+        self.canvas.bind("<MouseWheel>", lambda e: self._zoom_at(e.x, 0.8 if e.delta > 0 else 1.25))
+        self.canvas.bind("<Button-4>", lambda e: self._zoom_at(e.x, 0.8)) # X11 的滚轮事件
+        self.canvas.bind("<Button-5>", lambda e: self._zoom_at(e.x, 1.25))
+        self.canvas.bind("<Motion>", self._on_motion)
+
+    def _load_series(self):
+        self.window_ms = dict(self.WINDOWS)[self.window_var.get()]
+        timeline = self.flv_file.timeline(self.window_ms)
+        self.series, self.gops = timeline.series(), timeline.gops(final=True)
+        times = self.series["time_ms"]
+        drift = [(t, d) for t, d in zip(times, self.series["av_drift_ms"]) if d is not None]
+        self.panels = [
+            ("码率 (kbps)", [("视频", times, self.series["video_kbps"], "#1f77b4"),
+                             ("音频", times, self.series["audio_kbps"], "#2ca02c")]),
+            ("视频帧大小 (字节)", [("逐帧", self.frame_times, self.frame_sizes, "#7f7f7f")]),
+            ("帧率 (每秒)", [("视频帧", times, self.series["video_fps"], "#1f77b4"),
+                             ("音频包", times, self.series["audio_pps"], "#2ca02c")]),
+            ("关键帧间隔 (ms)", [("GOP", self.gops["time_ms"], self.gops["duration_ms"], "#d62728")]),
+            ("音视频漂移 (ms)", [("音频 - 视频", [t for t, _ in drift], [d for _, d in drift], "#9467bd")]),
+        ]
+        starts = [xs[0] for _, lines in self.panels for _, xs, _, _ in lines if len(xs)]
+        ends = [xs[-1] for _, lines in self.panels for _, xs, _, _ in lines if len(xs)]
+        lo = float(min(starts, default=0))
+        self.full_range = (lo, max(float(max(ends, default=0)), lo + 1000))
+        if self.view is None: self.view = self.full_range
+        self._schedule_redraw()
+
+    def _schedule_redraw(self):
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.window.after_idle(self._redraw)
+
+    def _set_view(self, x0: float, x1: float):
+        lo, hi = self.full_range
+        span = min(max(x1 - x0, 50), hi - lo)
+        x0 = min(max(x0, lo), hi - span)
+        self.view = (x0, x0 + span)
+        self._schedule_redraw()
+
+    def _reset_zoom(self):
+        self._set_view(*self.full_range)
+
+    def _x_to_ms(self, x: float) -> float:
+        x0, x1 = self.view
+        return x0 + (x - self.LEFT) * (x1 - x0) / max(self.canvas.winfo_width() - self.LEFT - self.RIGHT, 1)
+
+    def _zoom_at(self, x: float, factor: float):
+        center = self._x_to_ms(x)
+        x0, x1 = self.view
+        self._set_view(center - (center - x0) * factor, center + (x1 - center) * factor)
+
+    def _on_pan(self, event):
+        if not isinstance(self._drag, tuple): return
+        start_x, (x0, x1) = self._drag
+        shift = self._x_to_ms(start_x) - self._x_to_ms(event.x)
+        self._set_view(x0 + shift, x1 + shift)
+        self._drag = (event.x, self.view)
+
+    def _on_select_start(self, event):
+        self._drag = event.x
+
+    def _on_select_move(self, event):
+        if not isinstance(self._drag, int): return
+        self.canvas.delete("selection")
+        self.canvas.create_rectangle(self._drag, self.TOP, event.x, self.canvas.winfo_height() - self.AXIS,
+                                     outline="#1f77b4", dash=(3, 3), tags="selection")
+
+    def _on_select_end(self, event):
+        start, self._drag = self._drag, None
+        self.canvas.delete("selection")
+        if isinstance(start, int) and abs(event.x - start) > 5:
+            self._set_view(self._x_to_ms(min(start, event.x)), self._x_to_ms(max(start, event.x)))
+
+    def _on_motion(self, event):
+        self.canvas.delete("cursor")
+        if not self.LEFT <= event.x <= self.canvas.winfo_width() - self.RIGHT: return
+        self.canvas.create_line(event.x, self.TOP, event.x, self.canvas.winfo_height() - self.AXIS,
+                                fill="#999999", tags="cursor")
+        t = self._x_to_ms(event.x)
+        text = _format_ms(t, fraction=True)
+        times = self.series["time_ms"]
+        k = bisect.bisect_right(times, t) - 1
+        if k >= 0 and t < times[k] + self.window_ms:
+            s = self.series
+            drift = s["av_drift_ms"][k]
+            text += (f"  视频 {s['video_kbps'][k]:.0f} kbps / {s['video_fps'][k]:.1f} fps"
+                     f"  音频 {s['audio_kbps'][k]:.0f} kbps" + (f"  漂移 {drift} ms" if drift is not None else ""))
+        g = bisect.bisect_right(self.gops["time_ms"], t) - 1
+        if g >= 0 and t < self.gops["time_ms"][g] + self.gops["duration_ms"][g]:
+            text += f"  GOP {self.gops['frames'][g]} 帧 / {self.gops['duration_ms'][g]} ms"
+        self.readout.config(text=text)
+
+    def _redraw(self):
+        self._redraw_pending = False
+        canvas = self.canvas
+        canvas.delete("all")
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        left, right, bottom = self.LEFT, width - self.RIGHT, height - self.AXIS
+        if right - left < 100 or bottom - self.TOP < 100: return
+        x0, x1 = self.view
+        scale_x = (right - left) / (x1 - x0)
+        panel_height = (bottom - self.TOP) / len(self.panels)
+
+        span = x1 - x0
+        step = next((s for s in _TIME_TICK_STEPS if span / s <= (right - left) / 90), _TIME_TICK_STEPS[-1])
+        tick = math.ceil(x0 / step) * step
+        while tick <= x1:
+            x = left + (tick - x0) * scale_x
+            canvas.create_line(x, self.TOP, x, bottom, fill="#eeeeee")
+            canvas.create_text(x, bottom + 4, text=_format_ms(tick, fraction=step < 1000), anchor=tk.N, font=("TkDefaultFont", 8))
+            tick += step
+
+        for k, (title, lines) in enumerate(self.panels):
+            top = self.TOP + k * panel_height + 16
+            low = self.TOP + (k + 1) * panel_height - 4
+            visible = []
+            for label, xs, ys, color in lines:
+                # 只取可见区间（两端各多取一个点，折线连到画布边缘），再按像素宽度降采样
+                lo = max(bisect.bisect_left(xs, x0) - 1, 0)
+                hi = min(bisect.bisect_right(xs, x1) + 1, len(xs))
+                px, py = downsample_minmax(xs[lo:hi], ys[lo:hi], right - left)
+                visible.append((label, px, py, color))
+            values = [v for _, _, py, _ in visible for v in py]
+            y_min, y_max = min(min(values, default=0), 0), max(values, default=1)
+            if y_max <= y_min: y_max = y_min + 1
+            scale_y = (low - top) / (y_max - y_min)
+            if y_min < 0:
+                zero = low + y_min * scale_y
+                canvas.create_line(left, zero, right, zero, fill="#cccccc", dash=(2, 2))
+            for label, px, py, color in visible:
+                coords = [c for x, y in zip(px, py) for c in (left + (x - x0) * scale_x, low - (y - y_min) * scale_y)]
+                if len(coords) >= 4:
+                    canvas.create_line(*coords, fill=color)
+                elif coords:
+                    canvas.create_oval(coords[0] - 2, coords[1] - 2, coords[0] + 2, coords[1] + 2, fill=color, outline=color)
+            # 连到可见区间以外的线段用底色遮住，再画边框与文字
+            canvas.create_rectangle(0, top, left - 1, low, fill="white", outline="")
+            canvas.create_rectangle(right + 1, top, width, low, fill="white", outline="")
+            canvas.create_rectangle(left, top, right, low, outline="#cccccc")
+            canvas.create_text(left + 4, top - 2, text=title, anchor=tk.SW, font=("TkDefaultFont", 9, "bold"))
+            canvas.create_text(left - 4, top, text=f"{y_max:g}", anchor=tk.NE, font=("TkDefaultFont", 8))
+            canvas.create_text(left - 4, low, text=f"{y_min:g}", anchor=tk.SE, font=("TkDefaultFont", 8))
+            legend_x = left + 160
+            for label, _, _, color in visible:
+                canvas.create_text(legend_x, top - 2, text=f"■ {label}", fill=color, anchor=tk.SW, font=("TkDefaultFont", 8))
+                legend_x += 90
+
+def _tree_buckets(index: 'TagIndex', start: int, tag_count: int, size: int,
+                  final: bool = False) -> Tuple[Tuple[int, int, int, int], ...]:
+    """从 start 起按 size 个 Tag 分组，返回各组的 (起始, 结束, 首个时间戳, 最后时间戳)；final 为 False 时不含未满的最后一组。"""
+    buckets = []
+    while start < tag_count and (final or start + size <= tag_count):
+        end = min(start + size, tag_count)
+        buckets.append((start, end, index.timestamps[start], index.timestamps[end-1]))
+        start = end
+    return tuple(buckets)
+
+class FLVParserGUI:
+    TREE_BUCKET_SIZE = 1000 # 每个树分组包含的 Tag 数
+
+    def __init__(self, root):
+        self.root = root
+        self.root.title("FLV文件解析与工具集")
+        self.root.geometry("1200x800")
+        self.flv_file = None
+        self._lazy_nodes = {} # 树节点 -> 展开时的加载参数
+        self._bucket_nodes = []
+        self._load_queue = queue.Queue()
+        self._cancel_event = None # 后台解析进行中时为 threading.Event
+        self._tree_started = False # 本次解析的树是否已由进度消息建立
+        self._file_users = Counter() # FLVFile -> 仍在使用它的后台任务数
+        self.profiler = None # 开启性能剖析时为当前文件的 Profiler
+        self._create_widgets()
+        self._setup_layout()
+
+    def _create_widgets(self):
+        self.menu_bar = tk.Menu(self.root)
+        self.root.config(menu=self.menu_bar)
+        file_menu = tk.Menu(self.menu_bar, tearoff=0)
+        file_menu.add_command(label="打开FLV文件", command=self._open_file)
+        file_menu.add_command(label="打开URL...", command=self._open_url)
+        self.recover_var = tk.BooleanVar(value=False)
+        file_menu.add_checkbutton(label="容错解析（跳过损坏数据）", variable=self.recover_var)
+        file_menu.add_command(label="导出修复后的文件...", command=self._export_repaired)
+        file_menu.add_command(label="截取片段...", command=self._cut_clip)
+        file_menu.add_command(label="保存分析结果到数据库...", command=self._save_to_fleet)
+        file_menu.add_separator()
+        file_menu.add_command(label="退出", command=self.root.quit)
+        self.menu_bar.add_cascade(label="文件", menu=file_menu)
+        self.profile_var = tk.BooleanVar(value=False)
+        self.profile_memory_var = tk.BooleanVar(value=False)
+        perf_menu = tk.Menu(self.menu_bar, tearoff=0)
+        perf_menu.add_checkbutton(label="打开文件时记录性能数据", variable=self.profile_var)
+        perf_menu.add_checkbutton(label="统计内存分配 (tracemalloc，较慢)", variable=self.profile_memory_var)
+        perf_menu.add_separator()
+        perf_menu.add_command(label="性能面板", command=self._show_performance)
+        self.menu_bar.add_cascade(label="性能", menu=perf_menu)
+
+        self.toolbar_frame = ttk.Frame(self.root)
+        self.open_button = ttk.Button(self.toolbar_frame, text="打开FLV文件", command=self._open_file)
+        self.report_button = ttk.Button(self.toolbar_frame, text="丢帧分析报告", command=self._show_analysis_report, state=tk.DISABLED)
+        self.timeline_button = ttk.Button(self.toolbar_frame, text="码率/GOP 时间线", command=self._show_timeline, state=tk.DISABLED)
+        self.extract_button = ttk.Button(self.toolbar_frame, text="分离音视频", command=self._extract_streams, state=tk.DISABLED)
+        self.progress_bar = ttk.Progressbar(self.toolbar_frame, mode='determinate', maximum=100, length=200)
+        self.cancel_button = ttk.Button(self.toolbar_frame, text="取消", command=self._cancel_loading)
+        self.status_label = ttk.Label(self.toolbar_frame, text="")
+        
+        self.main_paned = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
+        
+        self.tree_frame = ttk.Frame(self.main_paned)
+        self.tree = ttk.Treeview(self.tree_frame, selectmode=tk.BROWSE)
+        self.tree.heading("#0", text="FLV结构", anchor=tk.W)
+        self.tree.tag_configure('warning', foreground='red')
+        self.tree_scrollbar_y = ttk.Scrollbar(self.tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.tree_scrollbar_y.set)
+        
+        self.right_pane = ttk.PanedWindow(self.main_paned, orient=tk.VERTICAL)
+        self.info_frame = ttk.Frame(self.right_pane)
+        self.file_info_labelframe = ttk.LabelFrame(self.info_frame, text="文件信息")
+        self.file_info_text = tk.Text(self.file_info_labelframe, wrap=tk.WORD, height=10, state=tk.DISABLED)
+        self.file_info_text.bind("<Key>", lambda e: "break") # Make read-only but allow copy
+        
+        self.details_frame = ttk.Frame(self.right_pane)
+        self.details_labelframe = ttk.LabelFrame(self.details_frame, text="标签详情")
+        self.details_text = tk.Text(self.details_labelframe, wrap=tk.WORD, state=tk.DISABLED)
+        self.copy_button = ttk.Button(self.details_labelframe, text="复制详情", command=self._copy_details)
+        
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<<TreeviewOpen>>", self._on_tree_open)
+
+    def _setup_layout(self):
+        self.toolbar_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.open_button.pack(side=tk.LEFT, padx=5)
+        self.report_button.pack(side=tk.LEFT, padx=5)
+        self.timeline_button.pack(side=tk.LEFT, padx=5)
+        self.extract_button.pack(side=tk.LEFT, padx=5)
+        self.status_label.pack(side=tk.RIGHT, padx=5)
+        
+        self.main_paned.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.main_paned.add(self.tree_frame, weight=2)
+        self.tree_scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        
+        self.main_paned.add(self.right_pane, weight=3)
+        self.right_pane.add(self.info_frame, weight=1)
+        self.file_info_labelframe.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.file_info_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.right_pane.add(self.details_frame, weight=3)
+        self.details_labelframe.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.copy_button.pack(side=tk.RIGHT, anchor=tk.SE, padx=5, pady=5)
+        self.details_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+    def _open_file(self):
+        if self._cancel_event is not None: return # 上一个文件仍在解析
+        file_path = filedialog.askopenfilename(title="选择FLV文件", filetypes=[("FLV文件", "*.flv")])
+        if file_path: self._load_file(file_path)
+
+    def _open_url(self):
+        if self._cancel_event is not None: return
+        url = simpledialog.askstring("打开URL", "FLV 文件的 http(s) 地址（服务器需支持 Range 请求）:", parent=self.root)
+        if url and url.strip(): self._load_file(url.strip())
+
+    def _load_file(self, file_path):
+        previous, self.flv_file = self.flv_file, None
+        self._release_file(previous)
+        self._tree_started = False
+        for item in self.tree.get_children(): self.tree.delete(item)
+        self.report_button.config(state=tk.DISABLED)
+        self.timeline_button.config(state=tk.DISABLED)
+        self.extract_button.config(state=tk.DISABLED)
+        self.open_button.config(state=tk.DISABLED)
+        self.progress_bar.config(value=0)
+        self.progress_bar.pack(side=tk.LEFT, padx=5)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        self.status_label.config(text="正在解析...")
+
+        self.profiler = None
+        if self.profile_var.get() or self.profile_memory_var.get():
+            self.profiler = Profiler(trace_memory=self.profile_memory_var.get())
+            self.profiler.start()
+        self._cancel_event = threading.Event()
+        self._load_queue = queue.Queue()
+        threading.Thread(target=self._load_worker, args=(file_path, self._cancel_event, self._load_queue, self.profiler, self.recover_var.get()), daemon=True).start()
+        self.root.after(100, self._poll_loader)
+
+    def _load_worker(self, file_path, cancel_event, load_queue, profiler=None, recover=False):
+        """
+        在后台线程中解析文件，只通过队列与 Tk 主线程通信。解析完成前只发送快照
+        （文件头、Tag 数与新增满分组的时间范围），Tk 线程不会读取仍在增长的索引。
+        """
+        posted = 0 # 已发送的 Tag 数（按分组对齐）
+        def progress(flv_file, bytes_done, total_bytes):
+            nonlocal posted
+            if cancel_event.is_set(): raise ParseCancelled()
+            count = len(flv_file.index)
+            buckets = _tree_buckets(flv_file.index, posted, count, self.TREE_BUCKET_SIZE)
+            if buckets: posted = buckets[-1][1]
+            load_queue.put(("progress", tuple(flv_file.get_header_info().items()), bytes_done, total_bytes, count, buckets))
+        try:
+            flv_file = FLVFile(file_path, use_mmap=True, use_cache=True, progress=progress, profiler=profiler, recover=recover)
+            if cancel_event.is_set():
+                flv_file.close()
+                raise ParseCancelled()
+            load_queue.put(("done", flv_file))
+        except ParseCancelled:
+            load_queue.put(("cancelled",))
+        except Exception as e:
+            load_queue.put(("error", e))
+
+    def _cancel_loading(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self.status_label.config(text="正在取消...")
+
+    def _poll_loader(self):
+        try:
+            while True:
+                message = self._load_queue.get_nowait()
+                if message[0] == "progress":
+                    _, header_info, bytes_done, total_bytes, tag_count, buckets = message
+                    with _profile_phase(self.profiler, "tree"):
+                        if not self._tree_started:
+                            self._tree_started = True
+                            self._begin_tree(dict(header_info))
+                        self._add_buckets(buckets)
+                    self.progress_bar.config(value=bytes_done * 100 / max(total_bytes, 1))
+                    self.status_label.config(text=f"已解析 {bytes_done / (1024 * 1024):.1f} / {total_bytes / (1024 * 1024):.1f} MB，{tag_count} 个 Tag")
+                else:
+                    self._finish_loading(message)
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(100, self._poll_loader)
+
+    def _finish_loading(self, message):
+        self._cancel_event = None
+        self.progress_bar.pack_forget()
+        self.cancel_button.pack_forget()
+        self.open_button.config(state=tk.NORMAL)
+        if message[0] == "done":
+            with _profile_phase(self.profiler, "tree"):
+                self.flv_file = message[1]
+                if not self._tree_started:
+                    self._begin_tree()
+                self._finish_tree()
+            self._update_file_info()
+            self.report_button.config(state=tk.NORMAL)
+            self.timeline_button.config(state=tk.NORMAL)
+            self.extract_button.config(state=tk.NORMAL)
+            status = f"{self.flv_file.file_name}: {len(self.flv_file.index)} 个 Tag"
+            if self.profiler is not None:
+                self.profiler.stop() # 之后展开节点的耗时仍会累计到各阶段
+                phases = self.profiler.phases
+                labels = (("cache_load", "读缓存"), ("index", "索引"), ("analysis", "分析"), ("tree", "树"))
+                status += "  |  " + " · ".join(f"{label} {phases[name][0]:.2f}s" for name, label in labels if name in phases)
+            self.status_label.config(text=status)
+            return
+        if self.profiler is not None:
+            self.profiler.stop()
+        self.flv_file = None
+        for item in self.tree.get_children(): self.tree.delete(item)
+        if message[0] == "cancelled":
+            self.status_label.config(text="已取消解析")
+        else:
+            self.status_label.config(text="")
+            messagebox.showerror("错误", f"解析文件时出错: {message[1]}")
+
+    def _update_file_info(self):
+        self.file_info_text.config(state=tk.NORMAL)
+        self.file_info_text.delete(1.0, tk.END)
+        
+        # --- Basic FLV Header Info ---
+        info = self.flv_file.get_header_info()
+        self.file_info_text.insert(tk.END, "--- FLV 基础信息 ---\n")
+        for key, value in info.items():
+            self.file_info_text.insert(tk.END, f"{key}: {value}\n")
+
+        # --- File System Info ---
+        try:
+            stat = os.stat(self.flv_file.file_path)
+            size_mb = stat.st_size / (1024 * 1024)
+            creation_time = datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S')
+            modification_time = datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+            
+            self.file_info_text.insert(tk.END, "\n--- 文件系统信息 ---\n")
+            self.file_info_text.insert(tk.END, f"文件大小: {size_mb:.2f} MB\n")
+            self.file_info_text.insert(tk.END, f"创建时间: {creation_time}\n")
+            self.file_info_text.insert(tk.END, f"修改时间: {modification_time}\n")
+        except Exception:
+            pass # Ignore if file stat fails
+
+        remote = self.flv_file.remote
+        if remote is not None:
+            self.file_info_text.insert(tk.END, "\n--- 远程文件 ---\n")
+            self.file_info_text.insert(tk.END, f"文件大小: {remote.size / (1024 * 1024):.2f} MB\n")
+            self.file_info_text.insert(tk.END, f"已传输: {remote.bytes_fetched / (1024 * 1024):.2f} MB "
+                                               f"({remote.bytes_fetched * 100 / max(remote.size, 1):.1f}%)，{remote.requests} 个 Range 请求\n")
+
+        # --- Media Duration from Metadata ---
+        duration = self.flv_file.metadata.get('duration')
+        if duration:
+            minutes, seconds = divmod(duration, 60)
+            self.file_info_text.insert(tk.END, "\n--- 媒体信息 ---\n")
+            self.file_info_text.insert(tk.END, f"媒体时长: {int(minutes):02d}:{seconds:05.2f}\n")
+
+        self.file_info_text.config(state=tk.DISABLED)
+
+    def _populate_tree(self):
+        self._begin_tree()
+        self._finish_tree()
+
+    def _begin_tree(self, header_info: Optional[Dict[str, Any]] = None):
+        # 树节点按需创建：每 TREE_BUCKET_SIZE 个 Tag 归为一个分组，分组和 Tag 节点
+        # 先只带一个占位子节点，展开时才在 _on_tree_open 中插入真正的内容。
+        for item in self.tree.get_children(): self.tree.delete(item)
+        self._lazy_nodes = {}
+        self._bucket_nodes = []
+        header_node = self.tree.insert("", tk.END, text="FLV Header", open=True)
+        for key, value in (header_info or self.flv_file.get_header_info()).items():
+            self.tree.insert(header_node, tk.END, text=f"{key}: {value}")
+        self._tags_node = self.tree.insert("", tk.END, text="FLV Tags", open=True)
+
+    def _add_buckets(self, buckets):
+        """按 _tree_buckets 给出的 (起始, 结束, 首个时间戳, 最后时间戳) 插入分组节点。"""
+        for start, end, first_ts, last_ts in buckets:
+            bucket_node = self.tree.insert(self._tags_node, tk.END, text=f"Tags {start+1}-{end} ({first_ts} ms - {last_ts} ms)")
+            self._add_lazy_node(bucket_node, ("bucket", start, end))
+            self._bucket_nodes.append(bucket_node)
+
+    def _finish_tree(self):
+        """解析与分析完成后补齐剩余分组，填充解析期间展开的分组，并标记含有分析警告的分组与已展开的 Tag。"""
+        tag_count = len(self.flv_file.index)
+        self._add_buckets(_tree_buckets(self.flv_file.index, len(self._bucket_nodes) * self.TREE_BUCKET_SIZE,
+                                        tag_count, self.TREE_BUCKET_SIZE, final=True))
+        self.tree.item(self._tags_node, text=f"FLV Tags ({tag_count})")
+        for bucket_node in self._bucket_nodes:
+            if bucket_node in self._lazy_nodes and self.tree.item(bucket_node, 'open'):
+                self._expand_node(bucket_node)
+        for i in self.flv_file.analysis:
+            bucket_node = self._bucket_nodes[i // self.TREE_BUCKET_SIZE]
+            self.tree.item(bucket_node, tags=('warning',))
+            if bucket_node not in self._lazy_nodes:
+                tag_node = self.tree.get_children(bucket_node)[i % self.TREE_BUCKET_SIZE]
+                self.tree.item(tag_node, tags=('warning',))
+
+    def _add_lazy_node(self, node, loader):
+        self.tree.insert(node, tk.END, text="...")
+        self._lazy_nodes[node] = loader
+
+    def _on_tree_open(self, event):
+        # 解析完成前文件尚未交给 Tk 线程，已展开的分组在 _finish_tree 中再填充
+        if self.flv_file is not None: self._expand_node(self.tree.focus())
+
+    def _expand_node(self, node):
+        loader = self._lazy_nodes.pop(node, None)
+        if loader is None: return
+        self.tree.delete(*self.tree.get_children(node))
+        if loader[0] == "bucket":
+            with _profile_phase(self.profiler, "tree"):
+                self._populate_bucket(node, loader[1], loader[2])
+        else:
+            with _profile_phase(self.profiler, "tag_details"):
+                self._populate_tag(node, loader[1])
+
+    def _populate_bucket(self, bucket_node, start, end):
+        index, analysis = self.flv_file.index, self.flv_file.analysis
+        for i in range(start, end):
+            tag_type = index.types[i]
+            type_name = FLVTag.TAG_TYPES.get(tag_type, f"Unknown ({tag_type})")
+            tag_style = ('warning',) if i in analysis else ()
+            tag_node = self.tree.insert(bucket_node, tk.END, text=f"Tag {i+1}: {type_name} @ {index.timestamps[i]} ms", values=("tag", i), tags=tag_style)
+            self._add_lazy_node(tag_node, ("tag", i))
+
+    def _populate_tag(self, tag_node, i):
+        info = self.flv_file.tags[i].get_display_info()
+        if info.get("Analysis"):
+            self.tree.insert(tag_node, tk.END, text=f"Analysis: {info['Analysis']['Warning']}", tags=('warning',))
+        
+        self.tree.insert(tag_node, tk.END, text=f"Offset: {info['Offset']}")
+        self.tree.insert(tag_node, tk.END, text=f"Size: {info['Size']}")
+        
+        if info["Details"]:
+            details_node = self.tree.insert(tag_node, tk.END, text="Details")
+            self._populate_details_tree(details_node, info["Details"])
+
+    def _populate_details_tree(self, parent, details):
+        for key, value in details.items():
+            if isinstance(value, dict):
+                node = self.tree.insert(parent, tk.END, text=str(key))
+                self._populate_details_tree(node, value)
+            else:
+                self.tree.insert(parent, tk.END, text=f"{key}: {value}")
+
+    def _on_tree_select(self, event):
+        selected_item = self.tree.selection()
+        if not selected_item: return
+        item_values = self.tree.item(selected_item[0], "values")
+        self.details_text.config(state=tk.NORMAL)
+        self.details_text.delete(1.0, tk.END)
+        if len(item_values) >= 2 and item_values[0] == "tag":
+            tag_index = int(item_values[1])
+            with _profile_phase(self.profiler, "tag_details"):
+                tag = self.flv_file.tags[tag_index]
+                self._format_details_text(tag.get_display_info())
+        self.details_text.config(state=tk.DISABLED)
+
+    def _format_details_text(self, details, indent=0):
+        prefix = "  " * indent
+        for key, value in details.items():
+            if isinstance(value, dict):
+                self.details_text.insert(tk.END, f"{prefix}{key}:\n")
+                self._format_details_text(value, indent + 1)
+            else:
+                self.details_text.insert(tk.END, f"{prefix}{key}: {value}\n")
+
+    def _copy_details(self):
+        content = self.details_text.get(1.0, tk.END).strip()
+        if content:
+            self.root.clipboard_clear()
+            self.root.clipboard_append(content)
+            messagebox.showinfo("成功", "标签详情已复制到剪贴板！")
+
+    def _show_analysis_report(self):
+        if not self.flv_file: return
+        
+        report_window = tk.Toplevel(self.root)
+        report_window.title("丢帧分析报告")
+        report_window.geometry("800x600")
+        
+        report_text = tk.Text(report_window, wrap=tk.WORD, font=("Courier", 11))
+        scrollbar = ttk.Scrollbar(report_window, orient=tk.VERTICAL, command=report_text.yview)
+        report_text.configure(yscrollcommand=scrollbar.set)
+        
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        report_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        meta = self.flv_file.metadata
+        report_text.insert(tk.END, "--- 媒体信息参数 ---\n")
+        meta_table = [
+            ("参数名", "参数值"),("视频宽度", meta.get('width', 'N/A')),("视频高度", meta.get('height', 'N/A')),
+            ("视频帧率", meta.get('framerate', 'N/A')),("视频码率(kbps)", meta.get('videodatarate', 'N/A')),
+            ("视频编码", _metadata_codec_name(meta.get('videocodecid'), FLVTag.VIDEO_CODECS, FLVTag.VIDEO_FOURCCS)),("音频采样率(Hz)", meta.get('audiosamplerate', 'N/A')),
+            ("音频声道", "双声道" if meta.get('stereo') else "单声道"),("音频码率(kbps)", meta.get('audiodatarate', 'N/A')),
+            ("音频编码", _metadata_codec_name(meta.get('audiocodecid'), FLVTag.AUDIO_FORMATS, FLVTag.AUDIO_FOURCCS)),
+        ]
+        
+        col_widths = [max(len(str(item[i])) for item in meta_table) for i in range(2)]
+        header = f"{'参数名':<{col_widths[0]}} | {'参数值':<{col_widths[1]}}\n"
+        separator = "-" * (col_widths[0] + col_widths[1] + 3) + "\n"
+        report_text.insert(tk.END, header)
+        report_text.insert(tk.END, separator)
+        for name, value in meta_table[1:]:
+            report_text.insert(tk.END, f"{str(name):<{col_widths[0]}} | {str(value):<{col_widths[1]}}\n")
+
+        report_text.insert(tk.END, "\n\n--- 时间戳统计 ---\n")
+        stats = self.flv_file.timestamp_report
+        for name, label in (("video", "视频"), ("audio", "音频")):
+            stream = stats.get(name)
+            if not stream or not stream["count"]: continue
+            intervals, jitter, rate = stream["intervals_ms"], stream["jitter_ms"], stream["rate"]
+            report_text.insert(tk.END, f"{label}: {stream['count']} 个标签，跳跃 {stream['gaps']} 次，回退 {stream['backwards']} 次，重复时间戳 {stream['duplicate_dts']} 次\n")
+            if intervals:
+                report_text.insert(tk.END, f"  间隔(ms) P50/P90/P99/最大: {intervals['p50']}/{intervals['p90']}/{intervals['p99']}/{intervals['max']}\n")
+                report_text.insert(tk.END, f"  抖动(ms) P50/P90/P99/最大: {jitter['p50']}/{jitter['p90']}/{jitter['p99']}/{jitter['max']}\n")
+            report_text.insert(tk.END, f"  每秒{'帧' if name == 'video' else '包'}数 最小/最大: {rate['min']}/{rate['max']}\n")
+        if "video" in stats:
+            report_text.insert(tk.END, f"CTS 为负 (PTS 早于 DTS) 的视频帧: {stats['video']['negative_cts']}\n")
+        if "av_drift" in stats:
+            drift = stats["av_drift"]
+            report_text.insert(tk.END, f"音视频时间戳漂移(ms) 最小/最大: {drift['min_ms']}/{drift['max_ms']}\n")
+        if "corruption" in stats:
+            report_text.insert(tk.END, f"损坏数据: {stats['corruption']['ranges']} 处，共 {stats['corruption']['bytes']} 字节（容错解析时已跳过）\n")
+
+        report_text.insert(tk.END, "\n\n--- 时间戳跳跃分析 ---\n")
+        problematic_tags = [ (i, self.flv_file.tags[i]) for i in sorted(self.flv_file.analysis) ]
+        
+        if not problematic_tags:
+            report_text.insert(tk.END, "未检测到明显的时间戳跳跃或丢帧问题。")
+        else:
+            report_text.insert(tk.END, f"检测到 {len(problematic_tags)} 个有问题的标签:\n\n")
+            for i, tag in problematic_tags:
+                info = tag.get_display_info()
+                report_text.insert(tk.END, f"标签 #{i+1} ({info['Type']} @ {info['Timestamp']}):\n")
+                report_text.insert(tk.END, f"  - 警告: {info['Analysis']['Warning']}\n")
+                report_text.insert(tk.END, f"  - 参考: {info['Analysis']['Reason']}\n\n")
+        
+        report_text.config(state=tk.DISABLED)
+
+    def _show_timeline(self):
+        if not self.flv_file: return
+        TimelineWindow(self.root, self.flv_file)
+
+    def _show_performance(self):
+        """显示当前文件的性能剖析报告；“刷新”会带上之后展开节点、查看详情的耗时。"""
+        if self.profiler is None:
+            messagebox.showinfo("性能面板", "请先在“性能”菜单中勾选“打开文件时记录性能数据”，再打开文件。")
+            return
+        profiler = self.profiler
+        perf_window = tk.Toplevel(self.root)
+        perf_window.title("性能")
+        perf_window.geometry("800x600")
+        perf_text = tk.Text(perf_window, wrap=tk.NONE, font=("Courier", 11))
+        scrollbar = ttk.Scrollbar(perf_window, orient=tk.VERTICAL, command=perf_text.yview)
+        perf_text.configure(yscrollcommand=scrollbar.set)
+
+        def refresh():
+            perf_text.config(state=tk.NORMAL)
+            perf_text.delete(1.0, tk.END)
+            perf_text.insert(tk.END, profiler.format_report())
+            perf_text.config(state=tk.DISABLED)
+
+        ttk.Button(perf_window, text="刷新", command=refresh).pack(side=tk.BOTTOM, anchor=tk.E, padx=10, pady=5)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        perf_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        refresh()
+
+    def _get_ffmpeg_path(self):
+        """
+        动态获取 ffmpeg 的路径。
+        如果是在 PyInstaller 打包的环境中，则返回相对于 _MEIPASS 的路径。
+        否则，直接返回 'ffmpeg'，依赖系统 PATH。
+        """
+        if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+            # 在 PyInstaller 打包的应用中
+            base_path = sys._MEIPASS
+            ffmpeg_executable = 'ffmpeg.exe' if sys.platform == 'win32' else 'ffmpeg'
+            return os.path.join(base_path, ffmpeg_executable)
+        else:
+            # 在正常的开发环境中
+            return 'ffmpeg'
+
+    def _check_ffmpeg(self):
+        ffmpeg_path = self._get_ffmpeg_path()
+        try:
+            # 使用获取到的路径执行命令
+            subprocess.run([ffmpeg_path, "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return True
+        except (FileNotFoundError, subprocess.CalledProcessError):
+            return False
+
+    def _extract_streams(self):
+        if not self.flv_file: return
+
+        native = can_demux_natively(self.flv_file)
+        if not native and not self._check_ffmpeg():
+            messagebox.showerror("错误", "文件包含非 AVC/AAC 编码，需要 FFmpeg，但未在本机或应用包中找到 FFmpeg。\n请确保已安装 FFmpeg 并将其添加到系统路径，或确保它已随应用正确打包。")
+            return
+
+        save_dir = filedialog.askdirectory(initialdir=os.path.expanduser("~/Desktop"), title="选择保存目录")
+        if not save_dir: return
+
+        flv_file = self.flv_file
+        input_file = flv_file.file_path
+        base_name = os.path.splitext(flv_file.file_name)[0]
+        output_audio = os.path.join(save_dir, f"{base_name}_audio.aac")
+
+        if native:
+            # 内置解复用器：一次顺序扫描写出 .h264 与 .aac，不依赖 FFmpeg
+            output_video = os.path.join(save_dir, f"{base_name}_video.h264")
+            work = lambda: demux_streams(flv_file, output_video, output_audio)
+        else:
+            ffmpeg_path = self._get_ffmpeg_path()
+            output_video = os.path.join(save_dir, f"{base_name}_video.mp4")
+            def work():
+                # 使用获取到的路径执行命令
+                subprocess.run([ffmpeg_path, "-i", input_file, "-c:v", "copy", "-an", "-y", output_video], check=True)
+                subprocess.run([ffmpeg_path, "-i", input_file, "-c:a", "copy", "-vn", "-y", output_audio], check=True)
+
+        def on_done(result, error):
+            self.extract_button.config(state=tk.NORMAL)
+            self.status_label.config(text="")
+            if error is None:
+                messagebox.showinfo("成功", f"音视频已成功分离到:\n{save_dir}")
+            elif isinstance(error, subprocess.CalledProcessError):
+                messagebox.showerror("FFmpeg 错误", f"执行FFmpeg命令时出错:\n{error}")
+            else:
+                messagebox.showerror("错误", f"分离文件时出错:\n{error}")
+
+        self.extract_button.config(state=tk.DISABLED)
+        self.status_label.config(text="正在分离音视频...")
+        self._run_in_background(work, on_done, flv_file)
+
+    def _export_repaired(self):
+        if not self.flv_file or not self.flv_file.recover:
+            messagebox.showinfo("导出修复后的文件", "请先在“文件”菜单中勾选“容错解析”，再打开文件。")
+            return
+        base_name = os.path.splitext(self.flv_file.file_name)[0]
+        output_path = filedialog.asksaveasfilename(title="保存修复后的文件", defaultextension=".flv",
+                                                   initialfile=f"{base_name}_repaired.flv", filetypes=[("FLV文件", "*.flv")])
+        if not output_path: return
+        flv_file = self.flv_file
+
+        def on_done(stats, error):
+            self.status_label.config(text="")
+            if error is None:
+                messagebox.showinfo("成功", f"已跳过 {len(flv_file.corrupt_ranges)} 处损坏数据，写入 {stats['tags']} 个 Tag:\n{output_path}")
+            else:
+                messagebox.showerror("错误", f"写入修复文件时出错:\n{error}")
+
+        self.status_label.config(text="正在写入修复后的文件...")
+        self._run_in_background(lambda: write_repaired(flv_file, output_path), on_done, flv_file)
+
+    def _cut_clip(self):
+        """按起止时间无损截取片段，起点对齐到之前最近的关键帧。"""
+        if not self.flv_file: return
+        clock = simpledialog.askstring("截取片段", "起止时间（秒或 [HH:]MM:SS，用“-”分隔；终点留空表示到文件末尾）:",
+                                       initialvalue="0 - ", parent=self.root)
+        if not clock: return
+        try:
+            start_text, _, end_text = clock.partition('-')
+            start_ms = _parse_clock(start_text) if start_text.strip() else 0
+            end_ms = _parse_clock(end_text) if end_text.strip() else None
+        except argparse.ArgumentTypeError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        base_name = os.path.splitext(self.flv_file.file_name)[0]
+        output_path = filedialog.asksaveasfilename(title="保存片段", defaultextension=".flv",
+                                                   initialfile=f"{base_name}_clip.flv", filetypes=[("FLV文件", "*.flv")])
+        if not output_path: return
+        flv_file = self.flv_file
+
+        def on_done(stats, error):
+            self.status_label.config(text="")
+            if error is None:
+                messagebox.showinfo("成功", f"已截取 {stats['start_ms'] / 1000:.3f}s - {stats['end_ms'] / 1000:.3f}s，"
+                                          f"{stats['tags']} 个 Tag:\n{output_path}")
+            else:
+                messagebox.showerror("错误", f"截取片段时出错:\n{error}")
+
+        self.status_label.config(text="正在截取片段...")
+        self._run_in_background(lambda: cut_flv(flv_file, output_path, start_ms, end_ms), on_done, flv_file)
+
+    def _save_to_fleet(self):
+        """把当前文件的元数据、逐 Tag 索引和分析结果写入 SQLite 分析库（fleet 子命令可跨文件查询）。"""
+        if not self.flv_file: return
+        db_path = filedialog.asksaveasfilename(title="选择分析数据库", defaultextension=".sqlite", confirmoverwrite=False,
+                                               initialfile="flv_fleet.sqlite", filetypes=[("SQLite", "*.sqlite *.db")])
+        if not db_path: return
+        flv_file = self.flv_file
+
+        def work():
+            with FleetIndex(db_path) as fleet:
+                fleet.add(fleet_record_from(flv_file))
+
+        def on_done(result, error):
+            self.status_label.config(text="")
+            if error is None:
+                messagebox.showinfo("成功", f"{flv_file.file_name} 的分析结果已保存到:\n{db_path}")
+            else:
+                messagebox.showerror("错误", f"保存到数据库时出错:\n{error}")
+
+        self.status_label.config(text="正在保存到数据库...")
+        self._run_in_background(work, on_done, flv_file)
+
+    def _release_file(self, flv_file: Optional[FLVFile]):
+        """关闭不再显示的文件；仍有后台任务在使用时，等最后一个任务结束后再关闭。"""
+        if flv_file is not None and flv_file is not self.flv_file and not self._file_users[flv_file]:
+            self._file_users.pop(flv_file, None)
+            flv_file.close()
+
+    def _run_in_background(self, work, on_done, flv_file: Optional[FLVFile] = None):
+        """在后台线程执行 work()，完成后在 Tk 主线程调用 on_done(result, error)。work 用到的 flv_file 在此期间不会被关闭。"""
+        if flv_file is not None: self._file_users[flv_file] += 1
+        outcome = {}
+        def run():
+            try:
+                outcome["result"] = work()
+            except Exception as e:
+                outcome["error"] = e
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        def poll():
+            if thread.is_alive():
+                self.root.after(100, poll)
+                return
+            if flv_file is not None:
+                self._file_users[flv_file] -= 1
+                self._release_file(flv_file)
+            on_done(outcome.get("result"), outcome.get("error"))
+        self.root.after(100, poll)
+
+# --- Text Dump (flv_parse.sh) ---
+
+_DUMP_BUFFER_SIZE = 1024 * 1024 # 文本报告攒够这么多字节再写出
+_PRINTF_LONG_DOUBLE_BITS = 64 # bash 的 printf 用 long double (x87 扩展精度) 解析浮点数
+
+def _sh_int(view, offset: int, count: int) -> Optional[int]:
+    """与 flv_parse.sh 的 read_be_int 相同：读取最多 count 字节的大端整数，不足时只用剩余字节，越过文件末尾时返回 None。"""
+    if offset >= len(view): return None
+    return int.from_bytes(view[offset:offset + count], 'big')
+
+def _sh_bytes(view, offset: int, count: int) -> bytes:
+    """与 flv_parse.sh 中 $(dd ... | tr -d '\\0') 相同：去掉 NUL 字节和末尾的换行符。"""
+    return bytes(view[offset:offset + count]).replace(b'\0', b'').rstrip(b'\n')
+
+def _sh_double(raw: bytes) -> bytes:
+    """
+    按 flv_parse.sh 中 parse_double 的算法格式化 AMF0 Number：尾数逐位用 bc（scale=20，截断）累加，
+    乘或除以 2 的幂，再由 printf "%.6f" 输出，因此结果与 repr/round 不完全一致。
+    """
+    if len(raw) != 8: return b"0.0"
+    bits = int.from_bytes(raw, 'big')
+    sign, exponent, mantissa_bits = bits >> 63, (bits >> 52) & 0x7FF, bits & ((1 << 52) - 1)
+    if exponent == 0 and not mantissa_bits: return b"0.0"
+    if exponent == 2047:
+        return b"NaN" if mantissa_bits else b"-inf" if sign else b"inf"
+    unit = 10 ** 20 # bc 的 scale=20，以下数值都以 1e-20 为单位
+    mantissa = unit + sum(unit >> (i + 1) for i in range(52) if mantissa_bits >> (51 - i) & 1)
+    exponent -= 1023
+    scaled = mantissa << exponent if exponent >= 0 else mantissa >> -exponent
+    value = Fraction(-scaled if sign else scaled, unit)
+    if abs(value) < 10 ** 47:
+        return _printf_f6(value)
+    # bc 的输出每 69 个字符折行（行尾加反斜杠）。printf 只能解析第一行，报错后脚本再原样 echo 一遍 bc 的输出
+    text = b"%s%d.%s" % (b"-" if sign else b"", scaled // unit, b"0" if exponent >= 0 and not mantissa_bits else b"%020d" % (scaled % unit))
+    if len(text) <= 69:
+        return _printf_f6(value)
+    return _printf_f6(Fraction(Decimal(text[:69].decode()))) + b"\\\n".join(text[i:i + 69] for i in range(0, len(text), 69))
+
+def _printf_f6(value: Fraction) -> bytes:
+    """bash 的 printf "%.6f"：先就近舍入到 long double 的 64 位有效位，再按精确的二进制值舍入到 6 位小数。"""
+    if value:
+        shift = _PRINTF_LONG_DOUBLE_BITS - (abs(value.numerator).bit_length() - value.denominator.bit_length())
+        rounded = round(value * Fraction(2) ** shift)
+        if abs(rounded).bit_length() > _PRINTF_LONG_DOUBLE_BITS: # shift 多算了一位
+            rounded = round(value * Fraction(2) ** (shift - 1)) * 2
+        value = rounded / Fraction(2) ** shift
+    micros = round(value * 1000000)
+    return b"%s%d.%06d" % (b"-" if value < 0 else b"", abs(micros) // 1000000, abs(micros) % 1000000)
+
+_DUMP_TAG = struct.Struct('>5I') # PreviousTagSize、11 字节 Tag 头和负载开头 5 字节
+_SOUND_RATES = (b"5.5-KHz", b"11-KHz", b"22-KHz", b"44-KHz")
+
+def dump_text(view, out: IO[bytes]):
+    """
+    输出与 flv_parse.sh 完全相同的文本报告（Tag 头、音视频参数与 onMetaData）。
+    view 是整个文件的字节数据（bytes 或 mmap）。与脚本一样按 DataSize 逐个跳到下一个 Tag，
+    字段越过文件末尾时按脚本的规则输出 0 或省略，截断或损坏的文件也得到与脚本相同的输出。
+    报告按 _DUMP_BUFFER_SIZE 攒成大块写出。
+    """
+    size = len(view)
+    chunks: List[bytes] = []
+    pending = 0
+
+    signature = bytes(b for b in view[:3] if b in (9, 10, 13) or 32 <= b <= 126).rstrip(b'\n')
+    flags = _sh_int(view, 4, 1) or 0
+    header_size = _sh_int(view, 5, 4) or 0
+    chunks.append(b"+FLV Header\n    signature: %s, version: %d, flags_audio: %d, flags_video: %d, headersize: %d\n+FLV Body\n"
+                  % (signature, _sh_int(view, 3, 1) or 0, (flags & 4) >> 2, flags & 1, header_size))
+    offset = header_size
+    audio_count = video_count = 0
+    while True:
+        data = offset + 15
+        if data + 5 <= size:
+            previous_tag_size, word1, word2, word3, word4 = _DUMP_TAG.unpack_from(view, offset)
+            tag_type, data_size = word1 >> 24, word1 & 0xFFFFFF
+            timestamp, timestamp_extended = word2 >> 8, word2 & 0xFF
+            stream_id, byte0, byte1, byte2_4 = word3 >> 8, word3 & 0xFF, word4 >> 24, word4 & 0xFFFFFF
+        else:
+            # 接近文件末尾：逐个字段读取，越界的字段为 0（Tag 头）或 None（负载）
+            previous_tag_size = _sh_int(view, offset, 4)
+            if previous_tag_size is None: break
+            tag_type = _sh_int(view, offset + 4, 1) or 0
+            data_size = _sh_int(view, offset + 5, 3) or 0
+            timestamp = _sh_int(view, offset + 8, 3) or 0
+            timestamp_extended = _sh_int(view, offset + 11, 1) or 0
+            stream_id = _sh_int(view, offset + 12, 3) or 0
+            byte0, byte1, byte2_4 = _sh_int(view, data, 1), _sh_int(view, data + 1, 1), _sh_int(view, data + 2, 3)
+        text = b"    previousTagSize: %d\n" % previous_tag_size
+        tag_header = (b"        +Tag Header\n            type: %d, data_size: %d, timestamp: %d, timestamp_extended: %d, streamid: %d\n"
+                      b"        +Tag Data\n" % (tag_type, data_size, (timestamp_extended << 24) + timestamp, timestamp_extended, stream_id))
+        if tag_type == FLVTag.AUDIO:
+            audio_count += 1
+            text += b"    +Audio Tag[%d]\n" % audio_count + tag_header
+            if byte0 is not None:
+                sound_format = byte0 >> 4
+                text += (b"            SoundFormat: %d\n            SoundRate: %s\n            SoundSize: %s\n            SoundType: %s\n"
+                         % (sound_format, _SOUND_RATES[(byte0 >> 2) & 3], b"snd16bit" if byte0 & 2 else b"snd8bit",
+                            b"sndStereo" if byte0 & 1 else b"sndMono"))
+                if sound_format == 10 and byte1 is not None:
+                    text += b"            +AACAudioData\n                AACPacketType: %d\n" % byte1 + (
+                        b"                +AudioSpecificConfig\n                    AudioObjectType: 2\n                    SamplingFrequencyIndex: 11\n"
+                        if byte1 == 0 else b"                Data(Raw AAC frame data)\n")
+        elif tag_type == FLVTag.VIDEO:
+            video_count += 1
+            text += b"    +Video Tag[%d]\n" % video_count + tag_header
+            if byte0 is not None:
+                text += b"            FrameType: %d\n            CodecId: %d\n" % (byte0 >> 4, byte0 & 15)
+                if byte0 & 15 == 7:
+                    text += b"            +Video Data\n"
+                    if byte1 is not None:
+                        text += b"                AVCPacketType: %d\n" % byte1
+                    if byte2_4 is not None:
+                        text += b"                CompositionTime Offset: %d\n" % (byte2_4 - 0x1000000 if byte2_4 > 0x7FFFFF else byte2_4)
+                    text += b"                Data\n"
+        elif tag_type == FLVTag.SCRIPT:
+            text += b"    +Script Tag\n" + tag_header + b"".join(_dump_script(view, data))
+        chunks.append(text)
+        pending += len(text)
+        if pending >= _DUMP_BUFFER_SIZE:
+            out.write(b''.join(chunks))
+            chunks.clear()
+            pending = 0
+        offset = data + data_size
+        if data_size == 0 and tag_type != FLVTag.SCRIPT: break
+        if offset >= size: break
+    chunks.append(b"\n")
+    out.write(b''.join(chunks))
+
+def _dump_script(view, data: int) -> Iterator[bytes]:
+    """flv_parse.sh 对脚本 Tag 的输出：名称字符串和 ECMA 数组中的 Number / Boolean / String 值，最多 101 项。"""
+    amf1_type = _sh_int(view, data, 1)
+    if amf1_type is None: return
+    yield b"            AMF1 type: %d\n" % amf1_type
+    if amf1_type != 2: return
+    name_size = _sh_int(view, data + 1, 2)
+    if name_size is None: return
+    yield b"            AMF1 String size: %d\n            AMF1 String: %s\n" % (name_size, _sh_bytes(view, data + 3, name_size))
+    array_offset = data + 3 + name_size
+    amf2_type = _sh_int(view, array_offset, 1)
+    if amf2_type is None: return
+    yield b"            AMF2 type: %d\n" % amf2_type
+    if amf2_type != 8: return
+    count = _sh_int(view, array_offset + 1, 4)
+    if count is None: return
+    yield b"            AMF2 Metadata count: %d\n            +Metadata\n" % count
+    offset, parsed = array_offset + 5, 0
+    while parsed < count:
+        key_length = _sh_int(view, offset, 2)
+        if not key_length: break
+        key = _sh_bytes(view, offset + 2, key_length)
+        value_offset = offset + 2 + key_length + 1
+        value_type = _sh_int(view, value_offset - 1, 1)
+        if value_type is None:
+            offset = value_offset
+        elif value_type == 0:
+            yield b"                %s: %s\n" % (key, _sh_double(bytes(view[value_offset:value_offset + 8])))
+            offset = value_offset + 8
+        elif value_type == 1:
+            value = _sh_int(view, value_offset, 1)
+            if value is not None:
+                yield b"                %s: %s\n" % (key, b"true" if value else b"false")
+            offset = value_offset + 1
+        elif value_type == 2:
+            length = _sh_int(view, value_offset, 2)
+            if length is None:
+                offset = value_offset + 1
+            else:
+                yield b"                %s: %s\n" % (key, _sh_bytes(view, value_offset + 2, length))
+                offset = value_offset + 2 + length
+        else:
+            yield b"                %s: (type %d)\n" % (key, value_type)
+            offset = value_offset + 1
+        parsed += 1
+        if parsed > 100: break
+
+# --- Fleet Index (SQLite) ---
+
+_FLEET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,              -- 文件修改时间 (Unix 秒)，近似为录制结束时间
+    indexed_at REAL NOT NULL,
+    tags INTEGER, duration REAL, width REAL, height REAL, framerate REAL,
+    video_codec TEXT, audio_codec TEXT,
+    video_gaps INTEGER, audio_gaps INTEGER, backwards INTEGER,
+    max_video_gap_ms INTEGER, max_audio_gap_ms INTEGER, corrupt_bytes INTEGER,
+    metadata TEXT,                    -- onMetaData (JSON)
+    timestamp_report TEXT             -- analyze_timestamps() 的汇总报告 (JSON)
+);
+CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime);
+CREATE INDEX IF NOT EXISTS files_height ON files (height, width);
+CREATE INDEX IF NOT EXISTS files_video_gaps ON files (video_gaps);
+CREATE TABLE IF NOT EXISTS findings (
+    file_id INTEGER NOT NULL,
+    tag_index INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    kind TEXT NOT NULL,               -- video_gap / audio_gap / video_backwards / audio_backwards / corruption
+    delta_ms INTEGER,                 -- 时间戳跳跃或回退的幅度；corruption 为 NULL
+    warning TEXT,
+    PRIMARY KEY (file_id, tag_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS findings_kind ON findings (kind, delta_ms, file_id);
+CREATE TABLE IF NOT EXISTS tags (
+    file_id INTEGER NOT NULL,
+    tag_index INTEGER NOT NULL,
+    offset INTEGER NOT NULL, type INTEGER NOT NULL, size INTEGER NOT NULL, timestamp INTEGER NOT NULL,
+    cts INTEGER, frame_type INTEGER, codec INTEGER, packet_type INTEGER,
+    PRIMARY KEY (file_id, tag_index)
+) WITHOUT ROWID;
+"""
+_FLEET_FILE_COLUMNS = (
+    "tags", "duration", "width", "height", "framerate", "video_codec", "audio_codec",
+    "video_gaps", "audio_gaps", "backwards", "max_video_gap_ms", "max_audio_gap_ms", "corrupt_bytes",
+)
+
+def _fleet_path(file_path: str) -> str:
+    return file_path if _is_url(file_path) else os.path.abspath(file_path)
+
+def fleet_record(file_path: str, with_tags: bool = True, use_cache: bool = False, recover: bool = False) -> Dict[str, Any]:
+    """
+    解析一个文件，返回写入 FleetIndex 所需的全部内容（可跨进程传递）；解析失败时 error 非空。
+    with_tags 为 True 时附带逐 Tag 的索引列（TagIndex.column_bytes()）。
+    """
+    try:
+        with FLVFile(file_path, use_mmap=True, use_cache=use_cache, recover=recover) as flv_file:
+            return fleet_record_from(flv_file, with_tags)
+    except Exception as e:
+        return {"path": _fleet_path(file_path), "error": f"{type(e).__name__}: {e}"}
+
+def fleet_record_from(flv_file: 'FLVFile', with_tags: bool = True) -> Dict[str, Any]:
+    """由已经打开的 FLVFile 生成 fleet_record() 格式的记录，例如保存图形界面中当前的文件。"""
+    index = flv_file.index
+    if flv_file.remote is not None: # 远程文件以 Last-Modified 作为修改时间
+        size, mtime = flv_file.remote.size, flv_file.remote.last_modified or time.time()
+    else:
+        stat = os.stat(flv_file.file_path)
+        size, mtime = stat.st_size, stat.st_mtime
+    return {
+        "path": _fleet_path(flv_file.file_path), "error": "", "size": size, "mtime": mtime,
+        "summary": _summary_fields(flv_file),
+        "metadata": json.dumps(flv_file.metadata, ensure_ascii=False, default=str),
+        "timestamp_report": json.dumps(flv_file.timestamp_report, ensure_ascii=False, default=str),
+        "findings": [(i, index.timestamps[i], finding.get("Kind", ""), finding.get("Delta (ms)"), finding.get("Warning"))
+                     for i, finding in flv_file.analysis.items()],
+        "columns": index.column_bytes() if with_tags else None,
+    }
+
+class FleetIndex:
+    """
+    把多个文件的解析结果持久化到本地 SQLite 数据库，便于跨文件查询而无需重新解析。
+    files 表保存每个文件的元数据与汇总指标，findings 表保存逐 Tag 的分析结果，
+    tags 表（可选）保存 TagIndex 的各列。每个文件的写入在一个事务中用 executemany 批量完成。
+    """
+    def __init__(self, db_path: str):
+        import sqlite3 # 只有建立文件库索引时才加载
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_FLEET_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def is_current(self, file_path: str) -> bool:
+        """数据库中已有该本地文件且大小、修改时间均未变化；URL 总是重新解析。"""
+        if _is_url(file_path): return False
+        file_path = os.path.abspath(file_path)
+        row = self.conn.execute("SELECT size, mtime FROM files WHERE path = ?", (file_path,)).fetchone()
+        if row is None: return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return row["size"] == stat.st_size and row["mtime"] == stat.st_mtime
+
+    def add(self, record: Dict[str, Any]) -> int:
+        """写入 fleet_record() 的结果，同一路径的旧记录会被替换。返回文件 id。"""
+        if record["error"]:
+            raise ValueError(f"{record['path']}: {record['error']}")
+        summary = record["summary"]
+        with self.conn:
+            self._delete(record["path"])
+            cursor = self.conn.execute(
+                f"INSERT INTO files (path, size, mtime, indexed_at, {', '.join(_FLEET_FILE_COLUMNS)}, metadata, timestamp_report) "
+                f"VALUES ({', '.join('?' * (len(_FLEET_FILE_COLUMNS) + 6))})",
+                (record["path"], record["size"], record["mtime"], time.time(),
+                 *(None if summary[name] == "" else summary[name] for name in _FLEET_FILE_COLUMNS),
+                 record["metadata"], record["timestamp_report"]))
+            file_id = cursor.lastrowid
+            self.conn.executemany("INSERT INTO findings VALUES (?, ?, ?, ?, ?, ?)",
+                                  ((file_id, *finding) for finding in record["findings"]))
+            if record["columns"] is not None:
+                index = TagIndex()
+                index.extend_bytes(record["columns"])
+                self.conn.executemany("INSERT INTO tags VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                      zip(itertools.repeat(file_id), itertools.count(),
+                                          *(getattr(index, name) for name, _ in TagIndex.COLUMNS)))
+        return file_id
+
+    def _delete(self, file_path: str):
+        row = self.conn.execute("SELECT id FROM files WHERE path = ?", (file_path,)).fetchone()
+        if row is None: return
+        for table in ("tags", "findings"):
+            self.conn.execute(f"DELETE FROM {table} WHERE file_id = ?", (row["id"],))
+        self.conn.execute("DELETE FROM files WHERE id = ?", (row["id"],))
+
+    def remove(self, file_path: str):
+        with self.conn:
+            self._delete(_fleet_path(file_path))
+
+    def add_files(self, paths: List[str], jobs: int = 1, with_tags: bool = True, use_cache: bool = False,
+                  recover: bool = False, force: bool = False,
+                  on_record: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, int]:
+        """
+        解析并写入文件或目录（递归查找 .flv）。未变化的文件默认跳过；jobs > 1 时在进程池中解析，
+        写入仍在当前进程中顺序进行。on_record 对每个解析结果调用一次。返回 added / skipped / failed 计数。
+        """
+        candidates = _collect_flv_files(paths)
+        files = [p for p in candidates if force or not self.is_current(p)]
+        stats = {"added": 0, "skipped": len(candidates) - len(files), "failed": 0}
+
+        def store(record):
+            if record["error"]:
+                stats["failed"] += 1
+            else:
+                self.add(record)
+                stats["added"] += 1
+            if on_record is not None: on_record(record)
+
+        if jobs == 1:
+            for file_path in files:
+                store(fleet_record(file_path, with_tags, use_cache, recover))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = [pool.submit(fleet_record, file_path, with_tags, use_cache, recover) for file_path in files]
+                for future in as_completed(futures):
+                    store(future.result())
+        return stats
+
+    def query(self, sql: str, params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+        """执行任意只读 SQL，以字典列表返回结果。"""
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def query_files(self, since: Optional[float] = None, until: Optional[float] = None,
+                    height: Optional[float] = None, min_height: Optional[float] = None,
+                    video_codec: Optional[str] = None, kind: Optional[str] = None,
+                    min_delta_ms: Optional[int] = None, min_findings: int = 1,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按条件查询文件，例如最近一周、1080p、至少 6 次超过 500ms 的视频跳跃:
+            query_files(since=time.time() - 7 * 86400, height=1080, kind='video_gap', min_delta_ms=500, min_findings=6)
+        since / until 按文件修改时间 (Unix 秒) 过滤。给出 kind 时 matched 列为满足条件的分析结果数，
+        结果按 matched 与修改时间倒序排列。
+        """
+        where, params = [], []
+        for clause, value in (("f.mtime >= ?", since), ("f.mtime < ?", until), ("f.height = ?", height),
+                              ("f.height >= ?", min_height), ("f.video_codec = ?", video_codec)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        sql = "SELECT f.id, f.path, f.size, f.mtime, " + ", ".join(f"f.{name}" for name in _FLEET_FILE_COLUMNS)
+        if kind is not None:
+            join = "JOIN findings g ON g.file_id = f.id AND g.kind = ?"
+            join_params = [kind]
+            if min_delta_ms is not None:
+                join += " AND abs(g.delta_ms) >= ?"
+                join_params.append(min_delta_ms)
+            sql += f", COUNT(*) AS matched FROM files f {join}"
+            params = join_params + params
+        else:
+            sql += ", 0 AS matched FROM files f"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if kind is not None:
+            sql += " GROUP BY f.id HAVING COUNT(*) >= ?"
+            params.append(min_findings)
+        sql += " ORDER BY matched DESC, f.mtime DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.query(sql, tuple(params))
+
+def _parse_time_filter(text: str) -> float:
+    """'7d' / '12h' / '30m' 表示距今的时长，否则按 ISO 日期时间解析（无时区时视为本地时间）。返回 Unix 秒。"""
+    units = {'d': 86400, 'h': 3600, 'm': 60}
+    text = text.strip()
+    if text and text[-1].lower() in units and text[:-1].replace('.', '', 1).isdigit():
+        return time.time() - float(text[:-1]) * units[text[-1].lower()]
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time: {text!r} (use e.g. 7d, 12h or 2024-05-01)")
+
+def _parse_clock(text: str) -> int:
+    """'90' / '90.5' 秒或 '1:30' / '01:02:03.250' -> 毫秒。"""
+    try:
+        seconds = 0.0
+        for part in text.strip().split(':'):
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time: {text!r} (use seconds or [HH:]MM:SS[.mmm])")
+    if seconds < 0: raise argparse.ArgumentTypeError(f"invalid time: {text!r}")
+    return int(round(seconds * 1000))
+
+# --- Command Line Interface ---
+
+ANALYZE_CSV_FIELDS = (
+    "file", "size", "tags", "duration", "width", "height", "framerate", "video_codec", "audio_codec",
+    "video_gaps", "audio_gaps", "backwards", "max_video_gap_ms", "max_audio_gap_ms", "corrupt_bytes", "error",
+)
+
+def _dominant_codec(index: TagIndex, tag_type: int, names: Dict[int, str]) -> str:
+    codecs = Counter(c for t, c in zip(index.types, index.codecs) if t == tag_type)
+    if not codecs: return ""
+    codec = codecs.most_common(1)[0][0]
+    return names.get(codec, f"Unknown ({codec})")
+
+def summarize_file(file_path: str, use_cache: bool = False, profiler: Optional[Profiler] = None,
+                   jobs: int = 1, recover: bool = False) -> Dict[str, Any]:
+    """
+    解析并分析一个文件，返回一行可序列化的摘要；解析失败时 error 字段非空。
+    jobs 为单个文件的并行解析进程数；recover 为 True 时容错解析，corrupt_bytes 为跳过的损坏字节数。
+    """
+    summary = dict.fromkeys(ANALYZE_CSV_FIELDS, "")
+    summary["file"] = file_path
+    try:
+        if not _is_url(file_path): summary["size"] = os.path.getsize(file_path)
+        with FLVFile(file_path, use_mmap=True, use_cache=use_cache, profiler=profiler, jobs=jobs, recover=recover) as flv_file, \
+                _profile_phase(profiler, "summary"):
+            if flv_file.remote is not None: summary["size"] = flv_file.remote.size
+            summary.update(_summary_fields(flv_file))
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    return summary
+
+def _summary_fields(flv_file: 'FLVFile') -> Dict[str, Any]:
+    """summarize_file() 与 fleet_record() 共用的汇总指标。"""
+    index, meta, report = flv_file.index, flv_file.metadata, flv_file.timestamp_report
+    video, audio = report.get("video", {}), report.get("audio", {})
+    return {
+        "tags": len(index),
+        "duration": meta.get("duration", max(index.timestamps, default=0) / 1000),
+        "width": meta.get("width", ""), "height": meta.get("height", ""),
+        "framerate": meta.get("framerate", ""),
+        "video_codec": _dominant_codec(index, FLVTag.VIDEO, FLVTag.VIDEO_CODECS),
+        "audio_codec": _dominant_codec(index, FLVTag.AUDIO, FLVTag.AUDIO_FORMATS),
+        "video_gaps": video.get("gaps", 0), "audio_gaps": audio.get("gaps", 0),
+        "backwards": video.get("backwards", 0) + audio.get("backwards", 0),
+        "max_video_gap_ms": video.get("intervals_ms", {}).get("max", 0),
+        "max_audio_gap_ms": audio.get("intervals_ms", {}).get("max", 0),
+        "corrupt_bytes": report.get("corruption", {}).get("bytes", 0) if flv_file.recover else "",
+    }
+
+def _collect_flv_files(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dir_path, _, names in os.walk(path):
+                files.extend(os.path.join(dir_path, n) for n in sorted(names) if n.lower().endswith('.flv'))
+        else:
+            files.append(path)
+    return files
+
+def _cmd_analyze(args) -> int:
+    files = _collect_flv_files(args.paths)
+    writer = None
+    if args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=ANALYZE_CSV_FIELDS)
+        writer.writeheader()
+
+    def emit(summary):
+        if writer is not None:
+            writer.writerow(summary)
+        else:
+            sys.stdout.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+    results = []
+    profiler = _make_profiler(args)
+    if args.jobs == 1 or profiler is not None or len(files) == 1:
+        # 剖析时在当前进程中逐个解析，计时与 cProfile 才能覆盖全部文件；
+        # 只有一个文件时把进程数用于该文件的分块并行解析
+        parse_jobs = args.jobs if len(files) == 1 else 1
+        with profiler or nullcontext():
+            for file_path in files:
+                results.append(summarize_file(file_path, args.cache, profiler, parse_jobs, args.recover))
+                emit(results[-1])
+    else:
+        # 每个文件独立解析，结果按完成顺序流式输出
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [pool.submit(summarize_file, file_path, args.cache, None, 1, args.recover) for file_path in files]
+            for future in as_completed(futures):
+                results.append(future.result())
+                emit(results[-1])
+
+    _print_analyze_summary(results, sys.stderr)
+    _print_profile(profiler, args)
+    return 1 if any(r["error"] for r in results) else 0
+
+def _print_analyze_summary(results: List[Dict[str, Any]], out: IO[str]):
+    parsed = [r for r in results if not r["error"]]
+    with_drops = [r for r in parsed if r["video_gaps"] or r["audio_gaps"]]
+    out.write(f"\n--- 汇总 ---\n文件数: {len(results)}，解析失败: {len(results) - len(parsed)}，存在丢帧/跳跃: {len(with_drops)}\n")
+    corrupted = [r for r in parsed if r["corrupt_bytes"]]
+    if corrupted:
+        out.write(f"含损坏数据: {len(corrupted)}\n")
+    worst = sorted(parsed, key=lambda r: max(r["max_video_gap_ms"], r["max_audio_gap_ms"]), reverse=True)[:10]
+    if worst:
+        out.write("最大时间戳间隔:\n")
+        for r in worst:
+            out.write(f"  {max(r['max_video_gap_ms'], r['max_audio_gap_ms'])} ms  {r['file']}\n")
+    codec_mix = Counter(f"{r['video_codec'] or '-'} / {r['audio_codec'] or '-'}" for r in parsed)
+    if codec_mix:
+        out.write("编码组合:\n")
+        for codecs, count in codec_mix.most_common():
+            out.write(f"  {count:>6}  {codecs}\n")
+
+def _cmd_merge(args) -> int:
+    stats = merge_flv(args.inputs, args.output)
+    print(f"已合并 {stats['segments']} 个片段，共 {stats['tags']} 个 Tag，时长 {stats['duration_ms'] / 1000:.2f}s: {args.output}")
+    return 0
+
+def _cmd_repair(args) -> int:
+    with FLVFile(args.file, use_mmap=True, recover=True) as flv_file:
+        for start, end in flv_file.corrupt_ranges:
+            print(f"0x{start:08X}\t0x{end:08X}\t{end - start} bytes")
+        print(f"共 {len(flv_file.corrupt_ranges)} 处损坏，{sum(end - start for start, end in flv_file.corrupt_ranges)} 字节，"
+              f"可用 Tag {len(flv_file.index)} 个", file=sys.stderr)
+        if args.output:
+            stats = write_repaired(flv_file, args.output)
+            print(f"已写入 {stats['tags']} 个 Tag，丢弃 {stats['dropped_bytes']} 字节: {args.output}", file=sys.stderr)
+    return 0
+
+def _cmd_cut(args) -> int:
+    with FLVFile(args.file, use_mmap=True, use_cache=args.cache) as flv_file:
+        try:
+            stats = cut_flv(flv_file, args.output, args.start, args.end)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+    print(f"已写入 {stats['start_ms'] / 1000:.3f}s - {stats['end_ms'] / 1000:.3f}s，{stats['tags']} 个 Tag，"
+          f"{stats['bytes']} 字节（内核复制 {stats['kernel_bytes']} 字节）: {args.output}", file=sys.stderr)
+    return 0
+
+def _cmd_timeline(args) -> int:
+    with FLVFile(args.file, use_mmap=True, use_cache=args.cache) as flv_file:
+        timeline = flv_file.timeline(args.window)
+        fields, columns = (GOP_FIELDS, timeline.gops(final=True)) if args.gops else (TIMELINE_FIELDS, timeline.series())
+    rows = zip(*(columns[name] for name in fields))
+    if args.format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(fields)
+        writer.writerows(("" if v is None else round(v, 3) if isinstance(v, float) else v for v in row) for row in rows)
+    else:
+        sys.stdout.writelines(json.dumps(dict(zip(fields, row))) + "\n" for row in rows)
+    return 0
+
+def _cmd_fleet(args) -> int:
+    with FleetIndex(args.db) as fleet:
+        if args.fleet_command == "add":
+            def report(record):
+                if record["error"]: print(f"{record['path']}: {record['error']}", file=sys.stderr)
+            stats = fleet.add_files(args.paths, args.jobs, not args.no_tags, args.cache, args.recover, args.force, report)
+            print(f"新增/更新 {stats['added']} 个文件，跳过未变化的 {stats['skipped']} 个，失败 {stats['failed']} 个", file=sys.stderr)
+            return 1 if stats["failed"] else 0
+        if args.fleet_command == "query":
+            rows = fleet.query_files(args.since, args.until, args.height, args.min_height, args.codec,
+                                     args.kind, args.min_delta_ms, args.min_count, args.limit)
+            for row in rows:
+                row["mtime"] = datetime.fromtimestamp(row["mtime"]).isoformat(timespec="seconds")
+        else:
+            rows = fleet.query(args.statement)
+    if args.format == "csv" and rows:
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    elif args.format == "json":
+        for row in rows:
+            sys.stdout.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+    return 0
+
+def _cmd_monitor(args) -> int:
+    streams = []
+    for item in args.streams:
+        # NAME=URL 给流起名；只有 URL 时（查询参数中的 '=' 不算前缀）名称就是 URL
+        name, sep, url = item.partition("=")
+        streams.append((name, url) if sep and "://" not in name else (item, item))
+    if args.list:
+        with open(args.list, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split(None, 1)
+                if parts and not parts[0].startswith("#"):
+                    streams.append((parts[1].strip(), parts[0]) if len(parts) == 2 else (parts[0], parts[0]))
+    if not streams:
+        print("没有要监控的流", file=sys.stderr)
+        return 1
+    monitor = LiveMonitor(streams, args.interval, args.stall, args.drift_ms, args.fps_ratio)
+    try:
+        asyncio.run(monitor.run(args.duration))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def _cmd_dump(args) -> int:
+    with open(args.file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            with open(args.output, 'wb') if args.output else nullcontext(sys.stdout.buffer) as out:
+                dump_text(view, out)
+        finally:
+            if size: view.close()
+    return 0
+
+def _make_profiler(args) -> Optional[Profiler]:
+    if not (args.profile or args.profile_memory or args.cprofile): return None
+    return Profiler(trace_memory=args.profile_memory, use_cprofile=bool(args.cprofile))
+
+def _print_profile(profiler: Optional[Profiler], args):
+    if profiler is None: return
+    sys.stderr.write("\n--- 性能剖析 ---\n" + profiler.format_report() + "\n")
+    if args.cprofile:
+        profiler.dump_stats(args.cprofile)
+        sys.stderr.write(f"cProfile 数据已写入: {args.cprofile}\n")
+
+def _cmd_keyframes(args) -> int:
+    profiler = _make_profiler(args)
+    with profiler or nullcontext():
+        status = _run_keyframes(args, profiler)
+    _print_profile(profiler, args)
+    return status
+
+def _run_keyframes(args, profiler: Optional[Profiler]) -> int:
+    with FLVFile(args.file, use_mmap=True, use_cache=args.cache, profiler=profiler, jobs=args.jobs) as flv_file:
+        if args.seek is not None:
+            position = flv_file.seek(args.seek)
+            if position is None:
+                print("文件中没有关键帧", file=sys.stderr)
+                return 1
+            print(f"Tag {position + 1}\t{flv_file.index.timestamps[position]} ms\t0x{flv_file.index.offsets[position]:08X}")
+        elif args.inject:
+            with _profile_phase(profiler, "inject"):
+                count = write_with_keyframes(flv_file, args.inject)
+            print(f"已写入 {count} 个关键帧索引: {args.inject}")
+        else:
+            for position, time_ms in zip(flv_file.keyframes.positions, flv_file.keyframes.times):
+                print(f"{time_ms}\t{flv_file.index.offsets[position]}")
+    return 0
+
+def _add_profile_arguments(parser: argparse.ArgumentParser):
+    group = parser.add_argument_group("性能剖析（报告输出到 stderr）")
+    group.add_argument("--profile", action="store_true", help="输出各阶段耗时、计数器与吞吐量")
+    group.add_argument("--profile-memory", action="store_true", help="同时用 tracemalloc 统计内存分配（明显变慢）")
+    group.add_argument("--cprofile", metavar="FILE", help="同时用 cProfile 采集函数级耗时并写入 pstats 文件")
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="flv_parser", description="FLV 文件解析与工具集（不带参数运行时打开图形界面）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="批量解析目录或文件并输出丢帧分析结果")
+    analyze.add_argument("paths", nargs="+", help="FLV 文件或包含 FLV 文件的目录（递归查找）")
+    analyze.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="并行进程数（默认: CPU 核数）；只有一个文件时用于该文件的分块并行解析")
+    analyze.add_argument("--format", choices=("json", "csv"), default="json", help="输出格式: 每行一个 JSON 对象或 CSV")
+    analyze.add_argument("--cache", action="store_true", help="读写 .flvidx 索引缓存")
+    analyze.add_argument("--recover", action="store_true", help="容错解析：跳过损坏的数据并统计损坏字节数")
+    _add_profile_arguments(analyze)
+    analyze.set_defaults(func=_cmd_analyze)
+
+    merge = commands.add_parser("merge", help="把多个 FLV 片段拼接为一个文件（时间戳连续）")
+    merge.add_argument("inputs", nargs="+", help="按顺序拼接的 FLV 片段")
+    merge.add_argument("--output", "-o", required=True, help="输出文件路径")
+    merge.set_defaults(func=_cmd_merge)
+
+    repair = commands.add_parser("repair", help="容错解析并列出损坏区间，可输出修复后的文件")
+    repair.add_argument("file", help="FLV 文件")
+    repair.add_argument("--output", "-o", help="输出去掉损坏数据后的新文件")
+    repair.set_defaults(func=_cmd_repair)
+
+    cut = commands.add_parser("cut", help="按时间无损截取片段（起点对齐到之前最近的关键帧）")
+    cut.add_argument("file", help="FLV 文件")
+    cut.add_argument("--output", "-o", required=True, help="输出文件")
+    cut.add_argument("--start", type=_parse_clock, default=0, metavar="TIME", help="起点：秒或 [HH:]MM:SS[.mmm]（默认: 0）")
+    cut.add_argument("--end", type=_parse_clock, metavar="TIME", help="终点（不含），默认截到文件末尾")
+    cut.add_argument("--cache", action="store_true", help="读写 .flvidx 索引缓存")
+    cut.set_defaults(func=_cmd_cut)
+
+    timeline = commands.add_parser("timeline", help="按时间窗口输出码率、帧率、关键帧与音视频漂移，或逐个 GOP 输出")
+    timeline.add_argument("file", help="FLV 文件")
+    timeline.add_argument("--window", type=int, default=1000, metavar="MS", help="聚合窗口（毫秒，默认: 1000）")
+    timeline.add_argument("--gops", action="store_true", help="逐个 GOP 输出起始时间、帧数、字节数与关键帧间隔")
+    timeline.add_argument("--format", choices=("json", "csv"), default="csv", help="输出格式: 每行一个 JSON 对象或 CSV（默认）")
+    timeline.add_argument("--cache", action="store_true", help="读写 .flvidx 索引缓存")
+    timeline.set_defaults(func=_cmd_timeline)
+
+    fleet = commands.add_parser("fleet", help="把解析与分析结果保存到 SQLite 数据库，并跨文件查询")
+    fleet.add_argument("db", help="SQLite 数据库文件，不存在时自动创建")
+    fleet_commands = fleet.add_subparsers(dest="fleet_command", required=True)
+    fleet_add = fleet_commands.add_parser("add", help="解析文件或目录并写入数据库（未变化的文件跳过）")
+    fleet_add.add_argument("paths", nargs="+", help="FLV 文件或包含 FLV 文件的目录（递归查找）")
+    fleet_add.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="并行进程数（默认: CPU 核数）")
+    fleet_add.add_argument("--no-tags", action="store_true", help="不保存逐 Tag 的索引，只保存文件汇总与分析结果")
+    fleet_add.add_argument("--cache", action="store_true", help="读写 .flvidx 索引缓存")
+    fleet_add.add_argument("--recover", action="store_true", help="容错解析，损坏区间记为 corruption")
+    fleet_add.add_argument("--force", action="store_true", help="重新解析未变化的文件")
+    fleet_query = fleet_commands.add_parser("query", help="按修改时间、分辨率、编码和分析结果筛选文件")
+    fleet_query.add_argument("--since", type=_parse_time_filter, help="修改时间下限，如 7d、12h 或 2024-05-01")
+    fleet_query.add_argument("--until", type=_parse_time_filter, help="修改时间上限")
+    fleet_query.add_argument("--height", type=float, help="视频高度，如 1080")
+    fleet_query.add_argument("--min-height", type=float, help="视频高度下限")
+    fleet_query.add_argument("--codec", help="视频编码名称，如 'AVC (H.264)'")
+    fleet_query.add_argument("--kind", choices=("video_gap", "audio_gap", "video_backwards", "audio_backwards", "corruption"),
+                             help="分析结果类型")
+    fleet_query.add_argument("--min-delta-ms", type=int, help="跳跃/回退幅度下限 (ms)，与 --kind 一起使用")
+    fleet_query.add_argument("--min-count", type=int, default=1, help="满足条件的分析结果数下限（默认: 1）")
+    fleet_query.add_argument("--limit", type=int)
+    fleet_sql = fleet_commands.add_parser("sql", help="执行任意 SQL 查询")
+    fleet_sql.add_argument("statement")
+    for sub in (fleet_query, fleet_sql):
+        sub.add_argument("--format", choices=("json", "csv"), default="json", help="输出格式: 每行一个 JSON 对象或 CSV")
+    fleet.set_defaults(func=_cmd_fleet)
+
+    keyframes = commands.add_parser("keyframes", help="列出关键帧索引、按时间定位关键帧或把索引写入 onMetaData")
+    keyframes.add_argument("file", help="FLV 文件")
+    keyframes.add_argument("--seek", type=int, metavar="MS", help="输出该时间点之前最近的关键帧")
+    keyframes.add_argument("--inject", metavar="OUTPUT", help="输出带 keyframes 元数据的新文件")
+    keyframes.add_argument("--cache", action="store_true", help="读写 .flvidx 索引缓存")
+    keyframes.add_argument("--jobs", "-j", type=int, default=1, help="大文件分块并行解析的进程数（默认: 1）")
+    _add_profile_arguments(keyframes)
+    keyframes.set_defaults(func=_cmd_keyframes)
+
+    monitor = commands.add_parser("monitor", help="同时拉取多路 HTTP-FLV 直播流，以 JSON Lines 输出告警与周期指标")
+    monitor.add_argument("streams", nargs="*", metavar="[NAME=]URL", help="HTTP-FLV 地址，可用 NAME= 前缀指定输出中的流名称")
+    monitor.add_argument("--list", metavar="FILE", help="从文件读取流，每行 'URL' 或 'URL 名称'，# 开头为注释")
+    monitor.add_argument("--interval", type=float, default=10.0, metavar="SECONDS", help="输出指标的间隔（默认: 10）")
+    monitor.add_argument("--stall", type=float, default=5.0, metavar="SECONDS", help="多久收不到数据视为断流（默认: 5），3 倍时间后重连")
+    monitor.add_argument("--drift-ms", type=int, default=1000, help="音视频时间戳漂移告警阈值（毫秒，默认: 1000）")
+    monitor.add_argument("--fps-ratio", type=float, default=0.8, help="实际帧率低于 onMetaData 帧率的该比例时告警（默认: 0.8）")
+    monitor.add_argument("--duration", type=float, metavar="SECONDS", help="运行多久后退出（默认: 一直运行，Ctrl+C 结束）")
+    monitor.set_defaults(func=_cmd_monitor)
+
+    dump = commands.add_parser("dump", help="输出与 flv_parse.sh 格式相同的文本报告")
+    dump.add_argument("file", help="FLV 文件")
+    dump.add_argument("--output", "-o", help="输出文件（默认: 标准输出）")
+    dump.set_defaults(func=_cmd_dump)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    # 从 Finder 启动的旧版 macOS 应用会收到 -psn_ 参数，同样视为图形界面启动
+    if not argv or argv[0].startswith("-psn_"):
+        root = tk.Tk()
+        app = FLVParserGUI(root)
+        root.mainloop()
+        return 0
+    args = _build_arg_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
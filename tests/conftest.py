@@ -0,0 +1,42 @@
+"""
+测试共用的设置：把仓库根目录（flv_parser）与 benchmarks（flvgen）加入模块搜索路径，
+并提供在 FLV 文件开头插入脚本 Tag 的辅助函数与切换 NumPy / 纯 Python 实现的 fixture。
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import flv_parser # noqa: E402
+
+def _write_with_script_tag(src, dst, payload=None, timestamp=0, keep_metadata=True):
+    """
+    把 src 复制为 dst，并在第一个 Tag（onMetaData）之后插入一个负载为 payload 的脚本 Tag。
+    keep_metadata=False 时去掉第一个 Tag，即用 payload 替换 onMetaData；payload 为 None 时不插入。
+    """
+    with flv_parser.FLVFile(src) as flv_file:
+        split = flv_file.index.offsets[1]
+    with open(src, 'rb') as f:
+        data = f.read()
+    with open(dst, 'wb') as out:
+        out.write(data[:split] if keep_metadata else data[:13])
+        if payload is not None:
+            flv_parser._write_tag(out, flv_parser.FLVTag.SCRIPT, timestamp, payload)
+        out.write(data[split:])
+
+@pytest.fixture
+def write_with_script_tag():
+    return _write_with_script_tag
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """分别用 NumPy 与纯 Python 实现运行测试；未安装 NumPy 时跳过前者。"""
+    if request.param == "python":
+        monkeypatch.setattr(flv_parser, "np", None)
+    elif flv_parser.np is None:
+        pytest.skip("需要 NumPy")
+    return request.param
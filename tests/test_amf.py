@@ -0,0 +1,193 @@
+"""
+AMF0Decoder / AMF3Decoder 测试。
+
+_reference_parse 保留了改为整数游标解码之前基于 BytesIO 的实现，
+用于核对两者在原先支持的类型（Number、Boolean、String、Object、ECMA Array、Strict Array）上输出一致；
+原先的实现在嵌套 Object 的结束标记处少读一个 0x09 字节，之后的数据会错位，所以嵌套对象只做往返检查；
+原先不支持的类型（引用、Date、Long String、AMF3）用 _encode_amf_value 往返或手工构造的字节检查。
+"""
+import math
+import struct
+from datetime import datetime, timezone
+from io import BytesIO
+
+import pytest
+
+from flv_parser import (AMF0Decoder, AMFTruncatedError, AMFTypedObject,
+                        _encode_amf_string, _encode_amf_value, decode_amf0)
+
+def _reference_string(f):
+    length = struct.unpack('>H', f.read(2))[0]
+    return f.read(length).decode('utf-8', errors='replace')
+
+def _reference_parse(f, type_marker=None):
+    if type_marker is None:
+        type_marker = struct.unpack('>B', f.read(1))[0]
+    if type_marker == 0:
+        return struct.unpack('>d', f.read(8))[0]
+    elif type_marker == 1:
+        return struct.unpack('>B', f.read(1))[0] != 0
+    elif type_marker == 2:
+        return _reference_string(f)
+    elif type_marker == 3:
+        obj = {}
+        while True:
+            try:
+                key = _reference_string(f)
+                if not key: break
+                value_type = struct.unpack('>B', f.read(1))[0]
+                if value_type == 9: break
+                obj[key] = _reference_parse(f, value_type)
+            except (struct.error, IndexError):
+                break
+        return obj
+    elif type_marker == 8:
+        count = struct.unpack('>I', f.read(4))[0]
+        arr = {}
+        for _ in range(count):
+            key = _reference_string(f)
+            arr[key] = _reference_parse(f)
+        f.read(3)
+        return arr
+    elif type_marker == 10:
+        count = struct.unpack('>I', f.read(4))[0]
+        return [_reference_parse(f) for _ in range(count)]
+    return f"Unsupported AMF Type: {type_marker}"
+
+FLAT_METADATA = {
+    "duration": 120.52, "width": 1920.0, "height": 1080.0, "framerate": 29.97,
+    "videocodecid": 7.0, "audiocodecid": 10.0, "audiosamplerate": 44100.0, "stereo": True,
+    "hasKeyframes": False, "encoder": "Lavf58.29.100", "title": "测试 é",
+}
+
+METADATA = dict(FLAT_METADATA, **{
+    "keyframes": {"times": [i * 2.0 for i in range(40)], "filepositions": [13.0 + i * 5000 for i in range(40)]},
+    "nested": {"list": [1.0, "a", True, {"k": 0.5}], "empty": {}, "empty_list": []},
+})
+
+VALUES = [
+    0.0, -1.5, 1e300, True, False, "", "ascii", "中文字符串",
+    {}, {"a": 1.0}, [], [1.0, 2.0], list(range(9)), list(range(20)),
+    [1.0, "x"] * 6, # 超过 8 个元素但不全是 Number，走逐个解码的路径
+    FLAT_METADATA, [[1.0, "a"], [2.0, [True]]],
+]
+
+def _decode_all(data, count):
+    decoder = AMF0Decoder(data)
+    values = [decoder.decode() for _ in range(count)]
+    return values, decoder.pos
+
+@pytest.mark.parametrize("value", VALUES, ids=lambda v: type(v).__name__)
+@pytest.mark.parametrize("ecma_array", [False, True])
+def test_matches_reference(value, ecma_array):
+    data = _encode_amf_value("onMetaData") + _encode_amf_value(value, ecma_array)
+    f = BytesIO(data)
+    expected = [_reference_parse(f), _reference_parse(f)]
+    assert _decode_all(data, 2) == (expected, len(data))
+    assert _decode_all(memoryview(data), 2) == (expected, len(data))
+
+@pytest.mark.parametrize("ecma_array", [False, True])
+def test_round_trip_metadata(ecma_array):
+    data = _encode_amf_value("onMetaData") + _encode_amf_value(METADATA, ecma_array)
+    name, pos = decode_amf0(data)
+    value, end = decode_amf0(data, pos)
+    assert (name, value, end) == ("onMetaData", METADATA, len(data))
+
+def test_ecma_array_count_is_ignored():
+    # 很多编码器写入的计数是 0 或与实际不符，以结束标记为准
+    body = _encode_amf_value({"a": 1.0, "b": "x"}, ecma_array=True)
+    for count in (0, 1, 7):
+        data = body[:1] + struct.pack('>I', count) + body[5:]
+        assert decode_amf0(data) == ({"a": 1.0, "b": "x"}, len(data))
+
+def test_object_end_marker():
+    data = b'\x03' + _encode_amf_string("a") + _encode_amf_value(1.0) + b'\x00\x00\x09' + _encode_amf_value(2.0)
+    decoder = AMF0Decoder(data)
+    assert decoder.decode() == {"a": 1.0}
+    assert decoder.decode() == 2.0
+    assert decoder.pos == len(data)
+
+def test_null_undefined_unsupported():
+    assert _decode_all(b'\x05\x06\x0d', 3) == ([None, None, None], 3)
+
+def test_long_string():
+    value = "长" * 30000 # 超过 0xFFFF 字节，编码为 Long String
+    data = _encode_amf_value(value)
+    assert data[0] == 0x0c
+    assert decode_amf0(data) == (value, len(data))
+    assert decode_amf0(b'\x0f' + data[1:]) == (value, len(data)) # XML Document 的编码与 Long String 相同
+
+def test_date():
+    value = datetime(2024, 5, 6, 7, 8, 9, 500000, tzinfo=timezone.utc)
+    data = _encode_amf_value(value)
+    assert data[0] == 0x0b and len(data) == 11
+    assert decode_amf0(data) == (value, len(data))
+    # 超出 datetime 范围的时间戳保留为毫秒数
+    data = b'\x0b' + struct.pack('>dh', 1e20, 0)
+    assert decode_amf0(data) == (1e20, 11)
+
+def test_reference():
+    # 引用表按出现顺序记录 Object / ECMA Array / Strict Array / Typed Object：0 为外层数组，1 为其中的对象
+    inner = _encode_amf_value({"a": 1.0})
+    data = b'\x0a' + struct.pack('>I', 3) + inner + b'\x07\x00\x01' + b'\x07\x00\x00'
+    value, pos = decode_amf0(data)
+    assert pos == len(data)
+    assert value[0] == {"a": 1.0} and value[1] is value[0] and value[2] is value
+    with pytest.raises(ValueError):
+        decode_amf0(b'\x0a' + struct.pack('>I', 1) + b'\x07\x00\x01')
+
+def test_typed_object():
+    data = b'\x10' + _encode_amf_string("flash.geom.Point") + _encode_amf_value({"x": 1.0, "y": 2.0})[1:]
+    value, pos = decode_amf0(data)
+    assert isinstance(value, AMFTypedObject) and value.class_name == "flash.geom.Point"
+    assert value == {"x": 1.0, "y": 2.0} and pos == len(data)
+
+def test_avmplus_amf3():
+    # 0x11 之后是 AMF3：动态对象 {"n": 5, "s": "ab", "t": 引用 "ab", "d": 1.5, "a": [true, null]}
+    amf3 = (b'\x0a\x0b\x01' # 对象，内联 traits，动态，无类名
+            b'\x03n\x04\x05'
+            b'\x03s\x06\x05ab'
+            b'\x03t\x06\x04' # 字符串引用表第 2 项（n、s 是第 0、1 项，"ab" 是第 2 项）
+            b'\x03d\x05' + struct.pack('>d', 1.5) +
+            b'\x03a\x09\x05\x01\x03\x01' # 稠密数组 [true, null]
+            b'\x01')
+    data = b'\x11' + amf3
+    value, pos = decode_amf0(data)
+    assert value == {"n": 5, "s": "ab", "t": "ab", "d": 1.5, "a": [True, None]}
+    assert pos == len(data)
+    assert decode_amf0(b'\x11\x04\xff\xff\xff\xff') == (-1, 6) # 29 位有符号整数
+
+def test_unknown_marker():
+    with pytest.raises(ValueError):
+        decode_amf0(b'\x04')
+    with pytest.raises(ValueError):
+        decode_amf0(b'\x12')
+
+@pytest.mark.parametrize("value", [1.0, "abc", "长" * 30000, datetime(2020, 1, 1, tzinfo=timezone.utc),
+                                   [1.0, 2.0, 3.0], list(range(20)), b'\x11\x06\x07abc'])
+def test_truncated_scalar(value):
+    data = value if isinstance(value, bytes) else _encode_amf_value(value)
+    for end in range(len(data)):
+        with pytest.raises(AMFTruncatedError):
+            decode_amf0(data[:end])
+
+@pytest.mark.parametrize("ecma_array", [False, True])
+def test_truncated_object_keeps_parsed_properties(ecma_array):
+    # 与原先的实现一样，Object 中途遇到数据结束时返回已读出的属性：
+    # 结果的键是完整结果的前缀，游标不越过数据末尾
+    data = _encode_amf_value(METADATA, ecma_array)
+    keys = list(METADATA)
+    header = 5 if ecma_array else 1
+    for end in range(header, len(data)):
+        value, pos = decode_amf0(data[:end])
+        assert pos <= end
+        assert list(value) == keys[:len(value)]
+        for key in list(value)[:-1]:
+            assert value[key] == METADATA[key]
+    for end in range(header):
+        with pytest.raises(AMFTruncatedError):
+            decode_amf0(data[:end])
+
+def test_nan():
+    value, _ = decode_amf0(_encode_amf_value(float('nan')))
+    assert math.isnan(value)
@@ -0,0 +1,68 @@
+"""
+TagAnalyzer 测试：增量维护的音频间隔众数与原先每个 Tag 调用 Counter.most_common(1) 的实现给出相同结果，
+且不同间隔很多时状态保持有界。
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from flv_parser import (_AUDIO_GAP_SLOTS, FLVTag, PACKET_CODED_FRAMES, TagAnalyzer,
+                        _audio_gap_finding, _backwards_finding)
+
+class _ReferenceAnalyzer(TagAnalyzer):
+    """原先的实现：用 Counter 记录全部间隔，每个音频 Tag 都重新取众数。"""
+    def __init__(self, metadata=None):
+        super().__init__(metadata)
+        self._counter = Counter()
+
+    def feed(self, tag_type, timestamp, packet_type=PACKET_CODED_FRAMES):
+        if tag_type != FLVTag.AUDIO or packet_type != PACKET_CODED_FRAMES:
+            return super().feed(tag_type, timestamp, packet_type)
+        prev, self._last_audio_ts = self._last_audio_ts, timestamp
+        self._audio_count += 1
+        if prev is not None:
+            gap = timestamp - prev
+            if gap < 0: return _backwards_finding("audio", "音频", gap)
+            if gap > 0: self._counter[gap] += 1
+            if self._audio_count > 10 and self._counter:
+                expected_interval = self._counter.most_common(1)[0][0]
+                if gap > expected_interval * 2.5:
+                    return _audio_gap_finding(gap, expected_interval)
+        return {}
+
+def _gaps(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.03: yield -rng.randrange(1, 200)
+        elif roll < 0.08: yield rng.randrange(60, 400)
+        elif roll < 0.1: yield 0
+        else: yield rng.choice((21, 22, 23, 23, 24, 46))
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_counter_mode(seed):
+    analyzer, reference = TagAnalyzer(), _ReferenceAnalyzer()
+    ts = 10_000
+    for gap in _gaps(seed, 2000):
+        ts = max(ts + gap, 0)
+        assert analyzer.feed(FLVTag.AUDIO, ts) == reference.feed(FLVTag.AUDIO, ts)
+
+def test_mode_tie_keeps_first_seen_gap():
+    # 24 先出现，23 先达到 2 次；两者都为 2 次时按 Counter.most_common 取 24
+    analyzer = TagAnalyzer()
+    ts = 0
+    for gap in (0, 24, 23, 23, 24):
+        ts += gap
+        analyzer.feed(FLVTag.AUDIO, ts)
+    assert analyzer._audio_mode[0] == 24
+
+def test_gap_table_is_bounded():
+    analyzer = TagAnalyzer()
+    ts = 0
+    for k in range(20000):
+        ts += 23 if k % 2 else 100 + k # 一半是固定间隔，一半是从不重复的间隔
+        analyzer.feed(FLVTag.AUDIO, ts)
+        assert len(analyzer._audio_gaps) <= _AUDIO_GAP_SLOTS
+    assert analyzer._audio_mode[0] == 23
+    assert analyzer.feed(FLVTag.AUDIO, ts + 100) == _audio_gap_finding(100, 23)
@@ -0,0 +1,70 @@
+"""
+索引缓存测试：命中缓存时恢复的 onMetaData 与未命中时类型完全一致（Date、Typed Object 等不会变成字符串）。
+"""
+import os
+from datetime import datetime, timezone
+
+import flvgen
+from flv_parser import INDEX_CACHE_SUFFIX, AMFTypedObject, FLVFile, _encode_amf_string, _encode_amf_value
+
+def _snapshot(flv_file):
+    return (flv_file.cache_status, flv_file.metadata, list(flv_file.index.offsets), flv_file.analysis,
+            flv_file.timestamp_report)
+
+def test_cached_metadata_keeps_amf_types(tmp_path, write_with_script_tag):
+    raw, path = str(tmp_path / "raw.flv"), str(tmp_path / "sample.flv")
+    flvgen.generate(raw, duration=2, fps=25, video_kbps=100, gaps=1)
+    created = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    point = b'\x10' + _encode_amf_string("flash.geom.Point") + _encode_amf_value({"x": 1.0, "y": 2.0})[1:]
+    metadata = (b'\x08\x00\x00\x00\x04' + _encode_amf_string("duration") + _encode_amf_value(2.0)
+                + _encode_amf_string("creationdate") + _encode_amf_value(created)
+                + _encode_amf_string("origin") + point
+                + _encode_amf_string("audiosamplerate") + _encode_amf_value(44100.0) + b'\x00\x00\x09')
+    write_with_script_tag(raw, path, _encode_amf_value("onMetaData") + metadata, keep_metadata=False)
+
+    with FLVFile(path, use_cache=True) as miss:
+        expected = _snapshot(miss)
+    assert expected[0] == 'miss' and os.path.exists(path + INDEX_CACHE_SUFFIX)
+    for use_mmap in (False, True):
+        with FLVFile(path, use_mmap=use_mmap, use_cache=True) as hit:
+            assert _snapshot(hit)[1:] == expected[1:] and hit.cache_status == 'hit'
+            assert hit.metadata["creationdate"] == created
+            assert isinstance(hit.metadata["origin"], AMFTypedObject)
+            assert hit.metadata["origin"].class_name == "flash.geom.Point"
+
+def test_cache_without_metadata(tmp_path, write_with_script_tag):
+    raw, path = str(tmp_path / "raw.flv"), str(tmp_path / "sample.flv")
+    flvgen.generate(raw, duration=1, fps=25, video_kbps=100)
+    write_with_script_tag(raw, path, _encode_amf_value("onCuePoint") + _encode_amf_value({"time": 0.0}), keep_metadata=False)
+    with FLVFile(path, use_cache=True) as miss:
+        assert miss.metadata == {}
+    with FLVFile(path, use_cache=True) as hit:
+        assert hit.cache_status == 'hit' and hit.metadata == {}
+
+def test_damaged_cache_is_a_miss(tmp_path):
+    path = str(tmp_path / "sample.flv")
+    flvgen.generate(path, duration=2, fps=25, video_kbps=100)
+    with FLVFile(path, use_cache=True) as miss:
+        expected = _snapshot(miss)
+    cache_path = path + INDEX_CACHE_SUFFIX
+    with open(cache_path, 'rb') as f:
+        data = f.read()
+    # 最后一列少 8 项（写了一半），或者末尾多出字节
+    for damaged in (data[:-8 * miss.index.timestamps.itemsize], data[:-1], data + b'\x00'):
+        with open(cache_path, 'wb') as f:
+            f.write(damaged)
+        with FLVFile(path, use_cache=True) as reopened:
+            assert _snapshot(reopened) == expected
+            assert len(reopened.timeline().series()["time_ms"]) > 0
+    with FLVFile(path, use_cache=True) as hit:
+        assert hit.cache_status == 'hit'
+
+def test_failed_cache_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "sample.flv")
+    flvgen.generate(path, duration=1, fps=25, video_kbps=100)
+    def fail(src, dst):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(os, "replace", fail)
+    with FLVFile(path, use_cache=True) as flv_file:
+        assert flv_file.cache_status == 'miss'
+    assert os.listdir(tmp_path) == ["sample.flv"]
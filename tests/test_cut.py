@@ -0,0 +1,62 @@
+"""
+cut_flv 测试：起点对齐到关键帧，时间戳从 0 开始，终点不含 end_ms，输出的 onMetaData 描述截取后的文件。
+"""
+import os
+
+import pytest
+
+import flvgen
+from flv_parser import FLVFile, FLVTag, PACKET_CODED_FRAMES, PACKET_SEQUENCE_START, cut_flv, write_with_keyframes
+
+@pytest.fixture
+def source(tmp_path):
+    # 10 秒，25 fps，每 2 秒一个关键帧，onMetaData 带 keyframes
+    raw, path = str(tmp_path / "raw.flv"), str(tmp_path / "src.flv")
+    flvgen.generate(raw, duration=10, fps=25, video_kbps=200)
+    with FLVFile(raw) as flv_file:
+        write_with_keyframes(flv_file, path)
+    return path
+
+def _frames(flv_file):
+    index = flv_file.index
+    return [(index.types[i], index.timestamps[i], bytes(flv_file.get_tag(i).data)) for i in range(len(index))
+            if index.types[i] != FLVTag.SCRIPT and index.packet_types[i] == PACKET_CODED_FRAMES]
+
+@pytest.mark.parametrize("start_ms, end_ms, base", [(3000, 7000, 2000), (4000, 6000, 4000), (0, 1000, 0), (8500, None, 8000)])
+def test_cut(tmp_path, source, backend, start_ms, end_ms, base):
+    output = str(tmp_path / "cut.flv")
+    with FLVFile(source, use_mmap=True) as src:
+        stats = cut_flv(src, output, start_ms, end_ms)
+        # 原文件中从对齐后的关键帧开始、按文件顺序到第一个不早于 end_ms 的帧之前
+        frames = _frames(src)
+        first = next(k for k, (t, ts, _) in enumerate(frames) if t == FLVTag.VIDEO and ts == base)
+        stop = next((k for k in range(first + 1, len(frames)) if end_ms is not None and frames[k][1] >= end_ms), len(frames))
+        expected = [(t, ts - base, data) for t, ts, data in frames[first:stop]]
+    assert stats["start_ms"] == base
+    assert stats["bytes"] == os.path.getsize(output)
+
+    with FLVFile(output) as cut:
+        index = cut.index
+        assert _frames(cut) == expected
+        # 第一个帧是关键帧，之前依次是 onMetaData 和音视频序列头
+        assert list(index.types[:3]) == [FLVTag.SCRIPT, FLVTag.VIDEO, FLVTag.AUDIO]
+        assert list(index.packet_types[1:3]) == [PACKET_SEQUENCE_START] * 2
+        assert index.frame_types[3] == 1 and index.timestamps[3] == 0
+        if end_ms is not None: # 终点不含 end_ms
+            assert max(ts for _, ts, _ in expected) < end_ms - base
+        metadata = cut.metadata
+        assert metadata["duration"] == max(ts for _, ts, _ in expected) / 1000
+        assert metadata["duration"] * 1000 + base == stats["end_ms"]
+        assert metadata["filesize"] == os.path.getsize(output)
+        keyframes = [i for i in range(len(index)) if index.types[i] == FLVTag.VIDEO and index.frame_types[i] == 1
+                     and index.packet_types[i] == PACKET_CODED_FRAMES]
+        assert metadata["keyframes"]["times"] == [index.timestamps[i] / 1000 for i in keyframes]
+        assert metadata["keyframes"]["filepositions"] == [float(index.offsets[i]) for i in keyframes]
+        assert list(index.types).count(FLVTag.SCRIPT) == 1
+
+def test_end_must_follow_start(tmp_path, source):
+    with FLVFile(source) as src:
+        with pytest.raises(ValueError):
+            cut_flv(src, str(tmp_path / "cut.flv"), 3000, 3000)
+        with pytest.raises(ValueError):
+            cut_flv(src, str(tmp_path / "cut.flv"), 60000)
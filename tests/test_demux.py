@@ -0,0 +1,47 @@
+"""
+内置解复用器测试：AAC 序列头使用显式采样率（freq_index 为 15，ADTS 无法表示）时，
+can_demux_natively 返回 False，直接调用 demux_streams 也会跳过音频并写完整个视频流。
+"""
+import os
+
+import pytest
+
+import flvgen
+from flv_parser import FLVFile, can_demux_natively, demux_streams
+
+AAC_LC_44100_STEREO = b'\xaf\x00\x12\x10'
+AAC_LC_EXPLICIT_RATE = b'\xaf\x00\x17\x80' # object type 2，freq_index 15，其后应为 24 位采样率
+
+@pytest.fixture
+def sample(tmp_path):
+    path = str(tmp_path / "sample.flv")
+    stats = flvgen.generate(path, duration=2, fps=25, video_kbps=100)
+    return path, stats
+
+def test_demux_aac(sample, tmp_path):
+    path, stats = sample
+    with FLVFile(path) as flv_file:
+        assert can_demux_natively(flv_file)
+        result = demux_streams(flv_file, str(tmp_path / "v.h264"), str(tmp_path / "a.aac"))
+    assert result["video_frames"] == stats["video_frames"]
+    assert result["audio_frames"] == stats["audio_frames"]
+    assert result["skipped_tags"] == 0
+    with open(tmp_path / "a.aac", 'rb') as f:
+        assert f.read(2) == b'\xff\xf1'
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_explicit_sample_rate_skips_audio(sample, tmp_path, use_mmap):
+    path, stats = sample
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data.count(AAC_LC_44100_STEREO) == 1
+    with open(path, 'wb') as f:
+        f.write(data.replace(AAC_LC_44100_STEREO, AAC_LC_EXPLICIT_RATE))
+    with FLVFile(path, use_mmap=use_mmap) as flv_file:
+        assert not can_demux_natively(flv_file)
+        result = demux_streams(flv_file, str(tmp_path / "v.h264"), str(tmp_path / "a.aac"))
+    assert result["video_frames"] == stats["video_frames"]
+    assert result["audio_frames"] == 0
+    assert result["skipped_tags"] == stats["audio_frames"] + 1
+    assert os.path.getsize(tmp_path / "v.h264") == result["video_bytes"]
+    assert os.path.getsize(tmp_path / "a.aac") == 0
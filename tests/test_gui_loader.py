@@ -0,0 +1,67 @@
+"""
+GUI 后台解析线程测试（不需要图形环境）：进度消息只携带快照而不是仍在增长的 FLVFile，
+取消在索引之后的分析与关键帧阶段同样生效。
+"""
+import queue
+import threading
+
+import pytest
+
+import flvgen
+import flv_parser
+from flv_parser import FLVFile, FLVParserGUI, _tree_buckets
+
+class _Loader:
+    TREE_BUCKET_SIZE = 100
+    _load_worker = FLVParserGUI._load_worker
+
+def _run(path, cancel_event, *args):
+    load_queue = queue.Queue()
+    _Loader()._load_worker(path, cancel_event, load_queue, *args)
+    return [load_queue.get_nowait() for _ in range(load_queue.qsize())]
+
+@pytest.fixture(scope="module")
+def sample(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("gui") / "sample.flv")
+    flvgen.generate(path, duration=30, fps=30, video_kbps=400)
+    return path
+
+@pytest.fixture(autouse=True)
+def small_progress_step(monkeypatch):
+    monkeypatch.setattr(flv_parser, "_PROGRESS_STEP", 64 * 1024)
+
+def test_progress_messages_are_snapshots(sample):
+    messages = _run(sample, threading.Event())
+    assert messages[-1][0] == "done"
+    progress = [m for m in messages if m[0] == "progress"]
+    assert len(progress) > 3
+    buckets = []
+    for _, header_info, bytes_done, total_bytes, tag_count, new_buckets in progress:
+        assert not any(isinstance(v, FLVFile) for v in (header_info, new_buckets))
+        assert isinstance(header_info, tuple) and isinstance(new_buckets, tuple)
+        assert bytes_done <= total_bytes
+        buckets.extend(new_buckets)
+        assert all(end <= tag_count for _, end, _, _ in new_buckets)
+    with messages[-1][1] as flv_file:
+        index = flv_file.index
+        buckets.extend(_tree_buckets(index, len(buckets) * _Loader.TREE_BUCKET_SIZE, len(index),
+                                     _Loader.TREE_BUCKET_SIZE, final=True))
+        assert buckets == list(_tree_buckets(index, 0, len(index), _Loader.TREE_BUCKET_SIZE, final=True))
+        assert dict(progress[0][1]) == flv_file.get_header_info()
+
+def test_cancel_after_indexing(sample, monkeypatch):
+    # 进度到达文件末尾（索引完成）后才请求取消，分析与关键帧阶段不应继续
+    cancel_event = threading.Event()
+    original = flv_parser.FLVFile._phase_progress
+    phases = []
+    def phase_progress(flv_file):
+        phases.append(flv_file)
+        cancel_event.set()
+        original(flv_file)
+    monkeypatch.setattr(flv_parser.FLVFile, "_phase_progress", phase_progress)
+    analyzed = []
+    monkeypatch.setattr(flv_parser.FLVFile, "_analyze_tags", lambda flv_file: analyzed.append(flv_file))
+    messages = _run(sample, cancel_event)
+    assert messages[-1] == ("cancelled",)
+    assert len(phases) == 1 and not analyzed
+    assert phases[0]._mmap is None # 取消时映射已释放
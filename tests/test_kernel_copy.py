@@ -0,0 +1,49 @@
+"""
+_kernel_copy 测试：内核复制与回退路径结果一致；只有表示“不支持”的错误码才回退，其余错误照常抛出。
+"""
+import errno
+import os
+
+import pytest
+
+import flv_parser
+from flv_parser import _kernel_copy
+
+DATA = bytes(range(256)) * 4096
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "src.bin"
+    path.write_bytes(DATA)
+    return path
+
+def _copy(source, tmp_path, start, length):
+    out_path = tmp_path / "out.bin"
+    with open(source, 'rb') as src, open(out_path, 'wb') as out:
+        out.write(b'head')
+        copied = _kernel_copy(src, out, start, length)
+        out.write(b'tail')
+    assert out_path.read_bytes() == b'head' + DATA[start:start + length] + b'tail'
+    return copied
+
+def test_copy(source, tmp_path):
+    copied = _copy(source, tmp_path, 1000, 500_000)
+    assert copied in (0, 500_000)
+
+@pytest.mark.parametrize("code", [errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP])
+def test_unsupported_falls_back(source, tmp_path, monkeypatch, code):
+    def unsupported(*args):
+        raise OSError(code, os.strerror(code))
+    monkeypatch.setattr(flv_parser.os, "copy_file_range", unsupported, raising=False)
+    monkeypatch.setattr(flv_parser.os, "sendfile", unsupported, raising=False)
+    assert _copy(source, tmp_path, 7, 300_000) == 0
+
+@pytest.mark.parametrize("code", [errno.EBADF, errno.EIO, errno.ENOSPC])
+def test_other_errors_propagate(source, tmp_path, monkeypatch, code):
+    def failing(*args):
+        raise OSError(code, os.strerror(code))
+    monkeypatch.setattr(flv_parser.os, "copy_file_range", failing, raising=False)
+    with open(source, 'rb') as src, open(tmp_path / "out.bin", 'wb') as out:
+        with pytest.raises(OSError) as excinfo:
+            _kernel_copy(src, out, 0, 1000)
+    assert excinfo.value.errno == code
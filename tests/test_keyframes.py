@@ -0,0 +1,52 @@
+"""
+KeyframeIndex 测试：时间戳有回退时 find() 仍返回时间点处或之前最近的关键帧，times / positions 保持文件顺序。
+"""
+import random
+
+import pytest
+
+from flv_parser import FLVTag, KeyframeIndex, PACKET_CODED_FRAMES, TagIndex
+
+def _index(keyframe_times):
+    # 每个关键帧之后跟一个非关键帧和一个音频帧
+    index = TagIndex()
+    for t in keyframe_times:
+        index.append(len(index) * 100, FLVTag.VIDEO, 80, t, 0, 1, 7, PACKET_CODED_FRAMES)
+        index.append(len(index) * 100, FLVTag.VIDEO, 40, t + 40, 0, 2, 7, PACKET_CODED_FRAMES)
+        index.append(len(index) * 100, FLVTag.AUDIO, 10, t + 20, 0, 0, 10, PACKET_CODED_FRAMES)
+    return index
+
+def _reference(index, time_ms):
+    # 线性查找：时间不超过 time_ms 的最大时间（同一时间取文件中靠后的），都晚于 time_ms 时取时间最早的
+    keys = [(index.timestamps[i], i) for i in range(len(index)) if index.types[i] == FLVTag.VIDEO and index.frame_types[i] == 1]
+    before = [key for key in keys if key[0] <= time_ms]
+    if before: return max(before)[1]
+    return min(keys, key=lambda key: key[0])[1]
+
+@pytest.mark.parametrize("times", [
+    [0, 2000, 4000, 6000],
+    [0, 2000, 4000, 1000, 3000, 5000], # 推流端重连后时间戳回退
+    [5000, 7000, 0, 2000, 2000, 4000],
+    [3000, 3000, 1000, 3000],
+])
+def test_find_matches_linear_search(backend, times):
+    index = _index(times)
+    keyframes = KeyframeIndex.from_tag_index(index)
+    assert list(keyframes.times) == times
+    assert list(keyframes.positions) == [3 * k for k in range(len(times))]
+    for t in range(-1, max(times) + 2500, 250):
+        assert keyframes.find(max(t, 0)) == _reference(index, max(t, 0))
+
+def test_random_backwards_times(backend):
+    rng = random.Random(7)
+    times, t = [], 0
+    for _ in range(300):
+        t = max(t + rng.choice((2000, 2000, 2000, -rng.randrange(1, 20000))), 0)
+        times.append(t)
+    index = _index(times)
+    keyframes = KeyframeIndex.from_tag_index(index)
+    for probe in range(0, max(times) + 2000, 337):
+        assert keyframes.find(probe) == _reference(index, probe)
+
+def test_empty():
+    assert KeyframeIndex.from_tag_index(_index([])).find(0) is None
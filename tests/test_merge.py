@@ -0,0 +1,84 @@
+"""
+merge_flv 测试：合并结果的 onMetaData 反映整个输出文件，脚本 Tag 的时间戳在片段边界处对齐。
+"""
+import os
+
+import flvgen
+from flv_parser import FLVFile, FLVTag, _encode_amf_value, merge_flv
+
+def _segments(tmp_path, durations):
+    paths = []
+    for k, duration in enumerate(durations):
+        path = str(tmp_path / f"raw{k}.flv")
+        flvgen.generate(path, duration=duration, fps=25, video_kbps=100, seed=k + 1)
+        paths.append(path)
+    return paths
+
+def _metadata_payload(metadata):
+    return _encode_amf_value("onMetaData") + _encode_amf_value(metadata, ecma_array=True)
+
+def test_metadata_describes_merged_file(tmp_path, write_with_script_tag):
+    paths = _segments(tmp_path, (2, 3))
+    # 第一个片段带有按自身计算的 filesize / keyframes
+    with FLVFile(paths[0]) as flv_file:
+        stale = dict(flv_file.metadata, filesize=float(os.path.getsize(paths[0])),
+                     keyframes={"times": [0.0], "filepositions": [13.0]}, hasKeyframes=True)
+    paths[0] = str(tmp_path / "seg0.flv")
+    write_with_script_tag(str(tmp_path / "raw0.flv"), paths[0], _metadata_payload(stale), keep_metadata=False)
+
+    output = str(tmp_path / "merged.flv")
+    stats = merge_flv(paths, output)
+    with FLVFile(output) as merged:
+        metadata = merged.metadata
+        assert metadata["duration"] == stats["duration_ms"] / 1000
+        assert 5.0 <= metadata["duration"] < 5.2
+        assert metadata["filesize"] == os.path.getsize(output)
+        assert "keyframes" not in metadata and "hasKeyframes" not in metadata
+        assert metadata["width"] == stale["width"] and metadata["encoder"] == stale["encoder"]
+        assert list(merged.index.types).count(FLVTag.SCRIPT) == 1
+        assert merged.get_tag(0).details["Metadata"] == metadata
+
+def test_leading_script_tags_use_segment_start(tmp_path, write_with_script_tag):
+    paths = []
+    for k, raw in enumerate(_segments(tmp_path, (1, 1))):
+        paths.append(str(tmp_path / f"seg{k}.flv"))
+        # 在 onMetaData 之后插入时间戳为 700 的 onTextData；片段自身的时间戳从 0 开始
+        write_with_script_tag(raw, paths[-1], _encode_amf_value("onTextData") + _encode_amf_value({"text": "x"}), 700)
+    output = str(tmp_path / "merged.flv")
+    merge_flv(paths, output)
+    with FLVFile(output) as merged:
+        index = merged.index
+        cues = [i for i in range(len(index)) if index.types[i] == FLVTag.SCRIPT
+                and merged.get_tag(i).details.get("Name") == "onTextData"]
+        assert len(cues) == 2
+        # 每个 onTextData 都对齐到所在片段的第一个音视频帧
+        for i in cues:
+            first_frame = next(j for j in range(i + 1, len(index)) if index.types[j] != FLVTag.SCRIPT)
+            assert index.timestamps[i] == index.timestamps[first_frame]
+        assert index.timestamps[cues[1]] > 0
+        # 时间戳单调不减
+        assert all(b >= a for a, b in zip(index.timestamps, index.timestamps[1:]))
+
+def test_metadata_from_later_segment(tmp_path, write_with_script_tag):
+    raw = _segments(tmp_path, (1, 1, 1))
+    paths = [str(tmp_path / f"seg{k}.flv") for k in range(3)]
+    # 第一个片段没有 onMetaData，第二、三个片段的 onMetaData 宽度不同，应保留第二个片段的
+    write_with_script_tag(raw[0], paths[0], keep_metadata=False)
+    with FLVFile(raw[1]) as flv_file:
+        width = flv_file.metadata["width"]
+        write_with_script_tag(raw[1], paths[1], _metadata_payload(dict(flv_file.metadata)), keep_metadata=False)
+        write_with_script_tag(raw[2], paths[2], _metadata_payload(dict(flv_file.metadata, width=width / 2)),
+                              keep_metadata=False)
+    with FLVFile(paths[0]) as flv_file:
+        assert flv_file.metadata == {}
+
+    output = str(tmp_path / "merged.flv")
+    stats = merge_flv(paths, output)
+    with FLVFile(output) as merged:
+        metadata = merged.metadata
+        assert merged.metadata_offset == 13
+        assert metadata["width"] == width
+        assert metadata["duration"] == stats["duration_ms"] / 1000
+        assert metadata["filesize"] == os.path.getsize(output)
+        assert [merged.get_tag(i).details.get("Name") for i in range(len(merged.index))
+                if merged.index.types[i] == FLVTag.SCRIPT] == ["onMetaData"]
@@ -0,0 +1,101 @@
+"""
+多进程分块解析测试：jobs > 1 时得到的索引、元数据与分析结果和顺序解析完全相同，
+包括分块起点对齐到负载中伪 Tag 头后重新解析、损坏文件以及 recover=True 的情况。
+"""
+import random
+
+import pytest
+
+import flvgen
+import flv_parser
+from flv_parser import FLVFile, FLVTag, TagIndex, _write_tag
+
+JOBS = (2, 3, 4, 8)
+
+@pytest.fixture(autouse=True)
+def parallel_runs(monkeypatch):
+    # 分块大小只在主进程中计算，调小后几百 KB 的文件也会切成多个分块；记录并行解析是否真正执行
+    monkeypatch.setattr(flv_parser, "_PARALLEL_MIN_CHUNK", 1024)
+    runs = []
+    parse_parallel = FLVFile._parse_parallel
+    def record(self, offset, jobs):
+        end = parse_parallel(self, offset, jobs)
+        runs.append(end)
+        return end
+    monkeypatch.setattr(FLVFile, "_parse_parallel", record)
+    return runs
+
+def _snapshot(path, **kwargs):
+    with FLVFile(path, **kwargs) as flv_file:
+        return (TagIndex.column_bytes(flv_file.index), flv_file.header, flv_file.metadata, flv_file.metadata_offset,
+                flv_file.analysis, flv_file.timestamp_report, flv_file.corrupt_ranges)
+
+def _with_fake_tags(path, frames=300, seed=3):
+    # 每个视频帧的负载中都嵌有两个首尾相接、结构完全合法的伪 Tag，分块起点落在负载中时会先对齐到它们
+    rng = random.Random(seed)
+    fake = b''
+    for _ in range(2):
+        body = bytes(rng.randrange(256) for _ in range(20))
+        fake += bytes((FLVTag.VIDEO, 0, 0, len(body), 0, 0, 0, 0, 0, 0, 0)) + body + (11 + len(body)).to_bytes(4, 'big')
+    with open(path, 'wb') as out:
+        out.write(b'FLV\x01\x05\x00\x00\x00\x09\x00\x00\x00\x00')
+        _write_tag(out, FLVTag.SCRIPT, 0, flv_parser._encode_amf_value("onMetaData")
+                   + flv_parser._encode_amf_value({"duration": frames / 25, "framerate": 25.0}, ecma_array=True))
+        for k in range(frames):
+            filler = bytes(rng.randrange(256) for _ in range(rng.randrange(50, 600)))
+            _write_tag(out, FLVTag.VIDEO, k * 40, (b'\x17' if k % 50 == 0 else b'\x27') + b'\x01\x00\x00\x00'
+                       + filler[:len(filler) // 2] + fake + filler[len(filler) // 2:])
+            _write_tag(out, FLVTag.AUDIO, k * 40 + 10, b'\xaf\x01' + bytes(rng.randrange(256) for _ in range(30)))
+
+def _assert_same_for_all_jobs(path, runs, recover=False):
+    expected = _snapshot(path, recover=recover)
+    assert len(expected[0][0]) > 0
+    for jobs in JOBS:
+        for use_mmap in (False, True):
+            assert _snapshot(path, jobs=jobs, use_mmap=use_mmap, recover=recover) == expected, (jobs, use_mmap)
+    # recover=True 时忽略 jobs，逐个校验 Tag
+    assert runs == [] if recover else len(runs) == 2 * len(JOBS) and None not in runs
+
+def test_fake_tag_headers_in_payload(tmp_path, parallel_runs):
+    path = str(tmp_path / "fake.flv")
+    _with_fake_tags(path)
+    # 确认确实有分块起点会对齐到伪 Tag 上，从而走到主进程重新解析的路径
+    with FLVFile(path) as flv_file:
+        real = set(flv_file.index.offsets)
+    with open(path, 'rb') as f:
+        data = f.read()
+    starts = range(13, len(data), 997)
+    assert any(flv_parser._find_tag_boundary(data, s, len(data)) not in real for s in starts)
+    _assert_same_for_all_jobs(path, parallel_runs)
+
+@pytest.mark.parametrize("options", [{}, {"audio": "mp3", "video": "hevc"}, {"gaps": 3, "gap_ms": 900}])
+def test_clean_file(tmp_path, options, parallel_runs):
+    path = str(tmp_path / "clean.flv")
+    flvgen.generate(path, duration=8, fps=25, video_kbps=200, **options)
+    _assert_same_for_all_jobs(path, parallel_runs)
+
+@pytest.mark.parametrize("recover", [False, True])
+def test_damaged_file(tmp_path, recover, parallel_runs):
+    # 损坏的 PreviousTagSize、被改写的 Tag 头与负载头，以及写了一半的最后一个 Tag
+    path = str(tmp_path / "damaged.flv")
+    flvgen.generate(path, duration=8, fps=25, video_kbps=200, corrupt=3, truncate=True)
+    _assert_same_for_all_jobs(path, parallel_runs, recover=recover)
+    if recover:
+        assert _snapshot(path, recover=True)[-1] # 确实检测到了损坏区间
+
+def test_resume_from_cache(tmp_path, parallel_runs):
+    # 文件在缓存之后增长：续读部分也可以并行解析
+    path, full = str(tmp_path / "growing.flv"), str(tmp_path / "full.flv")
+    flvgen.generate(full, duration=8, fps=25, video_kbps=200)
+    with open(full, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:len(data) // 3])
+    with FLVFile(path, use_cache=True):
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    with FLVFile(path, use_cache=True, jobs=4) as flv_file:
+        assert flv_file.cache_status == 'append' and parallel_runs[-1] is not None
+        resumed = TagIndex.column_bytes(flv_file.index)
+    assert resumed == _snapshot(full)[0]
@@ -0,0 +1,107 @@
+"""
+单遍解析 (FLVFile._parse) 与原先两遍解析的对比测试。
+
+_two_pass_parse 保留了改为单遍解析之前的实现：第一遍只为找到 onMetaData，
+第二遍再创建全部 Tag，因此 onMetaData 出现在音频 Tag 之后时，之前的音频 Tag 同样用到元数据。
+"""
+import struct
+
+import pytest
+
+import flvgen
+from flv_parser import FLVFile, FLVTag
+
+def _two_pass_parse(path):
+    header, metadata, tags = {}, {}, []
+    with open(path, 'rb') as f:
+        header_data = f.read(9)
+        if len(header_data) < 9 or header_data[0:3] != b'FLV':
+            raise ValueError("Invalid FLV file")
+        header["Version"] = header_data[3]
+        flags = header_data[4]
+        header["HasVideo"], header["HasAudio"] = bool(flags & 1), bool(flags & 4)
+        header["HeaderSize"] = struct.unpack(">I", header_data[5:9])[0]
+        f.seek(header["HeaderSize"])
+        f.read(4)
+
+        temp_offset = header["HeaderSize"] + 4
+        while True:
+            tag_header = f.read(11)
+            if len(tag_header) < 11: break
+            tag_type = tag_header[0]
+            data_size = (tag_header[1] << 16) | (tag_header[2] << 8) | tag_header[3]
+            if tag_type == FLVTag.SCRIPT:
+                tag_data = tag_header + f.read(data_size)
+                tag = FLVTag(temp_offset, tag_data, {})
+                if tag.details.get("Name") == "onMetaData":
+                    metadata = tag.details.get("Metadata", {})
+                    break
+            else:
+                f.seek(data_size + 4, 1)
+            temp_offset += 11 + data_size + 4
+
+        f.seek(header["HeaderSize"] + 4)
+        offset = header["HeaderSize"] + 4
+        while True:
+            tag_header = f.read(11)
+            if len(tag_header) < 11: break
+            data_size = (tag_header[1] << 16) | (tag_header[2] << 8) | tag_header[3]
+            tag_data = tag_header + f.read(data_size)
+            tags.append(FLVTag(offset, tag_data, metadata))
+            f.read(4)
+            offset += 11 + data_size + 4
+    return header, metadata, tags
+
+def _move_metadata_after_first_audio(src, dst):
+    """把 onMetaData 挪到第一个音频 Tag 之后（整段移动 Tag + PreviousTagSize，文件仍然合法）。"""
+    with open(src, 'rb') as f:
+        data = f.read()
+    pos, blobs = 13, []
+    while pos + 11 <= len(data):
+        size = int.from_bytes(data[pos+1:pos+4], 'big')
+        blobs.append(data[pos:pos + 11 + size + 4])
+        pos += 11 + size + 4
+    script = next(i for i, blob in enumerate(blobs) if blob[0] == FLVTag.SCRIPT)
+    blob = blobs.pop(script)
+    first_audio = next(i for i, b in enumerate(blobs) if b[0] == FLVTag.AUDIO)
+    blobs.insert(first_audio + 1, blob)
+    with open(dst, 'wb') as f:
+        f.write(data[:13] + b''.join(blobs))
+
+@pytest.fixture(scope="module", params=["aac", "mp3"])
+def sample(request, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("flv") / f"sample_{request.param}.flv")
+    flvgen.generate(path, duration=3, fps=25, audio=request.param, video_kbps=200, gaps=1)
+    return path
+
+@pytest.fixture(scope="module")
+def late_metadata(sample, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("flv") / "late.flv")
+    _move_metadata_after_first_audio(sample, path)
+    return path
+
+def _assert_same(path, use_mmap):
+    header, metadata, tags = _two_pass_parse(path)
+    with FLVFile(path, use_mmap=use_mmap) as flv_file:
+        assert {key: flv_file.header[key] for key in header} == header
+        assert flv_file.metadata == metadata
+        index = flv_file.index
+        assert len(index) == len(tags)
+        assert list(index.offsets) == [t.offset for t in tags]
+        assert list(index.types) == [t.tag_type for t in tags]
+        assert list(index.timestamps) == [t.timestamp for t in tags]
+        for i, tag in enumerate(tags):
+            if tag.tag_type == FLVTag.AUDIO:
+                assert flv_file.get_tag(i).details == tag.details, i
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_matches_two_pass(sample, use_mmap):
+    _assert_same(sample, use_mmap)
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_metadata_after_first_audio_tag(late_metadata, use_mmap):
+    header, metadata, tags = _two_pass_parse(late_metadata)
+    script = next(i for i, tag in enumerate(tags) if tag.tag_type == FLVTag.SCRIPT)
+    assert any(tag.tag_type == FLVTag.AUDIO for tag in tags[:script])
+    assert "audiosamplerate" in metadata
+    _assert_same(late_metadata, use_mmap)
@@ -0,0 +1,55 @@
+"""
+Timeline.gops 测试：final=True 时计入文件末尾尚未结束的 GOP，命令行 --gops 输出每个 GOP 一行。
+"""
+import csv
+import io
+import subprocess
+import sys
+
+import pytest
+
+import flvgen
+import flv_parser
+from flv_parser import FLVFile, FLVTag, Timeline
+
+@pytest.mark.parametrize("duration, count", [(10, 5), (2, 1)])
+def test_final_gop_is_included(tmp_path, backend, duration, count):
+    # flvgen 每 2 秒一个关键帧
+    path = str(tmp_path / "sample.flv")
+    flvgen.generate(path, duration=duration, fps=25, video_kbps=100)
+    with FLVFile(path) as flv_file:
+        timeline = Timeline()
+        timeline.update(flv_file.index)
+        video = [i for i in range(len(flv_file.index)) if flv_file.index.types[i] == FLVTag.VIDEO
+                 and flv_file.index.packet_types[i] == flv_parser.PACKET_CODED_FRAMES]
+        last_video = flv_file.index.timestamps[video[-1]]
+    closed, gops = timeline.gops(), timeline.gops(final=True)
+    assert len(closed["time_ms"]) == count - 1 and len(gops["time_ms"]) == count
+    assert all(gops[name][:-1] == closed[name] for name in gops)
+    assert gops["time_ms"] == [k * 2000 for k in range(count)]
+    assert sum(gops["frames"]) == len(video)
+    assert gops["duration_ms"][-1] == last_video - gops["time_ms"][-1]
+    # 不改变内部状态：之后追加的 Tag 仍按原来的 GOP 继续累计
+    assert timeline.gops() == closed
+
+def test_incremental_updates_match(tmp_path, backend):
+    path = str(tmp_path / "sample.flv")
+    flvgen.generate(path, duration=7, fps=25, video_kbps=100)
+    with FLVFile(path) as flv_file:
+        whole, pieces = Timeline(), Timeline()
+        whole.update(flv_file.index)
+        index = flv_file.index
+        for end in range(0, len(index) + 37, 37):
+            partial = flv_parser.TagIndex()
+            partial.extend_bytes([getattr(index, name)[:end].tobytes() for name, _ in flv_parser.TagIndex.COLUMNS])
+            pieces.update(partial)
+    assert pieces.gops(final=True) == whole.gops(final=True)
+
+def test_cli_gops_rows(tmp_path):
+    path = str(tmp_path / "sample.flv")
+    flvgen.generate(path, duration=10, fps=25, video_kbps=100)
+    result = subprocess.run([sys.executable, flv_parser.__file__, "timeline", path, "--gops"],
+                            check=True, capture_output=True, text=True)
+    rows = list(csv.reader(io.StringIO(result.stdout)))
+    assert rows[0] == list(flv_parser.GOP_FIELDS)
+    assert [int(row[0]) for row in rows[1:]] == [0, 2000, 4000, 6000, 8000]
@@ -0,0 +1,77 @@
+"""
+analyze_timestamps 的 NumPy 实现与纯 Python 实现的对比测试：
+两者对同一个索引应给出相同的逐 Tag 结果与汇总报告（backend 字段除外），且报告可以直接序列化为 JSON。
+"""
+import json
+import random
+
+import pytest
+
+import flvgen
+from flv_parser import (FLVFile, FLVTag, PACKET_CODED_FRAMES, PACKET_SEQUENCE_START, TagIndex,
+                        _analyze_timestamps_numpy, _analyze_timestamps_python)
+
+pytest.importorskip("numpy")
+
+def _assert_same(index, video_interval):
+    py_findings, py_report = _analyze_timestamps_python(index, video_interval)
+    np_findings, np_report = _analyze_timestamps_numpy(index, video_interval)
+    assert (py_report.pop("backend"), np_report.pop("backend")) == ("python", "numpy")
+    assert np_findings == py_findings
+    assert np_report == py_report
+    assert all(type(k) is int for k in np_findings)
+    assert json.dumps(np_report, sort_keys=True) == json.dumps(py_report, sort_keys=True)
+
+def _random_index(seed, count=3000):
+    # 时间戳带有抖动、重复、回退与跳跃，音频间隔的众数有并列，部分视频帧 CTS 为负
+    rng = random.Random(seed)
+    index = TagIndex()
+    index.append(13, FLVTag.SCRIPT, 300, 0)
+    index.append(400, FLVTag.VIDEO, 40, 0, packet_type=PACKET_SEQUENCE_START)
+    index.append(450, FLVTag.AUDIO, 4, 0, packet_type=PACKET_SEQUENCE_START)
+    clock = {FLVTag.VIDEO: rng.randrange(0, 2000), FLVTag.AUDIO: rng.randrange(0, 2000)}
+    step = {FLVTag.VIDEO: 40, FLVTag.AUDIO: 23}
+    offset = 500
+    for _ in range(count):
+        tag_type = rng.choice((FLVTag.VIDEO, FLVTag.AUDIO, FLVTag.AUDIO))
+        roll = rng.random()
+        if roll < 0.02: delta = -rng.randrange(1, 500)
+        elif roll < 0.04: delta = 0
+        elif roll < 0.06: delta = rng.randrange(200, 3000)
+        else: delta = step[tag_type] + rng.choice((-1, 0, 0, 1))
+        clock[tag_type] = max(clock[tag_type] + delta, 0)
+        cts = rng.randrange(-80, 120) if tag_type == FLVTag.VIDEO else 0
+        index.append(offset, tag_type, 100, clock[tag_type], cts=cts, packet_type=PACKET_CODED_FRAMES)
+        offset += 115
+    return index
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("video_interval", [None, 40.0, 1000 / 29.97])
+def test_random_index(seed, video_interval):
+    _assert_same(_random_index(seed), video_interval)
+
+@pytest.mark.parametrize("types", [(), (FLVTag.VIDEO,), (FLVTag.AUDIO,), (FLVTag.AUDIO,) * 11,
+                                   (FLVTag.VIDEO, FLVTag.AUDIO) * 6])
+def test_small_and_single_stream(types):
+    index = TagIndex()
+    for i, tag_type in enumerate(types):
+        index.append(13 + i * 100, tag_type, 80, i * 30, packet_type=PACKET_CODED_FRAMES)
+    _assert_same(index, 40.0)
+
+def test_audio_mode_tie_uses_first_interval():
+    # 23 与 24 各出现 6 次，两种实现都取先出现的 24
+    index = TagIndex()
+    ts = 0
+    for i, gap in enumerate([0] + [24, 23] * 6 + [80]):
+        ts += gap
+        index.append(13 + i * 100, FLVTag.AUDIO, 80, ts, packet_type=PACKET_CODED_FRAMES)
+    _assert_same(index, None)
+    findings, _ = _analyze_timestamps_python(index, None)
+    assert list(findings) == [len(index) - 1]
+
+@pytest.mark.parametrize("audio", ["aac", "mp3"])
+def test_generated_file(tmp_path, audio):
+    path = str(tmp_path / "sample.flv")
+    flvgen.generate(path, duration=20, fps=30, audio=audio, video_kbps=100, gaps=3, gap_ms=700)
+    with FLVFile(path, use_mmap=True) as flv_file:
+        _assert_same(flv_file.index, 1000 / flv_file.metadata["framerate"])
@@ -0,0 +1,24 @@
+"""
+视频 Tag 详情测试：传统 AVC/HEVC 封装与 Enhanced FLV 的 CompositionTime 都按 SI24 显示，与索引中的 CTS 一致。
+"""
+
+import pytest
+
+from flv_parser import FLVFile, FLVTag, _write_tag
+
+def _si24(value):
+    return (value & 0xFFFFFF).to_bytes(3, 'big')
+
+@pytest.mark.parametrize("cts", [-40, -1, 0, 80, 0x7FFFFF, -0x800000])
+def test_composition_time_is_signed(tmp_path, cts):
+    path = str(tmp_path / "cts.flv")
+    frame = b'\x00\x00\x00\x02\x09\xf0' # 一个 AUD NAL 单元
+    with open(path, 'wb') as out:
+        out.write(b'FLV\x01\x01\x00\x00\x00\x09\x00\x00\x00\x00')
+        _write_tag(out, FLVTag.VIDEO, 1000, b'\x27\x01' + _si24(cts) + frame) # 传统 AVC 帧间帧
+        _write_tag(out, FLVTag.VIDEO, 1040, b'\x1c\x01' + _si24(cts) + frame) # 沿用 AVC 封装的 HEVC
+        _write_tag(out, FLVTag.VIDEO, 1080, b'\xa1hvc1' + _si24(cts) + frame) # Enhanced FLV CodedFrames
+    with FLVFile(path) as flv_file:
+        assert list(flv_file.index.cts) == [cts] * 3
+        for i in range(3):
+            assert flv_file.get_tag(i).details["CompositionTime Offset"] == f"{cts} ms"